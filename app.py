@@ -1,500 +1,344 @@
+import hmac
+import logging
 import os
 import random
-import json
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 import streamlit as st
 
+from studyhub import ai_mcq, content, openai_client, srs
+from studyhub.dedup import NearDuplicateIndex
+from studyhub.metrics import METRICS
+from studyhub.prefetch import QuestionPrefetcher
+from studyhub.progress import ProgressStore
+from studyhub.ratelimit import BatchCoalescer, RateLimiter
+from studyhub.question_store import QuestionStore, question_hash
+from studyhub.resilience import CallPolicy, CircuitBreaker
+from studyhub.sampler import WeightedSampler
+from studyhub.shared_queue import SharedQuestionQueue
+
+# studyhub.* modules log prompt sizes, retrieval times etc. to stderr
+_log = logging.getLogger("studyhub")
+if not _log.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s"))
+    _log.addHandler(_handler)
+    _log.setLevel(os.getenv("STUDYHUB_LOG_LEVEL", "INFO"))
+
 # ---------- OPTIONAL: OpenAI client for AI-generated questions ----------
-OPENAI_ENABLED = False
-client = None
-try:
-    from openai import OpenAI
-
-    if os.getenv("OPENAI_API_KEY"):
-        client = OpenAI()
-        OPENAI_ENABLED = True
-except Exception:
-    OPENAI_ENABLED = False
-    client = None
-
-# ---------- STUDY GUIDE CONTENT (Markdown) ----------
-
-STUDY_GUIDE_MD = r"""
-# Unit 5: Revolutions & Industrialization (c. 1750–1900)
-
-## Big Picture
-- Enlightenment + Scientific Revolution → new ideas about **reason, natural rights, social contract, progress**.
-- These ideas helped spark the **Atlantic Revolutions** and later **nationalist** and **feminist** movements.
-- The **Industrial Revolution** transformed economies, societies, and the environment, and triggered new **political ideologies** (liberalism, socialism, communism, anarchism).
-- Artistic movements (Rococo, Neoclassicism, Romanticism, Realism) reflected and reacted to these changes.
-
----
-
-## 1. Scientific Revolution ➜ Roots of the Enlightenment
-
-**Main shifts**
-- From **Church/traditional authority** → **observation, experimentation, reason**.
-- Developed **scientific method**: hypothesis, testing, evidence.
-- Transformed astronomy, physics, biology, optics and encouraged **skepticism** of accepted truths.
-
-**Key figures**
-- **Copernicus** – heliocentric model (Sun at center); challenged geocentrism.
-- **Kepler** – three laws of planetary motion; elliptical orbits.
-- **Galileo** – improved telescope; observed Jupiter’s moons, phases of Venus, mountains on the Moon; work on motion; tried for heresy.
-- **Bacon** – inductive reasoning, “knowledge is power,” modern scientific method.
-- **Descartes** – rationalism (“I think, therefore I am”), emphasis on doubt and reason.
-- **Newton** – laws of motion and universal gravitation; work in optics; links earlier scientists together.
-
----
-
-## 2. Enlightenment
-
-**Core ideas**
-- **State of nature** & **social contract** – people create gov’t for protection/order.
-- **Natural rights** – life, liberty, property.
-- **Empiricism** – knowledge from experience (Locke, Bacon).  
-- **Rationalism** – knowledge from reason (Descartes).  
-- **Deism** – God created universe but doesn’t interfere; rejection of miracles/superstition.
-- Emphasized **reason, progress, secularism, individual rights**, reform of gov’t and society.
-
-**Major thinkers**
-- **Hobbes** – pessimistic view of humans; need strong absolute ruler for order; wrote *Leviathan*.
-- **Locke** – optimistic view; natural rights, right to revolt if gov’t fails; influenced liberalism and democratic revolutions.
-- **Montesquieu** – separation of powers; checks & balances.
-- **Voltaire** – criticized Church/state corruption; free speech; religious tolerance; deism.
-- **Rousseau** – *Social Contract* is with the **general will**; popular sovereignty; men and women are “naturally” different.
-- **Beccaria** – reform of criminal justice; opposed torture and excessive punishments, argued punishments should fit crimes.
-- **Adam Smith** – capitalism; laissez-faire; division of labor; wealth can be created (not fixed).
-- **Diderot** – *Encyclopedia* to compile and spread knowledge.
-- **Mary Wollstonecraft** – *Vindication of the Rights of Woman*; argued Enlightenment rights should apply to women.
-
----
-
-## 3. Atlantic Revolutions
-
-### Common causes
-- Enlightenment ideas (popular sovereignty, individual rights, equality before law).
-- Social tensions and economic pressures.
-- High taxes/imperial control without representation.
-- Inspiration from other revolutions.
-
-### American Revolution
-- Causes: British taxation (Stamp, Sugar Acts), no representation in Parliament, desire to protect traditional rights.
-- Key ideas: **Declaration of Independence**, **Bill of Rights** – apply Enlightenment to politics.
-- Outcomes: Independence, creation of a republic, written constitution; slavery persisted (esp. in South); elites largely kept power.
-
-### French Revolution
-- Background: debt (7 Years’ War, American Revolution), unequal taxation (only 3rd Estate pays), bread shortages, privilege of nobility/clergy.
-- Key events:
-  - **Estates-General** and **Tennis Court Oath** (National Assembly).
-  - **Storming of the Bastille** (symbol of royal oppression).
-  - **Declaration of the Rights of Man and Citizen** – equality before law, popular sovereignty.
-  - **Women’s March on Versailles** – economic + political protest.
-  - **Dechristianization** and seizure of Church property.
-  - **Execution of Louis XVI and Marie Antoinette**.
-  - **Reign of Terror** (Robespierre) – mass executions of “enemies of the revolution”.
-- Outcomes:
-  - End of feudalism and legal privileges.
-  - Experiment with republic; then **Napoleon** rises as emperor.
-  - Napoleonic Code spreads equality before law, secular law, meritocracy—but also dictatorship and conquest.
-  - After defeat, **Congress of Vienna** restores monarchies (Metternich), redraws European borders, tries to contain nationalism.
-
-### Haitian Revolution
-- Social structure: grands blancs (big white planters), petits blancs (poor whites), free people of color (**gens de couleur libres**), enslaved Africans.
-- Causes: brutal plantation slavery, racial hierarchy, Enlightenment ideas, influence of French/American Revolutions.
-- Leaders: **Toussaint Louverture**, later **Jean-Jacques Dessalines**.
-- Outcomes:
-  - First successful slave revolt, independence of Haiti.
-  - Abolition of slavery, redistribution of land to former slaves.
-  - Huge economic/political costs: isolation, “independence debt” to France, instability.
-
-### Latin American Revolutions
-- Social structure: peninsulares > creoles > mestizos > indigenous & enslaved.  
-- Causes:
-  - Creole resentment of peninsulares and imperial control.
-  - Enlightenment + example of other revolutions.
-  - **Napoleonic wars** (Spanish/Portuguese kings displaced → power vacuum).
-- Key figures: **Simón Bolívar** (Jamaica Letter), **Miguel Hidalgo**, **José Morelos**, **Tupac Amaru**.
-- Outcomes:
-  - Independence for many states, but continued inequality.
-  - Creole elites kept power; limited social change.
-  - Economically dependent on foreign investment and technology.
-
----
-
-## 4. Effects of Revolutions: Abolition, Nationalism, Feminism
-
-### Abolition of Slavery
-- Haiti’s success and slave revolts (e.g. Great Jamaica Revolt) pressured empires.
-- **Abolitionist movement** – Quakers, **William Wilberforce**, activists using pamphlets, petitions, boycotts.
-- Britain bans slave trade (1807), then slavery (1830s); others follow (Latin America by 1850s, U.S. 1865, Brazil 1888, Russian serfs freed 1861).
-- Limits: former slaves often remain poor; sharecropping and indentured labor replace slavery; racism persists.
-
-### Nationalism
-- Idea that people sharing language, culture, history, and territory form a **nation**.
-- Helped unify:
-  - **Italy** (Cavour, Garibaldi) and **Germany** (Bismarck; realpolitik).
-  - Greeks & Serbs vs. Ottoman Empire.
-- Inspired resistance:
-  - Poles, Ukrainians, Czechs, Irish, etc. against empires.
-  - **Zionism** – Jewish movement to Palestine.
-  - Indian, Arab, and Egyptian national movements.
-- Distinction:
-  - **Patriotism** – pride in country, allows criticism.
-  - **Nationalism** – can be exclusive and intolerant.
-
-### Feminism
-- Enlightenment ideas + revolutionary ideals extended to women:
-  - **Wollstonecraft**, **Olympe de Gouges**, **Seneca Falls Convention** (Stanton, “all men and women are created equal”).
-- 19th–early 20th century:
-  - Suffrage movements (New Zealand 1893; U.S. 1920; France 1945).
-  - **Maternal feminism** – claim women must participate in politics to protect families.
-  - Activists like **Emmeline Pankhurst** use militant tactics in Britain.
-
----
-
-## 5. Industrial Revolution (First & Second)
-
-### Why Britain?
-- Coal & iron, access to water transport, stable gov’t & property laws, capitalist culture, agricultural revolution (enclosure ➜ surplus labor), colonies for markets and raw materials.
-
-### What changed?
-- Mechanization of **textiles** first (spinning jenny, power loom), then iron & steel, railroads, steamships.
-- **Steam engine**, fossil fuels (coal, later oil).
-- Factory system → specialization of labor.
-
-### Impacts
-- Economic:
-  - Massive increase in production and wealth.
-  - Lower cost of goods, consumer society.
-- Social:
-  - **Urbanization**; growth of new **middle class** and **working class**.
-  - Crowded cities, pollution, disease, crime.
-  - Gendered division of labor; “separate spheres” for middle-class women.
-- Environmental:
-  - Extraction of nonrenewable resources, pollution of air and water.
-
-### Reactions & Ideologies
-- Workers form **trade unions**; strikes, demands for higher wages and shorter hours.
-- **Luddites** – attacked machines that threatened artisan jobs.
-- **Utilitarianism** (Bentham, Mill) – greatest good for greatest number; support reforms.
-- **Utopian socialists** (Owen, Fourier, Saint-Simon) – model communities, cooperative ownership.
-- **Marx & Engels** – “scientific socialism,” class struggle (bourgeoisie vs. proletariat), predicted proletarian revolution and classless society.
-- **Anarchists** (e.g. Bakunin) – all gov’t corrupt, want stateless society, sometimes use violence.
-- Governments slowly introduce reforms: child labor laws, factory acts, public health reforms, education, expansion of suffrage.
-
-### Second Industrial Revolution
-- New energy sources: **electricity** and **oil**.
-- New industries: steel, chemicals, telegraph/telephone, internal combustion engine.
-- Mass production + assembly line → consumer goods (bikes, canned food, appliances).
-- More women in workforce (textiles, clerical, teaching, nursing); fuels suffrage movements.
-
----
-
-## 6. Capitalism & Economic Developments
-
-- **Mercantilism** – earlier system; wealth viewed as fixed; goal was to hoard bullion and regulate trade.
-- **Industrial capitalism** – private ownership of means of production; profit motive; investment & innovation expand wealth.
-- Tools: stock markets, limited-liability corporations, international banks (e.g. HSBC), joint-stock companies.
-- Globalization:
-  - Demand for raw materials ➜ imperialism & extraction in colonies.
-  - Migrants move for work (Europe → Americas, Australia, etc.).
-
----
-
-## 7. Social Classes in Industrial Society
-
-- **Aristocracy** loses economic dominance but retains prestige.
-- **Upper middle class** – factory owners, bankers; often join old elites.
-- **Middle class** – professionals; value respectability, thrift, hard work.
-- **Lower middle class** – clerks, salespeople, office workers; big growth.
-- **Working class** – factory/mining labor; long hours, low wages, harsh conditions.
-
----
-
-## 8. Political Spectrum (19th-century)
-
-- **Radicals** – far left; rapid, sweeping change; sometimes revolutionary.
-- **Liberals** – reform within system; constitutionalism; civil rights; free markets.
-- **Moderates** – compromise; gradual change.
-- **Conservatives** – preserve tradition; wary of rapid change.
-- **Reactionaries** – far right; want to return to “old order”; might support authoritarian rule.
-
----
-
-## 9. Art & Ideas: Rococo, Neoclassicism, Romanticism, Realism
-
-### Rococo
-- Early 1700s; light, playful, decorative; aristocratic audiences.
-- Pastel colors, romance, leisure. Fragonard, Boucher.
-
-### Neoclassicism
-- Inspired by Greece/Rome; serious, moral, symmetrical.
-- Linked to Enlightenment and French Revolution virtues.
-- Jacques-Louis David (e.g. *Napoleon Crossing the Alps*); classical music (Haydn, Mozart).
-
-### Romanticism
-- Reaction against Enlightenment’s cold rationalism and Industrial ugliness.
-- Emphasizes **emotion, imagination, nature, the sublime, nationalism, mysticism**.
-- Literature: Wordsworth, Keats, Goethe, Byron, Shelley, Hugo.
-- Art: Goya (*Third of May 1808*, *Saturn Devouring His Son*), Turner (*The Slave Ship*), Constable.
-- Music: Beethoven, Chopin, program music, virtuosos (Liszt, Paganini).
-- Themes: individual hero, national identity, awe of nature, critique of industrial society.
-
-### Realism
-- Focus on ordinary life, especially working class; gritty and honest.
-- Highlights social problems of industrialization.
-- Literature: Dickens, Flaubert; Art: Courbet, Millet; photography emerges.
-
----
-
-## 10. Swift’s *A Modest Proposal* (Contextual Lit)
-
-- Satirical pamphlet “proposes” eating Irish babies to solve poverty.
-- Uses extreme irony to criticize British policies and indifference to Irish suffering.
-- Fits broader 18th–19th c. trend of literature critiquing inequality and social injustice.
-
----
-
-Use this guide with your flashcards and MCQs to link **people, ideas, events, and themes** across the whole 1750–1900 unit.
-"""
-
-# ---------- FLASHCARDS (TERM ➜ DEFINITION) ----------
-
-FLASHCARDS = [
-    # Enlightenment & Scientific Revolution
-    {"term": "State of Nature", "definition": "Hypothetical condition before organized government, used to justify forming political systems and social contracts."},
-    {"term": "Social Contract", "definition": "Agreement in which people give up some freedoms to governments in exchange for protection and order."},
-    {"term": "Deism", "definition": "Belief that God created the universe and natural laws but does not intervene with miracles."},
-    {"term": "Empiricism", "definition": "Theory that knowledge comes mainly from sensory experience and observation."},
-    {"term": "Rationalism", "definition": "Theory that reason and innate ideas are key sources of knowledge."},
-    {"term": "Thomas Hobbes", "definition": "English thinker who argued humans are selfish and need an absolute ruler for order; wrote 'Leviathan'."},
-    {"term": "John Locke", "definition": "Philosopher who argued for natural rights of life, liberty, property and right to overthrow tyrannical gov’t."},
-    {"term": "Montesquieu", "definition": "Enlightenment thinker who proposed separation of powers and checks and balances."},
-    {"term": "Voltaire", "definition": "Critic of Church and absolutism; defended free speech and religious tolerance; deist."},
-    {"term": "Rousseau", "definition": "Believed in general will and popular sovereignty; wrote 'The Social Contract'."},
-    {"term": "Adam Smith", "definition": "Father of modern economics; promoted laissez-faire capitalism and free markets in 'Wealth of Nations'."},
-    {"term": "Mary Wollstonecraft", "definition": "Early feminist who argued for equal education in 'A Vindication of the Rights of Woman'."},
-
-    # Atlantic Revolutions
-    {"term": "Popular Sovereignty", "definition": "Political principle that power comes from the people rather than a monarch."},
-    {"term": "Third Estate", "definition": "Commoners in pre-revolutionary France who paid most taxes and had the least privilege."},
-    {"term": "Declaration of the Rights of Man and Citizen", "definition": "French Revolutionary document asserting equal rights and popular sovereignty."},
-    {"term": "Reign of Terror", "definition": "Radical phase of French Revolution when Robespierre’s government executed thousands of 'enemies'."},
-    {"term": "Toussaint Louverture", "definition": "Leader of the Haitian Revolution who helped turn a slave revolt into a movement for independence."},
-    {"term": "Gens de couleur libres", "definition": "Free people of color in colonial Saint-Domingue (Haiti)."},
-    {"term": "Simón Bolívar", "definition": "Creole revolutionary who led independence movements in northern South America; wrote the Jamaica Letter."},
-    {"term": "Great Jamaica Revolt", "definition": "1831–32 slave uprising in British West Indies that helped push Britain toward abolition."},
-
-    # Nationalism & Feminism
-    {"term": "Nationalism", "definition": "Ideology that people who share culture, language, or history should form a self-governing nation-state."},
-    {"term": "Realpolitik", "definition": "Politics based on practical considerations of power rather than ideals; used by Bismarck and Cavour."},
-    {"term": "Zionism", "definition": "Jewish nationalist movement to establish a homeland in Palestine."},
-    {"term": "Maternal Feminism", "definition": "Idea that women should have public roles because they are responsible for protecting children and family."},
-
-    # Industrial Revolution & Ideologies
-    {"term": "Industrial Revolution", "definition": "Shift to machine-based manufacturing, factory system, and fossil fuels starting in Britain."},
-    {"term": "Urbanization", "definition": "Growth of cities as people move from countryside to work in factories."},
-    {"term": "Luddites", "definition": "Skilled artisans who smashed machines that threatened their jobs."},
-    {"term": "Trade Unions", "definition": "Organizations of workers that bargain collectively for better wages and conditions."},
-    {"term": "Utopian Socialism", "definition": "Vision of cooperative, self-sufficient communities sharing ownership of production."},
-    {"term": "Karl Marx", "definition": "German thinker who argued history is class struggle; predicted proletarian revolution and communism."},
-    {"term": "Proletariat", "definition": "Industrial working class that sells its labor for wages."},
-    {"term": "Bourgeoisie", "definition": "Capitalist middle class that owns factories and other means of production."},
-    {"term": "Anarchism", "definition": "Belief that all government is corrupt and should be abolished in favor of cooperative self-rule."},
-    {"term": "Utilitarianism", "definition": "Ethical theory that the best action maximizes happiness for the greatest number."},
-
-    # Capitalism & Second IR
-    {"term": "Capitalism", "definition": "Economic system in which private owners control production for profit in competitive markets."},
-    {"term": "Mercantilism", "definition": "Economic policy where states seek fixed wealth by controlling trade and accumulating bullion."},
-    {"term": "Mass Production", "definition": "Producing large quantities of standardized goods, often on an assembly line."},
-    {"term": "Second Industrial Revolution", "definition": "Late 19th-century phase with steel, chemicals, electricity, and oil."},
-
-    # Art & Culture
-    {"term": "Rococo", "definition": "Light, decorative, playful art style associated with aristocratic leisure in 18th-century France."},
-    {"term": "Neoclassicism", "definition": "Serious, moral art inspired by classical Greece and Rome; linked to Enlightenment values."},
-    {"term": "Romanticism", "definition": "Artistic movement emphasizing emotion, nature, nationalism, and the sublime."},
-    {"term": "Realism (Art)", "definition": "Movement depicting everyday life and social problems realistically, especially of lower classes."},
-    {"term": "Virtuoso", "definition": "Performer with extreme technical skill and expressive power (e.g., Liszt, Paganini)."},
-]
-
-# ---------- MCQ QUESTION BANK (DIFFICULT AP-LEVEL) ----------
-
-MCQ_QUESTIONS = [
-    {
-        "question": "Which comparison best captures how Enlightenment political thought influenced both the American and French Revolutions?",
-        "options": [
-            "Both revolutions used Enlightenment ideas primarily to expand monarchical power over colonial elites.",
-            "Both revolutions drew on concepts of natural rights and popular sovereignty, though the French applied them more radically to social hierarchy.",
-            "Enlightenment ideas were central to the American Revolution but largely irrelevant to the French Revolution, which focused on religion.",
-            "Enlightenment ideas in both cases focused mainly on economic liberalism and had little impact on political institutions."
-        ],
-        "correct": "B",
-        "explanation": "Both revolutions were grounded in natural rights and popular sovereignty; the French went further by attacking noble privilege and the Church."
-    },
-    {
-        "question": "In what way did the Haitian Revolution most clearly challenge prevailing Enlightenment thinking in the Atlantic world?",
-        "options": [
-            "By demonstrating that constitutional monarchies were superior to republics.",
-            "By proving that absolutist monarchs could peacefully abolish slavery.",
-            "By forcing European states to grant voting rights to all women.",
-            "By extending ideals of liberty and equality to enslaved people, contradicting racist assumptions among many Enlightenment thinkers."
-        ],
-        "correct": "D",
-        "explanation": "Haiti’s slave revolt applied universal rights to enslaved Africans, challenging racial limits many Europeans placed on Enlightenment ideals."
-    },
-    {
-        "question": "Which development in Britain most directly created the labor supply necessary for the early Industrial Revolution?",
-        "options": [
-            "The abolition of serfdom and manorial obligations in Eastern Europe.",
-            "The enclosure movement and agricultural changes that pushed rural workers off the land.",
-            "The introduction of universal male suffrage for factory workers.",
-            "The destruction of guilds during the French Revolution."
-        ],
-        "correct": "B",
-        "explanation": "Enclosure and agricultural improvements displaced many small farmers and laborers, who then moved to cities and worked in factories."
-    },
-    {
-        "question": "A historian arguing that nationalism was a 'double-edged sword' in the 19th century would most likely cite which pair of examples?",
-        "options": [
-            "The Seven Years’ War and the American Civil War.",
-            "The development of factories and the growth of labor unions.",
-            "The unification of Germany and the intensification of rivalries that helped lead to World War I.",
-            "The spread of Enlightenment deism and the expansion of Romantic mysticism."
-        ],
-        "correct": "C",
-        "explanation": "Nationalism unified Germany but also sharpened interstate rivalries and militarism, contributing to tensions before WWI."
-    },
-    {
-        "question": "Which best explains why Latin American independence movements produced relatively little social change compared with the Haitian Revolution?",
-        "options": [
-            "Latin American revolutions were financed entirely by foreign investors who insisted on maintaining slavery.",
-            "Creole elites led most Latin American movements and sought political independence while preserving social and economic hierarchies.",
-            "The Catholic Church firmly opposed independence everywhere in Latin America, preventing any reforms.",
-            "Indigenous peoples controlled most military campaigns and refused to share power with other social groups."
-        ],
-        "correct": "B",
-        "explanation": "Creoles wanted to replace peninsulares but generally kept existing racial and class hierarchies, unlike Haiti’s slave-led revolution."
-    },
-    {
-        "question": "Which statement best compares liberalism and socialism as responses to industrial capitalism?",
-        "options": [
-            "Both rejected representative government and supported absolute monarchy.",
-            "Liberalism emphasized legal equality and free markets, while socialism emphasized reducing economic inequality through collective or state action.",
-            "Liberalism favored communal ownership of property, while socialism defended laissez-faire economics.",
-            "Both movements agreed that workers should avoid political participation."
-        ],
-        "correct": "B",
-        "explanation": "Liberals wanted constitutional rights and market economies; socialists prioritized tackling inequality via collective ownership or strong state reforms."
-    },
-    {
-        "question": "Which feature of Romanticism most clearly represented a reaction against Enlightenment and Industrial values?",
-        "options": [
-            "Its admiration for factories and railroads as symbols of human progress.",
-            "Its preference for precise scientific analysis of nature over emotional responses.",
-            "Its focus on emotion, the sublime in nature, and individual experience rather than pure rationality and mechanization.",
-            "Its strict adherence to classical rules of composition and balance in all art forms."
-        ],
-        "correct": "C",
-        "explanation": "Romanticism emphasized emotion, imagination, and wild nature, pushing back against Enlightenment rationalism and industrial urban life."
-    },
-    {
-        "question": "Which of the following is a correct historical distinction between the First and Second Industrial Revolutions?",
-        "options": [
-            "The First mainly relied on textiles, coal, and steam, while the Second featured steel, chemicals, electricity, and oil.",
-            "The First was entirely peaceful, while the Second was defined by constant European wars.",
-            "The First took place only in Asia, while the Second occurred only in Europe.",
-            "The First focused on consumer goods, while the Second focused only on weapons."
-        ],
-        "correct": "A",
-        "explanation": "First IR: textiles, coal, steam. Second IR: steel, chemicals, electricity, petroleum, new consumer goods."
-    },
-    {
-        "question": "Why did many 19th-century conservatives view the French Revolution as a cautionary example?",
-        "options": [
-            "Because it proved absolute monarchy to be the only stable political system.",
-            "Because the rapid overhaul of traditional institutions led to violence, instability, and eventually a military dictatorship.",
-            "Because it showed that democracies could never fight wars successfully.",
-            "Because it eliminated nationalism from European politics."
-        ],
-        "correct": "B",
-        "explanation": "Conservatives like Metternich argued that radical change in France unleashed chaos, terror, and Napoleon’s dictatorship."
-    },
-    {
-        "question": "Which best explains why industrial capitalism led to large-scale migration during the 19th century?",
-        "options": [
-            "Workers were legally forced by governments to migrate to foreign colonies.",
-            "Industrial countries had no interest in importing raw materials from other regions.",
-            "New transportation technologies and demand for labor encouraged people to move to cities and to other continents for work.",
-            "Religious authorities required all peasants to leave their home villages after the Enlightenment."
-        ],
-        "correct": "C",
-        "explanation": "Railroads, steamships, and global labor demand encouraged both rural-to-urban migration and overseas migration."
-    },
-]
+# openai is only imported when the first AI question is generated (see get_openai_client)
+OPENAI_ENABLED = bool(os.getenv("OPENAI_API_KEY")) and openai_client.available()
+
+# ---------- STUDY CONTENT ----------
+# The guide, flashcards and MCQ bank live in data/ (see data/manifest.json) and are
+# loaded lazily, once per server process, by studyhub.content.
+
+UNIT = content.DEFAULT_UNIT
+if len(content.units()) > 1:
+    UNIT = st.sidebar.selectbox("Unit", content.units(), format_func=content.unit_title)
 
 # ---------- AI QUESTION GENERATION (OPTIONAL) ----------
 
-AI_CONTEXT = STUDY_GUIDE_MD[:7000]  # enough context but keep prompt size reasonable
+DEFAULT_TOPIC = ai_mcq.DEFAULT_TOPIC
+
+# Deadline and retry budget per AI call; the breaker routes to the bank after repeated failures
+AI_DEADLINE_SECONDS = float(os.getenv("MCQ_AI_DEADLINE", "15"))
+AI_ATTEMPT_TIMEOUT = float(os.getenv("MCQ_AI_TIMEOUT", "10"))
+AI_MAX_ATTEMPTS = int(os.getenv("MCQ_AI_MAX_ATTEMPTS", "2"))
+BREAKER_FAILURES = int(os.getenv("MCQ_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("MCQ_BREAKER_COOLDOWN", "30"))
+# Requests and tokens per minute for the whole process (0 = unlimited); set to the key's limits
+AI_REQUESTS_PER_MINUTE = float(os.getenv("MCQ_RATE_RPM", "500"))
+AI_TOKENS_PER_MINUTE = float(os.getenv("MCQ_RATE_TPM", "200000"))
+# Blocking requests for one topic that arrive within this window share a single API call
+COALESCE_WINDOW_SECONDS = float(os.getenv("MCQ_COALESCE_WINDOW", "0.05"))
+COALESCE_MAX_BATCH = int(os.getenv("MCQ_COALESCE_MAX", "8"))
+# Connection pool of the shared OpenAI client; idle connections are reused between calls
+HTTP_MAX_CONNECTIONS = int(os.getenv("MCQ_HTTP_MAX_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_CONNECTIONS = int(os.getenv("MCQ_HTTP_KEEPALIVE_CONNECTIONS", "10"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("MCQ_HTTP_KEEPALIVE_SECONDS", "30"))
+
+# Stream a question the student is waiting for, showing it as it arrives
+STREAM_QUESTIONS = os.getenv("MCQ_STREAM", "1") not in ("", "0")
+# seconds between redraws of a question that is still streaming
+STREAM_REDRAW_SECONDS = float(os.getenv("MCQ_STREAM_REDRAW", "0.05"))
+
+# Only the guide sections most relevant to the topic are sent with each prompt
+AI_CONTEXT_SECTIONS = int(os.getenv("MCQ_CONTEXT_SECTIONS", "4"))
+AI_CONTEXT_MAX_CHARS = int(os.getenv("MCQ_CONTEXT_MAX_CHARS", "7000"))
+
+# Ready AI questions kept per topic; refills start below the low watermark
+PREFETCH_HIGH_WATERMARK = int(os.getenv("MCQ_PREFETCH_HIGH", "8"))
+PREFETCH_LOW_WATERMARK = int(os.getenv("MCQ_PREFETCH_LOW", "3"))
+PREFETCH_WORKERS = int(os.getenv("MCQ_PREFETCH_WORKERS", "2"))
+# Questions requested per API call when refilling (1 = one call per question)
+BATCH_SIZE = int(os.getenv("MCQ_BATCH_SIZE", "4"))
+
+# Generated questions are kept on disk and reused across sessions and restarts
+STORE_PATH = os.getenv(
+    "MCQ_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".studyhub", "questions.sqlite3"),
+)
+STORE_MAX_ITEMS = int(os.getenv("MCQ_STORE_MAX_ITEMS", "5000"))
+STORE_TTL_DAYS = float(os.getenv("MCQ_STORE_TTL_DAYS", "30"))
+# Generated questions this similar (Jaccard of content words) to a known one are dropped
+NEAR_DUP_THRESHOLD = float(os.getenv("MCQ_NEAR_DUP_THRESHOLD", "0.4"))
+
+# Several app processes behind a load balancer: share the prefetch queue through SQLite
+# and read progress from disk rather than a per-process cache
+MULTIPROCESS = os.getenv("STUDYHUB_MULTIPROCESS", "0") not in ("", "0")
+QUEUE_PATH = os.getenv(
+    "MCQ_QUEUE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".studyhub", "prefetch.sqlite3"),
+)
+
+# Student progress is buffered in memory and written to disk in bulk
+PROGRESS_PATH = os.getenv(
+    "PROGRESS_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".studyhub", "progress.sqlite3"),
+)
+# shorter in multi-process mode so another process sees a student's progress quickly
+PROGRESS_FLUSH_SECONDS = float(os.getenv("PROGRESS_FLUSH_SECONDS", "0.25" if MULTIPROCESS else "2"))
+PROGRESS_FLUSH_ROWS = int(os.getenv("PROGRESS_FLUSH_ROWS", "500"))
+# flashcard schedules kept in memory for the most recently active students
+SRS_CACHE_SIZE = int(os.getenv("SRS_CACHE_SIZE", "1000"))
+
+# Fraction of timings recorded in the in-process histograms (0 turns instrumentation off)
+METRICS_SAMPLE_RATE = float(os.getenv("STUDYHUB_METRICS_SAMPLE", "1"))
+# Optional Prometheus text file, rewritten periodically; "{pid}" gives each process its own
+METRICS_FILE = os.getenv("STUDYHUB_METRICS_FILE", "")
+METRICS_INTERVAL_SECONDS = float(os.getenv("STUDYHUB_METRICS_INTERVAL", "15"))
+# The Admin page (metrics) is only listed when a password is set
+ADMIN_PASSWORD = os.getenv("STUDYHUB_ADMIN_PASSWORD", "")
+
+# Read-only pages built by `python -m studyhub.static_export`, served by Streamlit from
+# ./static (or from STUDYHUB_STATIC_URL, e.g. a CDN); linked once they exist
+STATIC_URL = os.getenv("STUDYHUB_STATIC_URL", "app/static").rstrip("/")
+STATIC_BUILT = bool(os.getenv("STUDYHUB_STATIC_URL")) or os.path.exists(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "index.html")
+)
+
+METRICS.sample_rate = METRICS_SAMPLE_RATE
+
+
+@st.cache_resource
+def start_metrics_export():
+    if METRICS_FILE and METRICS_SAMPLE_RATE > 0:
+        METRICS.start_export(METRICS_FILE.format(pid=os.getpid()), METRICS_INTERVAL_SECONDS)
 
 
-def generate_ai_mcq(topic: str = "Unit 5: Revolutions and Industrialization"):
+start_metrics_export()
+
+
+@st.cache_resource
+def get_call_policy():
     """
-    Uses OpenAI (if available) to generate one AP-style MCQ.
-    Returns a dict similar to entries in MCQ_QUESTIONS or None on failure.
+    One policy (and so one circuit breaker and rate limiter) shared by every session and
+    prefetch worker.
     """
-    if not OPENAI_ENABLED or client is None:
-        return None
-
-    system_msg = (
-        "You are an expert AP World History: Modern teacher. "
-        "Write challenging multiple-choice questions for Unit 5 (c. 1750–1900) "
-        "covering Enlightenment, Atlantic Revolutions, Nationalism, Industrial Revolution, ideologies, and art movements."
+    return CallPolicy(
+        deadline_seconds=AI_DEADLINE_SECONDS,
+        attempt_timeout=AI_ATTEMPT_TIMEOUT,
+        max_attempts=AI_MAX_ATTEMPTS,
+        breaker=CircuitBreaker(BREAKER_FAILURES, BREAKER_COOLDOWN_SECONDS),
+        limiter=RateLimiter(AI_REQUESTS_PER_MINUTE, AI_TOKENS_PER_MINUTE),
     )
-    user_msg = f"""
-Using the following context, write ONE difficult AP World History multiple-choice question
-about {topic}. It must:
-
-- Focus on higher-order thinking (comparison, causation, continuity/change, evaluation).
-- Have exactly 4 answer options labeled A, B, C, D.
-- Clearly indicate the single correct option.
-- Include a short explanation of why that option is correct.
-
-Context:
-{AI_CONTEXT}
-
-Return ONLY valid JSON in this format:
-{{
-  "question": "...",
-  "options": ["A. ...", "B. ...", "C. ...", "D. ..."],
-  "answer": "B",
-  "explanation": "..."
-}}
-"""
 
+
+CALL_POLICY = get_call_policy()
+
+
+@st.cache_resource
+def get_openai_client():
+    """
+    One client, and so one keep-alive connection pool, for every session and prefetch
+    worker in the process. Returns None if the client can't be created.
+    """
     try:
-        completion = client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[
-                {"role": "system", "content": system_msg},
-                {"role": "user", "content": user_msg},
-            ],
-            temperature=0.9,
+        return openai_client.make_client(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive=HTTP_KEEPALIVE_CONNECTIONS,
+            keepalive_seconds=HTTP_KEEPALIVE_SECONDS,
         )
-        content = completion.choices[0].message.content.strip()
-        data = json.loads(content)
-        # Normalize keys to match internal format
-        correct = data.get("answer", "").strip().upper()[0]
-        return {
-            "question": data.get("question", ""),
-            "options": data.get("options", []),
-            "correct": correct,
-            "explanation": data.get("explanation", ""),
-        }
     except Exception:
+        _log.exception("couldn't create the OpenAI client")
         return None
 
 
+def ai_topics():
+    """
+    "##" headings of the guide offered as AI question topics, e.g. "Atlantic Revolutions".
+    """
+    return list(dict.fromkeys(
+        re.sub(r"^\d+\.\s*", "", s.title.split(" › ")[0]).replace("*", "")
+        for s in content.load_section_index(UNIT).sections
+        if s.title != "Big Picture"
+    ))
+
+
+def ai_context(topic: str):
+    # the unit-wide default topic gets a random spread of sections instead of a search
+    query = None if topic == DEFAULT_TOPIC else topic
+    with METRICS.timer("ai_context_seconds"):
+        return content.load_section_index(UNIT).context(
+            query, k=AI_CONTEXT_SECTIONS, max_chars=AI_CONTEXT_MAX_CHARS
+        )
+
+
+def generate_ai_mcq(topic: str = DEFAULT_TOPIC):
+    """
+    Uses OpenAI (if available) to generate one AP-style MCQ.
+    Returns a dict in the same format as the bank questions or None on failure.
+    """
+    client = get_openai_client() if OPENAI_ENABLED else None
+    if client is None:
+        return None
+    return ai_mcq.generate_mcq(client, topic, ai_context(topic), CALL_POLICY)
+
+
+def generate_ai_mcq_batch(n: int, topic: str = DEFAULT_TOPIC):
+    """
+    Uses OpenAI (if available) to generate up to `n` MCQs in one API call.
+    Invalid questions are dropped, so the list may be shorter than `n`.
+    """
+    client = get_openai_client() if OPENAI_ENABLED else None
+    if client is None:
+        return []
+    if n == 1:
+        q = generate_ai_mcq(topic)
+        return [q] if q is not None else []
+    return ai_mcq.generate_mcq_batch(client, n, topic, ai_context(topic), CALL_POLICY)
+
+
+@st.cache_resource
+def get_question_store():
+    return QuestionStore(
+        STORE_PATH,
+        max_items=STORE_MAX_ITEMS,
+        ttl_seconds=STORE_TTL_DAYS * 24 * 3600,
+    )
+
+
+@st.cache_resource
+def get_progress_store():
+    return ProgressStore(
+        PROGRESS_PATH,
+        flush_seconds=PROGRESS_FLUSH_SECONDS,
+        flush_rows=PROGRESS_FLUSH_ROWS,
+        # another process may have written since; only this process's pending writes are trusted
+        cache_size=0 if MULTIPROCESS else 10000,
+    )
+
+
+@st.cache_resource
+def get_dedup_index(bank_version):
+    """
+    Near-duplicate index over the bank and the stored AI questions, rebuilt when the bank
+    changes; generated questions are checked against it before they are stored.
+    """
+    index = NearDuplicateIndex(NEAR_DUP_THRESHOLD)
+    for q in content.load_question_bank().questions:
+        index.add(question_hash(q), q)
+    for _, _, q in get_question_store().items():
+        index.add(question_hash(q), q)
+    return index
+
+
+def dedup_index() -> NearDuplicateIndex:
+    return get_dedup_index(tuple(content.content_version(unit, "mcq") for unit in content.units()))
+
+
+def generate_and_store_mcqs(topic: str, n: int, store: QuestionStore):
+    """
+    Generates up to `n` AI questions and saves them to the store so later sessions can reuse them.
+    Rewordings of questions already in the bank or the store are dropped.
+    """
+    index = dedup_index()
+    fresh = []
+    for q in generate_ai_mcq_batch(n, topic):
+        with METRICS.timer("dedup_seconds"):
+            admitted, _ = index.admit(question_hash(q), q)
+        METRICS.inc("generated_questions_total", result="new" if admitted else "near_duplicate")
+        if admitted:
+            store.add(q, topic=topic)
+            fresh.append(q)
+    return fresh
+
+
+@st.cache_resource
+def get_prefetcher():
+    """
+    One prefetch pool per server process, shared by every session. In multi-process
+    mode the pools of all processes fill one shared queue.
+    """
+    store = get_question_store()
+    return QuestionPrefetcher(
+        lambda topic, n: generate_and_store_mcqs(topic, n, store),
+        high_watermark=PREFETCH_HIGH_WATERMARK,
+        low_watermark=PREFETCH_LOW_WATERMARK,
+        workers=PREFETCH_WORKERS,
+        batch_size=BATCH_SIZE,
+        queue=SharedQuestionQueue(QUEUE_PATH) if MULTIPROCESS else None,
+    )
+
+
+@st.cache_resource
+def get_coalescer():
+    """
+    Shares one API call among sessions that block on a new question for the same topic
+    at the same moment (e.g. a whole class clicking "New Question" together).
+    """
+    store = get_question_store()
+    return BatchCoalescer(
+        lambda topic, n: generate_and_store_mcqs(topic, n, store),
+        max_batch=COALESCE_MAX_BATCH,
+        window_seconds=COALESCE_WINDOW_SECONDS,
+    )
+
+
+@st.cache_resource
+def get_stream_pool():
+    """Threads that stream the questions students are waiting for, one per pooled connection."""
+    return ThreadPoolExecutor(max_workers=HTTP_MAX_CONNECTIONS, thread_name_prefix="mcq-stream")
+
+
+def keep_streamed_question(q, topic: str):
+    """Stores a question that finished streaming and returns its ref; runs once per stream."""
+    admitted, _ = dedup_index().admit(question_hash(q), q)
+    METRICS.inc("generated_questions_total", result="new" if admitted else "near_duplicate")
+    # the students watching it have already read it, so it is kept even if it repeats another
+    return store_ref(q, topic)
+
+
+def start_question_stream(topic: str):
+    """
+    Starts streaming one AI question on `topic`; returns the ai_mcq.QuestionStream, or
+    None without a client.
+    """
+    client = get_openai_client() if OPENAI_ENABLED else None
+    if client is None:
+        return None
+    stream = ai_mcq.QuestionStream(topic)
+    get_stream_pool().submit(
+        stream.run, client, ai_context(topic), CALL_POLICY, lambda q: keep_streamed_question(q, topic)
+    )
+    return stream
+
+
+@st.cache_resource
+def get_stream_coalescer():
+    """
+    Shares one streamed question among sessions that ask for the same topic while it is
+    still arriving, as get_coalescer() does for whole replies.
+    """
+    return ai_mcq.StreamCoalescer(start_question_stream)
+
+
 # ---------- STREAMLIT PAGE SETUP ----------
 
 st.set_page_config(
@@ -507,8 +351,67 @@ st.title("WHAP Unit 5 Study Hub: Revolutions & Industrialization (c. 1750–1900
 st.sidebar.header("Navigation")
 page = st.sidebar.radio(
     "Go to",
-    ["Study Guide", "Flashcards", "Practice MCQs", "Practice Test"],
+    ["Study Guide", "Flashcards", "Practice MCQs", "Practice Test"] + (["Admin"] if ADMIN_PASSWORD else []),
+    key="page",
 )
+if STATIC_BUILT:
+    st.sidebar.markdown(
+        f"[Read-only version]({STATIC_URL}/index.html): guide, flashcards and a quiz that run in "
+        "your browser without a live session."
+    )
+
+
+# ---------- STUDENT PROGRESS ----------
+# With a student ID, progress is saved to the progress store and restored when the ID
+# is entered again (after a refresh or a server restart); without one it lasts for the session.
+
+def current_student() -> str:
+    return st.session_state.get("student_id", "").strip()
+
+
+def save_progress(key: str, value):
+    student = current_student()
+    if student:
+        get_progress_store().put(student, key, value)
+
+
+def save_test_progress():
+    save_progress("test", {
+        "refs": list(st.session_state.test_questions),
+        "index": st.session_state.test_index,
+        "score": st.session_state.test_score,
+        "answers": list(st.session_state.test_answers),
+    })
+
+
+def resume_progress():
+    """
+    on_change callback for the student ID: restores where that student left off.
+    """
+    student = current_student()
+    if not student:
+        return
+    store = get_progress_store()
+    with METRICS.timer("cache_lookup_seconds", cache="progress"):
+        test = store.get(student, "test")
+    # tests saved before questions were stored as refs can't be restored
+    if test and "refs" in test:
+        st.session_state.test_questions = array("i", test["refs"])
+        st.session_state.test_index = test["index"]
+        st.session_state.test_score = test["score"]
+        st.session_state.test_answers = bytearray(test["answers"])
+        st.session_state.test_feedback = None
+    st.session_state.flashcard_index = store.get(student, f"flashcards_{UNIT}", 0)
+    st.session_state.mcq_stats = store.get(student, "mcq", {"answered": 0, "correct": 0})
+    st.session_state.topic_record = store.get(student, "topics", {})
+    st.session_state.pop("bank_samplers", None)  # rebuilt with this student's weights
+    st.session_state.pop("srs_card", None)
+
+
+student_id = st.sidebar.text_input(
+    "Student ID (optional)", key="student_id", on_change=resume_progress,
+    help="Saves your flashcard schedule, test and practice record so you can pick up where you left off.",
+).strip()
 
 if "flashcard_index" not in st.session_state:
     st.session_state.flashcard_index = 0
@@ -517,28 +420,238 @@ if "show_answer" not in st.session_state:
 if "current_mcq" not in st.session_state:
     st.session_state.current_mcq = None
 if "test_questions" not in st.session_state:
-    st.session_state.test_questions = []
+    st.session_state.test_questions = array("i")
 if "test_index" not in st.session_state:
     st.session_state.test_index = 0
 if "test_score" not in st.session_state:
     st.session_state.test_score = 0
 if "test_answers" not in st.session_state:
-    st.session_state.test_answers = {}
+    st.session_state.test_answers = bytearray()
+if "test_feedback" not in st.session_state:
+    st.session_state.test_feedback = None
+if "mcq_stats" not in st.session_state:
+    st.session_state.mcq_stats = {"answered": 0, "correct": 0}
+# topic -> [answered, missed], which weights question sampling toward weak topics
+if "topic_record" not in st.session_state:
+    st.session_state.topic_record = {}
+# (bank version, filters) -> WeightedSampler, most recently used last
+if "bank_samplers" not in st.session_state:
+    st.session_state.bank_samplers = OrderedDict()
+# script runs per button action, to check that clicks cost one partial run
+if "run_counts" not in st.session_state:
+    st.session_state.run_counts = {"full": 0, "fragment": 0, "actions": 0}
+st.session_state.run_counts["full"] += 1
+st.session_state.in_full_run = True
+# first guide section starts open
+st.session_state.setdefault(f"guide_{UNIT}_0", True)
+
+
+# ---------- SEARCH ----------
+
+SEARCH_ICONS = {"guide": "📖", "flashcard": "🃏", "mcq": "❓"}
+
+
+def open_search_hit(ref):
+    """
+    on_click callback: jumps to the page holding a search hit before the next run draws it.
+    """
+    st.session_state.run_counts["actions"] += 1
+    kind, i = ref
+    if kind == "guide":
+        st.session_state.page = "Study Guide"
+        st.session_state[f"guide_{UNIT}_{i}"] = True
+    elif kind == "flashcard":
+        st.session_state.page = "Flashcards"
+        st.session_state.flashcard_mode = "Browse"
+        st.session_state.flashcard_index = i
+        st.session_state.show_answer = False
+        save_progress(f"flashcards_{UNIT}", i)
+    else:
+        st.session_state.page = "Practice MCQs"
+        st.session_state.current_mcq = i
+        st.session_state.mcq_checked = False
+        st.session_state.pop("mcq_choice", None)
+
+
+query = st.sidebar.text_input("Search guide, flashcards & questions", key="search_query")
+if query.strip():
+    search_start = time.perf_counter()
+    hits = content.load_search_index(UNIT).search(query, limit=8)
+    search_ms = (time.perf_counter() - search_start) * 1000
+    st.sidebar.caption(f"{len(hits)} results in {search_ms:.1f} ms")
+    for n, hit in enumerate(hits):
+        st.sidebar.button(
+            f"{SEARCH_ICONS[hit.ref[0]]} {hit.title}",
+            key=f"search_hit_{n}",
+            help=hit.snippet,
+            on_click=open_search_hit,
+            args=(hit.ref,),
+        )
 
 
 # ---------- HELPER FUNCTIONS ----------
+# Session state holds question refs, not question objects: a bank question id (>= 0) or a
+# negated question store id (< 0). Test answers are one byte each (see ANSWER_CODES).
+
+ANSWER_CODES = "ABCD—"  # code 4: submitted without a choice
+UNANSWERED = 255
+UNAVAILABLE = "This question has expired from the AI question store."
+
+
+def count_lookup(cache: str, hit: bool):
+    METRICS.inc("cache_lookups_total", cache=cache, result="hit" if hit else "miss")
+
+
+def resolve_question(ref: int):
+    """The shared Question record for `ref`, or None if a stored AI question has since expired."""
+    if ref >= 0:
+        return content.load_question_bank().questions[ref]
+    with METRICS.timer("cache_lookup_seconds", cache="question_store"):
+        q = get_question_store().get(-ref)
+    count_lookup("question_store", q is not None)
+    return q
 
-def get_random_bank_question():
-    return random.choice(MCQ_QUESTIONS)
 
+def store_ref(q, topic: str):
+    """Ref for an AI question, adding it to the store first if it isn't there yet."""
+    store = get_question_store()
+    qid = store.id_of(q)
+    if qid is None:
+        store.add(q, topic=topic)
+        qid = store.id_of(q)
+    return -qid if qid is not None else None
 
-def get_new_mcq(use_ai: bool):
+
+# filter combinations whose samplers a session keeps
+SAMPLERS_PER_SESSION = 4
+
+
+def topic_weight(topic) -> float:
+    """
+    Sampling weight of a topic: the student's miss rate on it, smoothed so an
+    unanswered topic sits at 0.5 and a few answers don't swing it to 0 or 1.
+    """
+    answered, missed = st.session_state.topic_record.get(topic, (0, 0))
+    return (missed + 1) / (answered + 2)
+
+
+def bank_sampler(**filters) -> WeightedSampler:
+    """
+    This session's sampler over the current unit's bank questions matching `filters`.
+    It doesn't repeat a question until all of them have been drawn, and favours the
+    topics the student misses most.
+    """
+    key = (content.content_version(UNIT, "mcq"), tuple(sorted(filters.items())))
+    samplers = st.session_state.bank_samplers
+    sampler = samplers.get(key)
+    if sampler is None:
+        groups = content.load_question_bank().groups("topic", unit=UNIT, **filters)
+        sampler = WeightedSampler(groups, {topic: topic_weight(topic) for topic in groups})
+        samplers[key] = sampler
+        if len(samplers) > SAMPLERS_PER_SESSION:
+            samplers.popitem(last=False)
+    else:
+        samplers.move_to_end(key)
+    return sampler
+
+
+def record_topic_result(q, correct: bool):
+    """Adds an answer to the student's record for its topic and reweights the samplers."""
+    topic = q.get("topic")
+    if topic is None:
+        return
+    # a new dict each time, as for mcq_stats: the queued save must not change after the fact
+    record = dict(st.session_state.topic_record)
+    answered, missed = record.get(topic, (0, 0))
+    record[topic] = [answered + 1, missed + (not correct)]
+    st.session_state.topic_record = record
+    weight = topic_weight(topic)
+    for sampler in st.session_state.bank_samplers.values():
+        if topic in sampler:
+            sampler.set_weight(topic, weight)
+    save_progress("topics", record)
+
+
+def random_bank_ref(**filters):
+    """
+    Next bank question id from the current unit matching `filters` (topic, skill,
+    difficulty; None means any), drawn by the session's sampler, or None if nothing
+    matches.
+    """
+    with METRICS.timer("bank_sample_seconds", kind="single"):
+        return bank_sampler(**filters).draw()
+
+
+def sample_test_questions(k: int, **filters):
+    """
+    Draws `k` distinct question refs from the matching bank questions plus the stored
+    AI questions, in proportion to how many there are of each. Bank questions come
+    from the session's sampler, so a test doesn't repeat questions already practised.
+    Stored questions only carry a topic, so they are left out when filtering by skill
+    or difficulty.
+    """
+    with METRICS.timer("bank_sample_seconds", kind="test"):
+        sampler = bank_sampler(**filters)
+        store = get_question_store()
+        use_store = filters.get("skill") is None and filters.get("difficulty") is None
+        stored = store.count(filters.get("topic")) if use_store else 0
+        total = len(sampler) + stored
+        picks = random.sample(range(total), k=min(k, total))
+        refs = sampler.sample(sum(1 for i in picks if i < len(sampler)))
+        refs += [-qid for qid, _ in store.sample(len(picks) - len(refs), topic=filters.get("topic"), with_ids=True)]
+        random.shuffle(refs)
+        return array("i", refs)
+
+
+def bank_filters(key_prefix: str):
+    """
+    Topic / skill / difficulty selectors for the bank; returns the chosen filters.
+    """
+    bank = content.load_question_bank()
+    filters = {}
+    for col, field in zip(st.columns(3), ("topic", "skill", "difficulty")):
+        choice = col.selectbox(
+            field.capitalize(),
+            ["Any"] + bank.values(field),
+            key=f"{key_prefix}_{field}",
+        )
+        filters[field] = None if choice == "Any" else choice
+    return filters
+
+
+def ready_ai_ref(topic: str):
+    """Ref of an AI question available without an API call: prefetched, else stored earlier."""
+    ref = None
+    with METRICS.timer("cache_lookup_seconds", cache="prefetch"):
+        ai_q = get_prefetcher().get(topic)
+    count_lookup("prefetch", ai_q is not None)
+    if ai_q is not None:
+        ref = store_ref(ai_q, topic)
+    if ref is None:
+        with METRICS.timer("cache_lookup_seconds", cache="question_store_sample"):
+            stored = get_question_store().sample(1, topic=topic, with_ids=True)
+        count_lookup("question_store_sample", bool(stored))
+        ref = -stored[0][0] if stored else None
+    return ref
+
+
+def fallback_bank_ref(topic: str):
+    """Bank question for when no AI question can be had, on the same topic if the bank has it."""
+    ref = random_bank_ref(topic=topic)
+    return ref if ref is not None else random_bank_ref()
+
+
+def get_new_mcq(use_ai: bool, topic: str = DEFAULT_TOPIC, filters=None):
+    """Ref of the next practice question, or None if nothing matches."""
     if use_ai:
-        ai_q = generate_ai_mcq()
-        if ai_q is not None:
-            return ai_q
-    # fallback to bank
-    return get_random_bank_question()
+        # only block on the API if nothing is ready
+        ref = ready_ai_ref(topic)
+        if ref is None:
+            ai_q = get_coalescer().get(topic)
+            if ai_q is not None:
+                ref = store_ref(ai_q, topic)
+        return ref if ref is not None else fallback_bank_ref(topic)
+    return random_bank_ref(**(filters or {}))
 
 
 def display_mcq(q, key_prefix: str):
@@ -552,7 +665,7 @@ def display_mcq(q, key_prefix: str):
         key=f"{key_prefix}_choice",
     )
 
-    if st.button("Check answer", key=f"{key_prefix}_check"):
+    if st.button("Check answer", key=f"{key_prefix}_check", on_click=record_mcq_answer, args=(q, key_prefix)):
         chosen_index = q["options"].index(choice)
         chosen_letter = "ABCD"[chosen_index]
         correct_letter = q["correct"]
@@ -564,23 +677,56 @@ def display_mcq(q, key_prefix: str):
             st.info(f"Explanation: {q['explanation']}")
 
 
-# ---------- PAGES ----------
+# ---------- CALLBACKS & FRAGMENTS ----------
+# Buttons change state in on_click callbacks (which run before the next script run)
+# instead of mutating state and calling st.rerun(), and each page's interactive part is
+# an st.fragment, so a click costs one partial run instead of two full ones.
 
-if page == "Study Guide":
-    st.header("Full Unit 5 Study Guide")
-    st.markdown(
-        "Use this as your main reference. Scroll, search (Ctrl+F), and connect it to flashcards and questions."
-    )
-    st.markdown(STUDY_GUIDE_MD)
+def count_action():
+    st.session_state.run_counts["actions"] += 1
 
-elif page == "Flashcards":
-    st.header("Flashcards: Key Terms & People")
 
+def record_mcq_answer(q, key_prefix: str):
+    count_action()
+    if st.session_state.get(f"{key_prefix}_checked"):
+        return
+    st.session_state[f"{key_prefix}_checked"] = True
+    stats = dict(st.session_state.mcq_stats)
+    stats["answered"] += 1
+    correct = st.session_state.get(f"{key_prefix}_choice") == q["options"]["ABCD".index(q["correct"])]
+    stats["correct"] += correct
+    st.session_state.mcq_stats = stats
+    save_progress("mcq", stats)
+    record_topic_result(q, correct)
+
+
+def count_fragment_run():
+    # a fragment also executes as part of a full run; only count its own reruns
+    if not st.session_state.in_full_run:
+        st.session_state.run_counts["fragment"] += 1
+
+
+def toggle_answer():
+    count_action()
+    st.session_state.show_answer = not st.session_state.show_answer
+
+
+def step_flashcard(step: int, deck_size: int):
+    count_action()
+    st.session_state.flashcard_index = (st.session_state.flashcard_index + step) % deck_size
+    st.session_state.show_answer = False
+    save_progress(f"flashcards_{UNIT}", st.session_state.flashcard_index)
+
+
+@st.fragment
+@METRICS.timed("fragment_render_seconds", fragment="browse")
+def flashcard_panel(cards):
+    count_fragment_run()
     col1, col2, col3 = st.columns([1, 2, 1])
 
     with col2:
-        card = FLASHCARDS[st.session_state.flashcard_index]
-        st.markdown(f"### Term")
+        card = cards[st.session_state.flashcard_index % len(cards)]
+        st.markdown("### Term")
         st.markdown(f"**{card['term']}**")
 
         if st.session_state.show_answer:
@@ -590,33 +736,448 @@ elif page == "Flashcards":
         else:
             st.info("Click **Show Answer** to reveal the definition.")
 
-        show = st.button(
-            "Show Answer" if not st.session_state.show_answer else "Hide Answer"
+        st.button(
+            "Show Answer" if not st.session_state.show_answer else "Hide Answer",
+            on_click=toggle_answer,
         )
-        if show:
-            st.session_state.show_answer = not st.session_state.show_answer
-            st.rerun()
 
     with col1:
-        if st.button("◀ Previous"):
-            st.session_state.flashcard_index = (st.session_state.flashcard_index - 1) % len(
-                FLASHCARDS
-            )
-            st.session_state.show_answer = False
-            st.rerun()
+        st.button("◀ Previous", on_click=step_flashcard, args=(-1, len(cards)))
 
     with col3:
-        if st.button("Next ▶"):
-            st.session_state.flashcard_index = (st.session_state.flashcard_index + 1) % len(
-                FLASHCARDS
+        st.button("Next ▶", on_click=step_flashcard, args=(1, len(cards)))
+
+    st.caption(
+        f"Card {st.session_state.flashcard_index % len(cards) + 1} of {len(cards)}"
+    )
+
+
+@st.cache_resource
+def get_srs_schedulers():
+    """
+    (student ID, unit) -> srs.Scheduler for the most recently active students, shared by
+    every session of the server process, and the lock guarding it. Schedules are saved to
+    the progress store on every review, so dropping the least recent ones loses nothing.
+    """
+    return OrderedDict(), threading.Lock()
+
+
+def get_scheduler(deck_size: int) -> srs.Scheduler:
+    if not student_id:
+        key = f"srs_{UNIT}"
+        if key not in st.session_state:
+            st.session_state[key] = srs.Scheduler(deck_size)
+        scheduler = st.session_state[key]
+    elif MULTIPROCESS:
+        # other processes may review this student's cards too, so always load the saved copy
+        saved = get_progress_store().get(student_id, f"srs_{UNIT}")
+        scheduler = srs.Scheduler.loads(saved) if saved else srs.Scheduler(deck_size)
+    else:
+        schedulers, lock = get_srs_schedulers()
+        key = (student_id, UNIT)
+        with lock:
+            scheduler = schedulers.get(key)
+            if scheduler is not None:
+                schedulers.move_to_end(key)
+        count_lookup("srs", scheduler is not None)
+        if scheduler is None:
+            saved = get_progress_store().get(student_id, f"srs_{UNIT}")
+            scheduler = srs.Scheduler.loads(saved) if saved else srs.Scheduler(deck_size)
+            with lock:
+                scheduler = schedulers.setdefault(key, scheduler)
+                while len(schedulers) > SRS_CACHE_SIZE:
+                    schedulers.popitem(last=False)
+    scheduler.resize(deck_size)
+    return scheduler
+
+
+def next_review_card(scheduler: srs.Scheduler, ahead: bool = False):
+    st.session_state.srs_card = scheduler.next_card(ahead=ahead)
+    st.session_state.show_answer = False
+
+
+def rate_card(scheduler: srs.Scheduler, card: int, grade: int):
+    count_action()
+    scheduler.review(card, grade)
+    save_progress(f"srs_{UNIT}", scheduler.dumps())
+    next_review_card(scheduler)
+
+
+def review_ahead(scheduler: srs.Scheduler):
+    count_action()
+    next_review_card(scheduler, ahead=True)
+
+
+@st.fragment
+@METRICS.timed("fragment_render_seconds", fragment="review")
+def review_panel(cards):
+    count_fragment_run()
+    scheduler = get_scheduler(len(cards))
+    card_index = st.session_state.get("srs_card")
+    if card_index is None or card_index >= len(cards):
+        next_review_card(scheduler)
+        card_index = st.session_state.srs_card
+
+    stats = scheduler.stats()
+    st.caption(f"Due: {stats['due']} · New: {stats['new']} · Learned: {stats['learned']}")
+
+    if card_index is None:
+        wait = max(0, stats["next_due"] - time.time()) if stats["next_due"] else 0
+        st.success(f"All caught up! The next card is due in {wait / 60:.0f} min.")
+        st.button("Review ahead", on_click=review_ahead, args=(scheduler,))
+        return
+
+    card = cards[card_index]
+    st.markdown("### Term")
+    st.markdown(f"**{card['term']}**")
+
+    if not st.session_state.show_answer:
+        st.button("Show Answer", key="srs_show", on_click=toggle_answer)
+        return
+
+    st.markdown("---")
+    st.markdown("### Definition")
+    st.write(card["definition"])
+    st.write("How well did you know it?")
+    for col, (grade, label) in zip(st.columns(len(srs.GRADES)), enumerate(srs.GRADES)):
+        col.button(label, key=f"srs_grade_{grade}", on_click=rate_card, args=(scheduler, card_index, grade))
+
+
+def new_mcq(use_ai: bool, topic: str, filters):
+    count_action()
+    st.session_state.mcq_stream = None
+    if use_ai and STREAM_QUESTIONS and OPENAI_ENABLED:
+        # nothing ready: stream a question instead of waiting for the whole reply
+        ref = ready_ai_ref(topic)
+        if ref is None:
+            st.session_state.mcq_stream = get_stream_coalescer().get(topic)
+            if st.session_state.mcq_stream is None:
+                ref = fallback_bank_ref(topic)
+        st.session_state.current_mcq = ref
+    else:
+        st.session_state.current_mcq = get_new_mcq(use_ai, topic, filters)
+    st.session_state.mcq_checked = False
+    # Reset any old selection
+    st.session_state.pop("mcq_choice", None)
+
+
+def show_question_stream(stream):
+    """
+    Draws a streaming AI question as it arrives: the stem, then each option, with
+    "Check answer" disabled. Once the question is complete and has validated it
+    becomes the current question (a bank question if generation failed). A rerun
+    while it streams picks up where this one stopped.
+    """
+    body = st.empty()
+    check = st.empty()
+    check.button("Check answer", key="mcq_check_pending", disabled=True)
+    shown = -1
+    while True:
+        version = stream.wait(shown, timeout=1.0)
+        if version != shown:
+            shown = version
+            partial = stream.partial
+            with body.container():
+                st.subheader("Question")
+                st.write(partial.get("question") or "…")
+                options = partial.get("options")
+                for option in options if isinstance(options, list) else []:
+                    if isinstance(option, str):
+                        st.markdown(f"◯ {option}")
+                if not stream.done:
+                    st.caption("Generating…")
+        if stream.done:
+            break
+        time.sleep(STREAM_REDRAW_SECONDS)
+    body.empty()
+    check.empty()
+    st.session_state.mcq_stream = None
+    ref = stream.result  # stored by keep_streamed_question
+    st.session_state.current_mcq = ref if ref is not None else fallback_bank_ref(stream.topic)
+
+
+@st.fragment
+@METRICS.timed("fragment_render_seconds", fragment="mcq")
+def mcq_panel(use_ai: bool, topic: str, filters):
+    count_fragment_run()
+    st.button("New Question", key="new_mcq_btn", on_click=new_mcq, args=(use_ai, topic, filters))
+
+    if st.session_state.get("mcq_stream") is not None:
+        show_question_stream(st.session_state.mcq_stream)
+    q = None
+    if st.session_state.current_mcq is not None:
+        q = resolve_question(st.session_state.current_mcq)
+    if q is not None:
+        display_mcq(q, key_prefix="mcq")
+    elif st.session_state.current_mcq is not None:
+        st.info(f"{UNAVAILABLE} Click **New Question** for another.")
+    else:
+        st.info("Click **New Question** to begin.")
+
+    record = st.session_state.mcq_stats
+    if record["answered"]:
+        st.caption(f"Your record: {record['correct']} of {record['answered']} correct")
+
+    if use_ai:
+        with st.expander("AI question queue"):
+            stats = get_prefetcher().stats()
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Ready questions", stats["depth"].get(topic, 0))
+            c2.metric("Hits / misses", f"{stats['hits']} / {stats['misses']}")
+            avg = stats["avg_refill_seconds"]
+            c3.metric("Avg refill latency", f"{avg:.1f}s" if avg is not None else "—")
+            st.caption(
+                f"Refills in flight: {sum(stats['in_flight'].values())} · "
+                f"completed: {stats['refills']} · failed: {stats['failed_refills']}"
+            )
+            breaker = CALL_POLICY.breaker
+            st.caption(
+                f"Circuit breaker: {breaker.state} · trips: {breaker.trips} · "
+                f"calls skipped while open: {breaker.rejected}"
+            )
+            limits = CALL_POLICY.limiter.stats()
+            avg_wait = limits["avg_wait_seconds"]
+            st.caption(
+                f"Rate limiter: {limits['delayed']} of {limits['acquired']} calls delayed · "
+                f"avg wait {avg_wait or 0:.2f}s · max {limits['max_wait_seconds']:.2f}s · "
+                f"timed out: {limits['timeouts']} · waiting now: {limits['waiting']}"
+            )
+            coalesced = get_coalescer().stats()
+            if coalesced["batches"]:
+                st.caption(
+                    f"Coalescing: {coalesced['requests']} blocking requests served by "
+                    f"{coalesced['batches']} API calls ({coalesced['coalescing_ratio']:.1f}×)"
+                )
+            streamed = get_stream_coalescer().stats()
+            if streamed["streams"]:
+                st.caption(
+                    f"Streaming: {streamed['requests']} waiting students served by "
+                    f"{streamed['streams']} streamed calls ({streamed['coalescing_ratio']:.1f}×)"
+                )
+            dedup = dedup_index()
+            if dedup.rejected:
+                st.caption(
+                    f"Near-duplicates dropped: {dedup.rejected} of "
+                    f"{dedup.admitted + dedup.rejected} generated questions"
+                )
+            for mode, m in ai_mcq.STATS.summary().items():
+                if not m["calls"]:
+                    continue
+                cost = (
+                    f"{m['tokens_per_question']:.0f} tokens/question · {m['seconds_per_question']:.1f} s/question · "
+                    if m["questions"] else ""
+                )
+                st.caption(
+                    f"{mode.capitalize()} generation: {m['questions']} questions in {m['calls']} calls · {cost}"
+                    f"wasted: {m['wasted_call_rate']:.0%} of calls, {m['wasted_token_rate'] or 0:.0%} of tokens"
+                    + (f" · {m['recovered']} saved by re-asking" if m["recovered"] else "")
+                )
+
+
+def start_test(num_questions: int, filters):
+    count_action()
+    # sample questions from bank + stored AI questions
+    st.session_state.test_questions = sample_test_questions(num_questions, **filters)
+    st.session_state.test_index = 0
+    st.session_state.test_score = 0
+    st.session_state.test_answers = bytearray([UNANSWERED]) * len(st.session_state.test_questions)
+    st.session_state.test_feedback = None
+    save_test_progress()
+
+
+def submit_test_answer(q_idx: int):
+    count_action()
+    q = resolve_question(st.session_state.test_questions[q_idx])
+    choice = st.session_state.get(f"test_choice_{q_idx}")
+    code = q["options"].index(choice) if q is not None and choice in q["options"] else 4
+
+    st.session_state.test_answers[q_idx] = code
+    if q is not None:
+        correct = ANSWER_CODES[code] == q["correct"]
+        st.session_state.test_score += correct
+        record_topic_result(q, correct)
+    # shown above the next question, so the feedback survives the move forward
+    st.session_state.test_feedback = q_idx
+    st.session_state.test_index += 1
+    save_test_progress()
+
+
+@st.fragment
+@METRICS.timed("fragment_render_seconds", fragment="test")
+def test_panel(num_questions: int, filters):
+    count_fragment_run()
+    st.button("Start / Reset Test", on_click=start_test, args=(num_questions, filters))
+
+    refs = st.session_state.test_questions
+    if not refs:
+        st.info("Click **Start / Reset Test** to begin a practice test.")
+        return
+
+    answers = st.session_state.test_answers
+    last = st.session_state.test_feedback
+    if last is not None:
+        q = resolve_question(refs[last])
+        chosen_letter = ANSWER_CODES[answers[last]]
+        if q is None:
+            st.warning(f"Question {last + 1}: {UNAVAILABLE}")
+        elif chosen_letter == q["correct"]:
+            st.success(f"Question {last + 1}: Correct! ({q['correct']})")
+        else:
+            st.error(
+                f"Question {last + 1}: Incorrect. You chose {chosen_letter}, "
+                f"correct is {q['correct']}."
             )
-            st.session_state.show_answer = False
-            st.rerun()
+        if q is not None and q.get("explanation"):
+            st.info(f"Explanation: {q['explanation']}")
+
+    q_idx = st.session_state.test_index
+
+    if q_idx < len(refs):
+        q = resolve_question(refs[q_idx])
+        st.subheader(f"Question {q_idx + 1} of {len(refs)}")
+        if q is None:
+            st.warning(UNAVAILABLE)
+            st.button("Skip", key=f"submit_{q_idx}", on_click=submit_test_answer, args=(q_idx,))
+            return
+        st.write(q["question"])
+
+        st.radio(
+            "Select your answer:",
+            q["options"],
+            key=f"test_choice_{q_idx}",
+        )
 
+        st.button("Submit Answer", key=f"submit_{q_idx}", on_click=submit_test_answer, args=(q_idx,))
+    else:
+        # Test finished
+        total = len(refs)
+        score = st.session_state.test_score
+        st.success(f"Test complete! You scored {score} out of {total}.")
+        percent = round(100 * score / total)
+        st.write(f"Percentage: **{percent}%**")
+
+        st.write("Review:")
+        for i, ref in enumerate(refs):
+            q = resolve_question(ref)
+            if q is None:
+                st.markdown(f"**Q{i + 1}** — {UNAVAILABLE}")
+                continue
+            user_ans = ANSWER_CODES[answers[i]] if answers[i] != UNANSWERED else "—"
+            correct_letter = q["correct"]
+            label = "✅" if user_ans == correct_letter else "❌"
+            st.markdown(f"**Q{i + 1} {label}** — Your answer: {user_ans}, Correct: {correct_letter}")
+            if q.get("explanation"):
+                st.caption(q["explanation"])
+
+        st.info("You can click **Start / Reset Test** above to generate a new set of questions.")
+
+
+# ---------- ADMIN ----------
+
+def check_admin_password():
+    """on_change callback for the admin password field; the field is cleared either way."""
+    password = st.session_state.pop("admin_password", "")
+    # compared as bytes: compare_digest rejects str with non-ASCII characters
+    st.session_state.admin_ok = bool(ADMIN_PASSWORD) and hmac.compare_digest(
+        password.encode("utf-8"), ADMIN_PASSWORD.encode("utf-8")
+    )
+
+
+def format_labels(labels) -> str:
+    return ", ".join(f"{k}={v}" for k, v in labels.items())
+
+
+def metrics_panel():
+    if METRICS_SAMPLE_RATE <= 0:
+        st.info("Instrumentation is off. Set STUDYHUB_METRICS_SAMPLE above 0 to record timings.")
+        return
+    snapshot = METRICS.snapshot()
     st.caption(
-        f"Card {st.session_state.flashcard_index + 1} of {len(FLASHCARDS)}"
+        f"Process {os.getpid()} · {METRICS_SAMPLE_RATE:.0%} of timings sampled"
+        + (f" · exported to {METRICS_FILE.format(pid=os.getpid())}" if METRICS_FILE else "")
     )
 
+    def ms(seconds):
+        return round(seconds * 1000, 2) if seconds is not None else None
+
+    st.subheader("Timings")
+    st.dataframe(
+        [
+            {
+                "metric": h["name"], "labels": format_labels(h["labels"]), "count": h["count"],
+                "mean ms": ms(h["mean"]), "p50 ms": ms(h["p50"]), "p95 ms": ms(h["p95"]),
+                "p99 ms": ms(h["p99"]), "max ms": ms(h["max"]),
+            }
+            for h in snapshot["histograms"]
+        ],
+        hide_index=True,
+    )
+    if snapshot["counters"]:
+        st.subheader("Counters")
+        st.dataframe(
+            [
+                {"metric": c["name"], "labels": format_labels(c["labels"]), "value": c["value"]}
+                for c in snapshot["counters"]
+            ],
+            hide_index=True,
+        )
+    c1, c2 = st.columns(2)
+    c1.download_button(
+        "Download Prometheus text", METRICS.prometheus_text(), file_name="studyhub.prom", mime="text/plain",
+    )
+    c2.button("Reset metrics", on_click=METRICS.reset)
+
+
+# ---------- PAGES ----------
+
+page_start = time.perf_counter()
+
+if page == "Study Guide":
+    st.header("Full Unit 5 Study Guide")
+    st.markdown(
+        "Use this as your main reference. Open sections from the contents and connect them to flashcards and questions."
+    )
+    if STATIC_BUILT:
+        st.caption(f"Just reading? The [static guide]({STATIC_URL}/{UNIT}/guide.html) has every section on one page.")
+
+    # only ticked sections are rendered, so the page payload doesn't grow with the guide
+    sections = content.load_guide_sections(UNIT)
+    toc_col, body_col = st.columns([1, 3])
+    with toc_col:
+        st.markdown("**Contents**")
+        opened = [
+            i for i, (title, _) in enumerate(sections)
+            if st.checkbox(title, key=f"guide_{UNIT}_{i}")
+        ]
+
+    render_start = time.perf_counter()
+    with body_col:
+        if not opened:
+            st.info("Tick a section in the contents to read it.")
+        for i in opened:
+            st.markdown(sections[i][1])
+    render_ms = (time.perf_counter() - render_start) * 1000
+
+    sent = sum(len(sections[i][1].encode("utf-8")) for i in opened)
+    total = sum(len(md.encode("utf-8")) for _, md in sections)
+    st.caption(
+        f"Showing {len(opened)} of {len(sections)} sections · "
+        f"{sent / 1024:.1f} of {total / 1024:.1f} KB of guide text sent · rendered in {render_ms:.1f} ms"
+    )
+
+elif page == "Flashcards":
+    st.header("Flashcards: Key Terms & People")
+    if STATIC_BUILT:
+        st.caption(f"Just browsing? The [static flip cards]({STATIC_URL}/{UNIT}/flashcards.html) flip in your browser.")
+    flashcard_mode = st.radio(
+        "Mode", ["Review", "Browse"], key="flashcard_mode", horizontal=True,
+        help="Review schedules cards by how well you know them; Browse walks the deck in order.",
+    )
+    if flashcard_mode == "Review":
+        review_panel(content.load_flashcards(UNIT))
+    else:
+        flashcard_panel(content.load_flashcards(UNIT))
+
 elif page == "Practice MCQs":
     st.header("Practice Multiple-Choice Questions")
 
@@ -632,6 +1193,12 @@ elif page == "Practice MCQs":
         use_ai = (mode == "AI-generated (if working)")
         if use_ai:
             st.success("AI generation is enabled (requires valid OPENAI_API_KEY).")
+            topic_choice = st.selectbox("Topic", ["Any Unit 5 topic"] + ai_topics())
+            topic = DEFAULT_TOPIC if topic_choice == "Any Unit 5 topic" else topic_choice
+            if CALL_POLICY.breaker.state in ("open", "half_open"):
+                st.warning("The AI service is having trouble right now, so questions come from the bank for a bit.")
+            # start filling the queue before the first click
+            get_prefetcher().warm(topic)
     else:
         st.warning(
             "OpenAI not configured. Using built-in question bank only. "
@@ -639,89 +1206,50 @@ elif page == "Practice MCQs":
         )
         use_ai = False
 
-    if st.button("New Question", key="new_mcq_btn"):
-        st.session_state.current_mcq = get_new_mcq(use_ai)
-        # Reset any old selection
-        st.session_state.pop("mcq_choice", None)
-        st.rerun()
+    filters = None
+    if not use_ai:
+        topic = DEFAULT_TOPIC
+        filters = bank_filters("mcq")
+        if content.load_question_bank().count(unit=UNIT, **filters) == 0:
+            st.warning("No bank questions match those filters yet.")
 
-    if st.session_state.current_mcq is None:
-        st.info("Click **New Question** to begin.")
-    else:
-        display_mcq(st.session_state.current_mcq, key_prefix="mcq")
+    mcq_panel(use_ai, topic, filters)
 
 elif page == "Practice Test":
     st.header("Full Practice Test")
 
     st.write(
-        "This mode gives you a mini test: a set of questions from the bank (no AI) so you can simulate timed practice."
+        "This mode gives you a mini test: a set of questions from the bank and previously generated AI questions "
+        "(no new AI calls) so you can simulate timed practice."
     )
 
+    test_filters = bank_filters("test")
+
     num_questions = st.selectbox(
         "Number of questions for this test:",
         [5, 10, 15],
         index=1,
     )
 
-    if st.button("Start / Reset Test"):
-        # sample questions from bank
-        st.session_state.test_questions = random.sample(
-            MCQ_QUESTIONS, k=min(num_questions, len(MCQ_QUESTIONS))
-        )
-        st.session_state.test_index = 0
-        st.session_state.test_score = 0
-        st.session_state.test_answers = {}
-        st.rerun()
+    test_panel(num_questions, test_filters)
 
-    if not st.session_state.test_questions:
-        st.info("Click **Start / Reset Test** to begin a practice test.")
+elif page == "Admin":
+    st.header("Admin: Performance Metrics")
+    if not st.session_state.get("admin_ok"):
+        st.text_input("Admin password", type="password", key="admin_password", on_change=check_admin_password)
+        if "admin_ok" in st.session_state:
+            st.error("Wrong password.")
     else:
-        q_idx = st.session_state.test_index
-        questions = st.session_state.test_questions
-
-        if q_idx < len(questions):
-            q = questions[q_idx]
-            st.subheader(f"Question {q_idx + 1} of {len(questions)}")
-            st.write(q["question"])
-
-            choice_key = f"test_choice_{q_idx}"
-            choice = st.radio(
-                "Select your answer:",
-                q["options"],
-                key=choice_key,
-            )
+        metrics_panel()
 
-            if st.button("Submit Answer", key=f"submit_{q_idx}"):
-                chosen_index = q["options"].index(choice)
-                chosen_letter = "ABCD"[chosen_index]
-                correct_letter = q["correct"]
-
-                st.session_state.test_answers[q_idx] = chosen_letter
-                if chosen_letter == correct_letter:
-                    st.session_state.test_score += 1
-                    st.success(f"Correct! ({correct_letter})")
-                else:
-                    st.error(f"Incorrect. You chose {chosen_letter}, correct is {correct_letter}.")
-                if q.get("explanation"):
-                    st.info(f"Explanation: {q['explanation']}")
-
-                st.session_state.test_index += 1
-                st.rerun()
-        else:
-            # Test finished
-            total = len(st.session_state.test_questions)
-            score = st.session_state.test_score
-            st.success(f"Test complete! You scored {score} out of {total}.")
-            percent = round(100 * score / total)
-            st.write(f"Percentage: **{percent}%**")
-
-            st.write("Review:")
-            for i, q in enumerate(st.session_state.test_questions):
-                user_ans = st.session_state.test_answers.get(i, "—")
-                correct_letter = q["correct"]
-                label = "✅" if user_ans == correct_letter else "❌"
-                st.markdown(f"**Q{i + 1} {label}** — Your answer: {user_ans}, Correct: {correct_letter}")
-                if q.get("explanation"):
-                    st.caption(q["explanation"])
-
-            st.info("You can click **Start / Reset Test** above to generate a new set of questions.")
+METRICS.observe("page_render_seconds", time.perf_counter() - page_start, page=page)
+
+if os.getenv("STUDYHUB_DEBUG"):
+    counts = st.session_state.run_counts
+    st.sidebar.caption(
+        f"Script runs: {counts['full']} full · {counts['fragment']} fragment · "
+        f"{counts['actions']} button actions"
+    )
+
+# must stay the last statement: fragment reruns start after this point
+st.session_state.in_full_run = False
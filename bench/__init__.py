@@ -0,0 +1,4 @@
+"""
+Offline benchmarks for the Study Hub. Run from the repository root, e.g.
+`python -m bench.bench_app`.
+"""
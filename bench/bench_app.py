@@ -0,0 +1,394 @@
+"""
+Offline benchmark for the page handlers and question paths.
+
+Drives app.py through Streamlit's AppTest and the AI path through a local
+FakeOpenAIServer, so no API key or network is needed:
+
+    python -m bench.bench_app
+    python -m bench.bench_app --repeat 50 --latency 1.0 --json bench.json
+
+Reports per-interaction rerun latency for each page, script runs per
+button action, AI-path latency with a healthy upstream and with fallback to
+the bank, the cost of responses that fail to parse, a classroom burst
+with and without coalescing, the cost of the timing hooks, per-call
+latency with a new OpenAI client per call against the shared pooled one,
+how soon a streamed question starts to show against a whole reply, and
+the cost of drawing questions from a large bank without replacement.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from studyhub import ai_mcq, openai_client
+from studyhub.fake_openai import FakeOpenAIServer
+from studyhub.metrics import Metrics
+from studyhub.ratelimit import BatchCoalescer, RateLimiter
+from studyhub.resilience import CallPolicy, CircuitBreaker
+from studyhub.sampler import WeightedSampler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+AI_ENV = ("OPENAI_API_KEY", "OPENAI_BASE_URL", "MCQ_STORE_PATH")
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {"n": 0}
+
+    def pct(p):
+        return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))]
+
+    return {
+        "n": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": pct(50) * 1000,
+        "p95_ms": pct(95) * 1000,
+        "p99_ms": pct(99) * 1000,
+        "max_ms": samples[-1] * 1000,
+    }
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def fresh_app(env):
+    """New AppTest session with process-wide caches cleared and `env` applied."""
+    for key in AI_ENV:
+        os.environ.pop(key, None)
+    os.environ.update(env)
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    assert not at.exception, at.exception
+    return at
+
+
+def click(at, label):
+    next(b for b in at.button if b.label == label).click().run()
+    assert not at.exception, at.exception
+
+
+def goto(at, page):
+    at.sidebar.radio[0].set_value(page).run()
+    assert not at.exception, at.exception
+
+
+def bench_pages(repeat, store_path):
+    """Rerun latency of each page's interactions, bank-only (no API key)."""
+    results = {}
+    at = fresh_app({"MCQ_STORE_PATH": store_path})
+
+    results["Study Guide: open"] = summarize(
+        [timed(lambda: goto(at, "Study Guide")) for _ in range(repeat)]
+    )
+
+    goto(at, "Flashcards")
+    review = []
+    for _ in range(repeat):
+        click(at, "Show Answer")
+        review.append(timed(lambda: click(at, "Good")))
+    results["Flashcards: grade card (review)"] = summarize(review)
+
+    at.radio(key="flashcard_mode").set_value("Browse").run()
+    results["Flashcards: Show Answer"] = summarize(
+        [timed(lambda: click(at, "Hide Answer" if i % 2 else "Show Answer")) for i in range(repeat)]
+    )
+    results["Flashcards: Next"] = summarize(
+        [timed(lambda: click(at, "Next ▶")) for _ in range(repeat)]
+    )
+
+    goto(at, "Practice MCQs")
+    results["Practice MCQs: New Question (bank)"] = summarize(
+        [timed(lambda: click(at, "New Question")) for _ in range(repeat)]
+    )
+
+    goto(at, "Practice Test")
+    results["Practice Test: Start / Reset"] = summarize(
+        [timed(lambda: click(at, "Start / Reset Test")) for _ in range(repeat)]
+    )
+    submit = []
+    for _ in range(repeat):
+        click(at, "Start / Reset Test")
+        submit.append(timed(lambda: click(at, "Submit Answer")))
+    results["Practice Test: Submit Answer"] = summarize(submit)
+
+    # AppTest always replays the whole script, so fragment runs show up as full runs here
+    counts = at.session_state.run_counts
+    results["script runs per action"] = {
+        "full": counts["full"] / counts["actions"],
+        "fragment": counts["fragment"] / counts["actions"],
+    }
+    return results
+
+
+def bench_ai(repeat, server, store_dir):
+    """AI path through the fake endpoint: healthy, failing (fallback) and malformed."""
+    from openai import OpenAI
+
+    results = {}
+    client = OpenAI(api_key="fake", base_url=server.base_url, max_retries=0)
+    context = "## Atlantic Revolutions\n" + "Enlightenment ideas and revolutions. " * 100
+
+    def generate_direct(policy):
+        return lambda: ai_mcq.generate_mcq(client, "Atlantic Revolutions", context, policy)
+
+    server.error_rate = server.malformed_rate = 0.0
+    results["generate_mcq: healthy upstream"] = summarize(
+        [timed(generate_direct(CallPolicy())) for _ in range(repeat)]
+    )
+
+    # clicking "New Question" in the app: first click may block, later ones hit the prefetch queue
+    env = {
+        "OPENAI_API_KEY": "fake",
+        "OPENAI_BASE_URL": server.base_url,
+        "MCQ_STORE_PATH": os.path.join(store_dir, "healthy.sqlite3"),
+    }
+    at = fresh_app(env)
+    goto(at, "Practice MCQs")
+    clicks = []
+    for _ in range(repeat):
+        clicks.append(timed(lambda: click(at, "New Question")))
+        time.sleep(server.latency)  # give the prefetch pool time to refill, like a student reading
+    results["New Question (AI, healthy upstream)"] = summarize(clicks)
+
+    # failing upstream: retries until the breaker trips, then straight to the bank
+    server.error_rate = 1.0
+    env["MCQ_STORE_PATH"] = os.path.join(store_dir, "failing.sqlite3")
+    at = fresh_app(env)
+    goto(at, "Practice MCQs")
+    clicks = [timed(lambda: click(at, "New Question")) for _ in range(repeat)]
+    results["New Question (AI, failing upstream -> bank)"] = summarize(clicks)
+    results["generate_mcq: failing upstream, breaker closed"] = summarize(
+        [timed(generate_direct(CallPolicy(breaker=CircuitBreaker(failure_threshold=10**9))))
+         for _ in range(repeat)]
+    )
+    server.error_rate = 0.0
+
+    # broken or incomplete replies: repaired locally or re-asked where possible, else paid for and lost
+    server.malformed_rate = 1.0
+    ai_mcq.STATS = ai_mcq.GenerationStats()
+    malformed = [timed(generate_direct(CallPolicy())) for _ in range(repeat)]
+    server.malformed_rate = 0.0
+    single = ai_mcq.STATS.summary()["single"]
+    results["generate_mcq: malformed response"] = {
+        **summarize(malformed),
+        "wasted_tokens_per_call": single["wasted_tokens"] / single["calls"],
+        "wasted_call_rate": single["wasted_call_rate"],
+    }
+
+    # a class clicking "New Question" together: one blocking request per student at once
+    students = 24
+    policy = CallPolicy(limiter=RateLimiter(requests_per_minute=120))
+
+    def burst(get_question):
+        before = server.stats["requests"]
+        with ThreadPoolExecutor(max_workers=students) as pool:
+            samples = list(pool.map(lambda _: timed(get_question), range(students)))
+        return {**summarize(samples), "upstream_calls": server.stats["requests"] - before}
+
+    results[f"burst of {students}: one call each, 120 rpm"] = burst(generate_direct(policy))
+    coalescer = BatchCoalescer(
+        lambda topic, n: ai_mcq.generate_mcq_batch(client, n, topic, context, policy)
+        if n > 1 else [q for q in [ai_mcq.generate_mcq(client, topic, context, policy)] if q],
+    )
+    results[f"burst of {students}: coalesced, 120 rpm"] = burst(lambda: coalescer.get("Atlantic Revolutions"))
+    return results
+
+
+def bench_client(repeat, latency, connect_latency, store_dir):
+    """
+    A new OpenAI client per call (what a module-level `OpenAI()` amounted to, as the
+    script reran on every click) against one pooled client, with each new connection
+    delayed by `connect_latency` to stand in for the TCP/TLS handshake.
+    """
+    from openai import OpenAI
+
+    results = {}
+    context = "## Atlantic Revolutions\n" + "Enlightenment ideas and revolutions. " * 100
+    with FakeOpenAIServer(latency=latency, seed=0, connect_latency=connect_latency) as server:
+        def call(client):
+            return ai_mcq.generate_mcq(client, "Atlantic Revolutions", context, CallPolicy())
+
+        def new_client():
+            return OpenAI(api_key="fake", base_url=server.base_url, max_retries=0)
+
+        before = server.stats["connections"]
+        results["generate_mcq: new client per call"] = summarize(
+            [timed(lambda: call(new_client())) for _ in range(repeat)]
+        )
+        results["generate_mcq: new client per call"]["connections"] = server.stats["connections"] - before
+
+        pooled = openai_client.make_client(server.base_url, "fake")
+        call(pooled)  # first call opens the connection
+        before = server.stats["connections"]
+        results["generate_mcq: shared pooled client"] = summarize(
+            [timed(lambda: call(pooled)) for _ in range(repeat)]
+        )
+        results["generate_mcq: shared pooled client"]["connections"] = server.stats["connections"] - before
+
+        # what every rerun used to pay before the first line of the page ran
+        results["OpenAI() construction per rerun"] = summarize([timed(new_client) for _ in range(repeat * 10)])
+
+        # an AI-enabled process rerunning a page that never calls the API
+        at = fresh_app({
+            "OPENAI_API_KEY": "fake",
+            "OPENAI_BASE_URL": server.base_url,
+            "MCQ_STORE_PATH": os.path.join(store_dir, "client.sqlite3"),
+        })
+        results["Study Guide rerun (AI configured)"] = summarize([timed(at.run) for _ in range(repeat)])
+
+    # a fresh process importing openai, which bank-only processes now skip
+    script = "import time; t = time.perf_counter(); import openai; print(time.perf_counter() - t)"
+    imports = [float(subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                    check=True).stdout) for _ in range(3)]
+    results["import openai (fresh process)"] = summarize(imports)
+    return results
+
+
+def bench_stream(repeat, latency):
+    """
+    Time until a student sees something: the whole reply (generate_mcq) against a
+    streamed one (stream_mcq), where the stem shows with the first tokens and the
+    options fill in after it.
+    """
+    context = "## Atlantic Revolutions\n" + "Enlightenment ideas and revolutions. " * 100
+    with FakeOpenAIServer(latency=latency, seed=0) as server:
+        client = openai_client.make_client(server.base_url, "fake")
+        policy = CallPolicy()
+        whole = [timed(lambda: ai_mcq.generate_mcq(client, "Atlantic Revolutions", context, policy))
+                 for _ in range(repeat)]
+        stem, options, done = [], [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            seen = {}
+
+            def on_partial(partial):
+                if partial.get("question") and "stem" not in seen:
+                    seen["stem"] = time.perf_counter() - start
+                if len(partial.get("options") or ()) == 4 and "options" not in seen:
+                    seen["options"] = time.perf_counter() - start
+
+            ai_mcq.stream_mcq(client, "Atlantic Revolutions", context, policy, on_partial=on_partial)
+            done.append(time.perf_counter() - start)
+            stem.append(seen["stem"])
+            options.append(seen["options"])
+    return {
+        "whole reply: question shown": summarize(whole),
+        "streamed: stem starts to show": summarize(stem),
+        "streamed: all four options started": summarize(options),
+        "streamed: validated, answer enabled": summarize(done),
+    }
+
+
+def bench_sampler(size=100_000, topics=20, draws=20_000):
+    """
+    Microseconds per draw and per weight change for a session's sampler over a bank
+    of `size` questions, grouped by topic and with one group (weight) per question.
+    """
+    results = {}
+    for name, groups in (
+        (f"{topics} topics", {t: range(t * size // topics, (t + 1) * size // topics) for t in range(topics)}),
+        ("per-question weights", {i: (i,) for i in range(size)}),
+    ):
+        start = time.perf_counter()
+        sampler = WeightedSampler(groups, rng=random.Random(0))
+        build = time.perf_counter() - start
+        keys = list(groups)
+        start = time.perf_counter()
+        for _ in range(draws):
+            sampler.draw()
+        draw = (time.perf_counter() - start) / draws
+        start = time.perf_counter()
+        for i in range(draws):
+            sampler.set_weight(keys[i % len(keys)], 1.0 + i % 3)
+        update = (time.perf_counter() - start) / draws
+        results[f"{size:,} questions, {name}"] = {
+            "build ms": build * 1000, "draw µs": draw * 1e6, "set_weight µs": update * 1e6,
+        }
+    return results
+
+
+def bench_metrics(n=200_000):
+    """Nanoseconds a `with timer():` block adds, with instrumentation off, sampled and on."""
+    def per_op(metrics):
+        start = time.perf_counter()
+        for _ in range(n):
+            if metrics is None:
+                pass
+            else:
+                with metrics.timer("bench_seconds", page="x"):
+                    pass
+        return (time.perf_counter() - start) / n * 1e9
+
+    baseline = per_op(None)
+    return {
+        "timer() overhead, ns per call": {
+            f"rate {rate:g}": per_op(Metrics(sample_rate=rate)) - baseline for rate in (0, 0.1, 1)
+        }
+    }
+
+
+def print_table(title, results):
+    print(f"\n{title}")
+    print(f"{'interaction':52} {'n':>4} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for name, r in results.items():
+        if "n" not in r:
+            print(f"{name:52} " + " · ".join(f"{k} {v:.2f}" for k, v in r.items()))
+            continue
+        extra = ""
+        if "wasted_tokens_per_call" in r:
+            extra = f"  ({r['wasted_call_rate']:.0%} of calls wasted, {r['wasted_tokens_per_call']:.0f} tokens wasted/call)"
+        extra += f"  ({r['upstream_calls']} upstream calls)" if "upstream_calls" in r else ""
+        extra += f"  ({r['connections']} new connections)" if "connections" in r else ""
+        print(f"{name:52} {r['n']:>4} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['max_ms']:>9.1f}{extra}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10, help="samples per interaction")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake upstream latency in seconds")
+    parser.add_argument("--handshake", type=float, default=0.05,
+                        help="seconds added per new connection in the client comparison")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp, FakeOpenAIServer(latency=args.latency, seed=0) as server:
+        results = {
+            "pages": bench_pages(args.repeat, os.path.join(tmp, "pages.sqlite3")),
+            "ai": bench_ai(args.repeat, server, tmp),
+            "client": bench_client(args.repeat, args.latency, args.handshake, tmp),
+            "stream": bench_stream(args.repeat, args.latency),
+            "sampler": bench_sampler(),
+            "metrics": bench_metrics(),
+        }
+    for key in AI_ENV:
+        os.environ.pop(key, None)
+
+    print_table("Page reruns (bank only)", results["pages"])
+    print_table(f"AI path (fake upstream, {args.latency:.2f}s latency)", results["ai"])
+    print_table(f"OpenAI client ({args.handshake * 1000:.0f} ms per new connection)", results["client"])
+    print_table(f"Streamed questions ({args.latency:.2f}s reply)", results["stream"])
+    print_table("Question sampler", results["sampler"])
+    print_table("Instrumentation", results["metrics"])
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
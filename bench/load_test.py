@@ -0,0 +1,388 @@
+"""
+Load test: hundreds to thousands of concurrent students against one app process.
+
+Starts `streamlit run app.py` as a subprocess (with a local FakeOpenAIServer
+as the OpenAI endpoint and throwaway stores) and drives it over the same
+websocket protocol the browser speaks: each simulated student opens a
+session, then clicks through the four pages following a click mix, waiting
+a random think time between actions. Buttons inside fragments trigger
+fragment reruns, as they do in the browser.
+
+    python -m bench.load_test --sessions 200
+    python -m bench.load_test --sessions 1000 --actions 5 --think 3 --json load.json
+    python -m bench.load_test --mix guide=0,flashcards=1,mcq=1,test=0 --no-ai
+
+AppTest can't be used here: it swaps a process-wide mock runtime in and out
+around every run, so two sessions can't run at once in one process.
+
+Reports throughput, p50/p95/p99 rerun latency (from sending the click to
+the end of the script run) per page and per action, server CPU use, and the
+server's RSS growth per connected session.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from websockets.asyncio.client import connect
+
+from bench.bench_app import APP, summarize
+from studyhub.fake_openai import FakeOpenAIServer
+
+PAGES = {
+    "guide": "Study Guide",
+    "flashcards": "Flashcards",
+    "mcq": "Practice MCQs",
+    "test": "Practice Test",
+}
+# share of actions on each page
+DEFAULT_MIX = "guide=0.15,flashcards=0.35,mcq=0.3,test=0.2"
+WIDGETS = ("button", "checkbox", "radio")
+DONE = (ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY)
+
+
+def parse_mix(text: str):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in PAGES:
+            raise ValueError(f"unknown page {name!r}; expected one of {', '.join(PAGES)}")
+        mix[PAGES[name.strip()]] = float(weight)
+    return mix
+
+
+def process_stats(pid: int):
+    """(RSS bytes, CPU seconds) of process `pid`, from /proc."""
+    with open(f"/proc/{pid}/statm") as f:
+        rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    return rss, cpu
+
+
+class Session:
+    """
+    One browser tab, reduced to what the load test needs: the widgets on the
+    page (by delta path) and a way to rerun the script with a widget changed.
+    """
+
+    def __init__(self, url: str, rng: random.Random, samples, errors, timeout: float):
+        self.url = url
+        self.rng = rng
+        self.samples = samples
+        self.errors = errors
+        self.timeout = timeout
+        self.ws = None
+        self.widgets = {}  # delta path -> (kind, proto, fragment id)
+        self.values = {}  # widget id -> WidgetState the user has set
+        self.page = "Study Guide"
+
+    async def open(self):
+        self.ws = await connect(self.url, subprotocols=["streamlit"], max_size=None)
+        await self._rerun(None, "Study Guide", "open app")
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    def _find(self, kind, label=None, key=None):
+        return [
+            (proto, fragment_id) for k, proto, fragment_id in self.widgets.values()
+            if k == kind and (label is None or proto.label == label) and (key is None or key in proto.id)
+        ]
+
+    async def _rerun(self, state, page, action, fragment_id=""):
+        msg = BackMsg()
+        client = msg.rerun_script
+        client.query_string = ""
+        client.fragment_id = fragment_id
+        current = {proto.id for _, proto, _ in self.widgets.values()}
+        for widget_id, value in self.values.items():
+            if widget_id in current and (state is None or widget_id != state.id):
+                client.widget_states.widgets.append(value)
+        if state is not None:
+            client.widget_states.widgets.append(state)
+        if fragment_id:
+            self.widgets = {p: w for p, w in self.widgets.items() if w[2] != fragment_id}
+        else:
+            self.widgets = {}
+
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        try:
+            await asyncio.wait_for(self._read_run(), self.timeout)
+        except Exception as exc:
+            self.errors.append(f"{page} / {action}: {exc!r}")
+            return False
+        self.samples.append((page, action, time.perf_counter() - start))
+        return True
+
+    async def _read_run(self):
+        while True:
+            fm = ForwardMsg()
+            fm.ParseFromString(await self.ws.recv())
+            kind = fm.WhichOneof("type")
+            if kind == "script_finished":
+                if fm.script_finished in DONE:
+                    return
+                if fm.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("script failed to compile")
+            elif kind == "delta" and fm.delta.WhichOneof("type") == "new_element":
+                element = fm.delta.new_element
+                element_kind = element.WhichOneof("type")
+                if element_kind in WIDGETS:
+                    path = tuple(fm.metadata.delta_path)
+                    self.widgets[path] = (element_kind, getattr(element, element_kind), fm.delta.fragment_id)
+                elif element_kind == "exception":
+                    raise RuntimeError(element.exception.message)
+
+    async def click(self, label, page, action):
+        found = self._find("button", label)
+        if not found:
+            return False
+        proto, fragment_id = found[0]
+        return await self._rerun(WidgetState(id=proto.id, trigger_value=True), page, action, fragment_id)
+
+    async def choose(self, label, option, page, action):
+        found = self._find("radio", label)
+        if not found:
+            return False
+        proto, fragment_id = found[0]
+        option = option if option is not None else self.rng.choice(list(proto.options))
+        state = WidgetState(id=proto.id, string_value=option)
+        self.values[proto.id] = state
+        return await self._rerun(state, page, action, fragment_id)
+
+    async def act(self, page):
+        """Goes to `page` if needed, then does one thing there."""
+        if page != self.page:
+            await self.choose("Go to", page, page, "open page")
+            self.page = page
+        if page == "Study Guide":
+            boxes = self._find("checkbox", key="guide_")
+            if boxes:
+                proto, fragment_id = self.rng.choice(boxes)
+                previous = self.values.get(proto.id)
+                state = WidgetState(id=proto.id, bool_value=not (previous and previous.bool_value))
+                self.values[proto.id] = state
+                await self._rerun(state, page, "toggle section", fragment_id)
+        elif page == "Flashcards":
+            if await self.click("Show Answer", page, "show answer"):
+                await self.click(self.rng.choice(("Again", "Hard", "Good", "Good", "Easy")), page, "grade card")
+            else:
+                await self.click("Review ahead", page, "review ahead")
+        elif page == "Practice MCQs":
+            await self.click("New Question", page, "new question")
+            await self.choose("Select your answer:", None, page, "choose answer")
+            await self.click("Check answer", page, "check answer")
+        elif await self.choose("Select your answer:", None, page, "choose answer"):
+            await self.click("Submit Answer", page, "submit answer")
+        else:
+            await self.click("Start / Reset Test", page, "start test")
+
+
+def start_server(port: int, env: dict):
+    """Runs `streamlit run app.py` on `port` and waits until it answers its health check."""
+    args = [
+        sys.executable, "-m", "streamlit", "run", APP,
+        "--server.headless", "true", "--server.address", "127.0.0.1", "--server.port", str(port),
+        "--browser.gatherUsageStats", "false", "--server.fileWatcherType", "none",
+    ]
+    proc = subprocess.Popen(args, env={**os.environ, **env}, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"streamlit exited: {proc.stderr.read().decode()[-2000:]}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                return proc
+        except OSError:
+            time.sleep(0.25)
+    proc.terminate()
+    raise RuntimeError("streamlit didn't start within 60s")
+
+
+async def run_load(url, pid, sessions, actions, mix, think, ramp, seed, timeout):
+    """
+    Opens `sessions` sessions over `ramp` seconds, then has each do `actions`
+    actions with think time in between, all concurrently. Sessions stay
+    connected until the end. Returns samples, errors, phase timings and the
+    server's RSS/CPU readings.
+    """
+    rng = random.Random(seed)
+    pages, weights = zip(*mix.items())
+    samples, errors = [], []
+
+    # one session visits every page first, so content and stores are loaded before measuring
+    warm = Session(url, random.Random(seed), [], errors, timeout)
+    await warm.open()
+    for page in PAGES.values():
+        await warm.act(page)
+    await warm.close()
+    await asyncio.sleep(1)
+    readings = {"start": process_stats(pid)} if pid else {}
+
+    students = [Session(url, random.Random(rng.random()), samples, errors, timeout) for _ in range(sessions)]
+
+    async def arrive(i, student):
+        await asyncio.sleep(ramp * i / max(sessions, 1))
+        try:
+            await student.open()
+        except OSError as exc:
+            errors.append(f"connect: {exc!r}")
+            student.ws = None
+
+    start = time.perf_counter()
+    await asyncio.gather(*(arrive(i, s) for i, s in enumerate(students)))
+    ramp_seconds = time.perf_counter() - start
+    ramp_runs = len(samples)
+    if pid:
+        readings["after_ramp"] = process_stats(pid)
+
+    async def work(student):
+        if student.ws is None:
+            return
+        for _ in range(actions):
+            if think:
+                await asyncio.sleep(student.rng.expovariate(1 / think))
+            await student.act(student.rng.choices(pages, weights)[0])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(work(s) for s in students))
+    steady_seconds = time.perf_counter() - start
+    if pid:
+        readings["end"] = process_stats(pid)
+    await asyncio.gather(*(s.close() for s in students), return_exceptions=True)
+    return {
+        "samples": samples,
+        "errors": errors,
+        "ramp_seconds": ramp_seconds,
+        "ramp_runs": ramp_runs,
+        "steady_seconds": steady_seconds,
+        "steady_runs": len(samples) - ramp_runs,
+        "readings": readings,
+    }
+
+
+def summarize_samples(samples):
+    by_page, by_action = {}, {}
+    for page, action, seconds in samples:
+        by_page.setdefault(page, []).append(seconds)
+        by_action.setdefault(f"{page}: {action}", []).append(seconds)
+    return (
+        {page: summarize(s) for page, s in sorted(by_page.items())},
+        {action: summarize(s) for action, s in sorted(by_action.items())},
+    )
+
+
+def print_latencies(title, table):
+    print(f"\n{title}")
+    print(f"{'':40} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, r in table.items():
+        print(f"{name:40} {r['n']:>6} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200, help="simulated students")
+    parser.add_argument("--actions", type=int, default=10, help="actions per student after opening the app")
+    parser.add_argument("--think", type=float, default=2.0, help="mean seconds between a student's actions")
+    parser.add_argument("--ramp", type=float, default=10.0, help="seconds over which students arrive")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="page weights, e.g. " + DEFAULT_MIX)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake upstream latency in seconds")
+    parser.add_argument("--no-ai", action="store_true", help="run without an API key (bank questions only)")
+    parser.add_argument("--url", help="load an app that is already running (ws://host:port/_stcore/stream); "
+                                      "no server RSS/CPU figures then")
+    parser.add_argument("--port", type=int, default=8599, help="port for the app under test")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds before a rerun counts as failed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args(argv)
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    with tempfile.TemporaryDirectory() as tmp, FakeOpenAIServer(latency=args.latency, seed=args.seed) as upstream:
+        server = None
+        url = args.url
+        if url is None:
+            env = {
+                "MCQ_STORE_PATH": os.path.join(tmp, "questions.sqlite3"),
+                "MCQ_QUEUE_PATH": os.path.join(tmp, "prefetch.sqlite3"),
+                "PROGRESS_STORE_PATH": os.path.join(tmp, "progress.sqlite3"),
+                "STUDYHUB_LOG_LEVEL": "WARNING",
+            }
+            if not args.no_ai:
+                env.update({"OPENAI_API_KEY": "fake", "OPENAI_BASE_URL": upstream.base_url})
+            server = start_server(args.port, env)
+            url = f"ws://127.0.0.1:{args.port}/_stcore/stream"
+        try:
+            result = asyncio.run(run_load(
+                url, server.pid if server else None, args.sessions, args.actions, mix,
+                args.think, args.ramp, args.seed, args.timeout,
+            ))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+
+    by_page, by_action = summarize_samples(result["samples"])
+    steady_runs, steady_seconds = result["steady_runs"], result["steady_seconds"]
+    summary = {
+        "sessions": args.sessions,
+        "actions": args.actions,
+        "think_seconds": args.think,
+        "ai": not args.no_ai,
+        "reruns": len(result["samples"]),
+        "errors": len(result["errors"]),
+        "ramp_seconds": result["ramp_seconds"],
+        "steady_seconds": steady_seconds,
+        "throughput_reruns_per_second": steady_runs / steady_seconds if steady_seconds else None,
+        "upstream_requests": upstream.stats["requests"],
+    }
+    readings = result["readings"]
+    if readings:
+        (rss0, cpu0), (rss1, cpu1), (rss2, cpu2) = readings["start"], readings["after_ramp"], readings["end"]
+        summary.update({
+            "rss_start_mb": rss0 / 2**20,
+            "rss_end_mb": rss2 / 2**20,
+            "rss_per_session_kb": (rss1 - rss0) / args.sessions / 1024,
+            "rss_per_session_end_kb": (rss2 - rss0) / args.sessions / 1024,
+            "server_cpu_seconds": cpu2 - cpu0,
+            "server_cpu_percent": 100 * (cpu2 - cpu1) / steady_seconds if steady_seconds else None,
+        })
+
+    print(f"{args.sessions} sessions, {args.actions} actions each, {args.think:g}s mean think time"
+          f" ({'AI via fake upstream' if summary['ai'] else 'bank only'})")
+    print(f"ramp: {result['ramp_runs']} sessions opened in {result['ramp_seconds']:.1f}s")
+    print(f"steady: {steady_runs} reruns in {steady_seconds:.1f}s = "
+          f"{summary['throughput_reruns_per_second'] or 0:.1f} reruns/s")
+    if readings:
+        print(f"server: {summary['server_cpu_seconds']:.1f}s CPU for the run, "
+              f"{summary['server_cpu_percent']:.0f}% while steady · RSS {summary['rss_start_mb']:.0f} MB → "
+              f"{summary['rss_end_mb']:.0f} MB · {summary['rss_per_session_kb']:.0f} KB per session once "
+              f"connected, {summary['rss_per_session_end_kb']:.0f} KB after the actions")
+    print_latencies("Rerun latency by page", by_page)
+    print_latencies("Rerun latency by action", by_action)
+    if result["errors"]:
+        print(f"\n{len(result['errors'])} errors, e.g. {result['errors'][0]}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"summary": summary, "pages": by_page, "actions": by_action,
+                       "errors": result["errors"][:100]}, f, indent=2)
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
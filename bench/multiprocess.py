@@ -0,0 +1,192 @@
+"""
+Multi-process harness: N app worker processes sharing one set of stores.
+
+Each worker is a separate Python process driving app.py through AppTest, as
+if a load balancer spread students over N copies of `streamlit run`. All of
+them point at the same question store, prefetch queue and progress store in
+a temporary directory, and at one local FakeOpenAIServer:
+
+    python -m bench.multiprocess --workers 4
+    python -m bench.multiprocess --workers 4 --no-shared   # per-process queues, for comparison
+
+Checks that progress written through one worker is restored by another,
+and reports prefetch hit rate and how many generated questions were never
+served.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+
+
+def _session():
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    return at
+
+
+def _step(at, widget=None, label=None):
+    if label is not None:
+        widget = next(b for b in at.button if b.label == label).click()
+    widget.run()
+    assert not at.exception, at.exception
+
+
+def _write_progress(student):
+    """Reviews a flashcard and answers two test questions as `student`."""
+    at = _session()
+    _step(at, at.sidebar.text_input(key="student_id").input(student))
+    _step(at, at.sidebar.radio[0].set_value("Flashcards"))
+    _step(at, label="Show Answer")
+    _step(at, label="Good")
+    _step(at, at.sidebar.radio[0].set_value("Practice Test"))
+    _step(at, label="Start / Reset Test")
+    _step(at, label="Submit Answer")
+    _step(at, label="Submit Answer")
+    return {
+        "test_index": at.session_state.test_index,
+        "test_answers": list(at.session_state.test_answers),
+        "test_questions": list(at.session_state.test_questions),
+    }
+
+
+def _read_progress(student):
+    """Enters `student`'s ID in a fresh session and reports what was restored."""
+    at = _session()
+    _step(at, at.sidebar.text_input(key="student_id").input(student))
+    _step(at, at.sidebar.radio[0].set_value("Flashcards"))
+    learned = next(c.value for c in at.caption if c.value.startswith("Due:"))
+    return {
+        "test_index": at.session_state.test_index,
+        "test_answers": list(at.session_state.test_answers),
+        "test_questions": list(at.session_state.test_questions),
+        "flashcards": learned,
+    }
+
+
+def _practice(clicks, think_seconds):
+    """Clicks "New Question" in AI mode `clicks` times; returns this process's prefetch hits/misses."""
+    at = _session()
+    _step(at, at.sidebar.radio[0].set_value("Practice MCQs"))
+    for _ in range(clicks):
+        time.sleep(think_seconds)
+        _step(at, label="New Question")
+    # read back from the "AI question queue" expander
+    hits, misses = next(m.value for m in at.metric if m.label == "Hits / misses").split(" / ")
+    return {"hits": int(hits), "misses": int(misses)}
+
+
+def _worker(env, commands, results):
+    os.environ.update(env)
+    handlers = {"write": _write_progress, "read": _read_progress, "practice": _practice}
+    while True:
+        command = commands.get()
+        if command is None:
+            break
+        tag, name, args = command
+        try:
+            results.put((tag, handlers[name](*args)))
+        except Exception as exc:  # report rather than hang the parent
+            results.put((tag, {"error": repr(exc)}))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--students", type=int, default=6)
+    parser.add_argument("--clicks", type=int, default=10, help="New Question clicks per worker")
+    parser.add_argument("--think", type=float, default=0.3, help="seconds between clicks")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake upstream latency in seconds")
+    parser.add_argument("--no-shared", action="store_true", help="run without STUDYHUB_MULTIPROCESS")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args(argv)
+
+    from studyhub.fake_openai import FakeOpenAIServer
+
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp, FakeOpenAIServer(latency=args.latency, seed=0) as server:
+        env = {
+            "STUDYHUB_MULTIPROCESS": "0" if args.no_shared else "1",
+            "OPENAI_API_KEY": "fake",
+            "OPENAI_BASE_URL": server.base_url,
+            "MCQ_STORE_PATH": os.path.join(tmp, "questions.sqlite3"),
+            "MCQ_QUEUE_PATH": os.path.join(tmp, "prefetch.sqlite3"),
+            "PROGRESS_STORE_PATH": os.path.join(tmp, "progress.sqlite3"),
+            "STUDYHUB_LOG_LEVEL": "WARNING",
+        }
+        results = ctx.Queue()
+        inboxes = [ctx.Queue() for _ in range(args.workers)]
+        procs = [ctx.Process(target=_worker, args=(env, inbox, results)) for inbox in inboxes]
+        for p in procs:
+            p.start()
+
+        def run(assignments):
+            """Sends (worker, (name, args)) commands and returns their results in the same order."""
+            for tag, (worker, (name, command_args)) in enumerate(assignments):
+                inboxes[worker].put((tag, name, command_args))
+            done = dict(results.get(timeout=300) for _ in assignments)
+            return [done[tag] for tag in range(len(assignments))]
+
+        # session continuity: write on worker i, read back on worker i + 1. Two rounds, so the
+        # second read happens in a process that has already seen the student's older progress.
+        students = [f"student-{i}" for i in range(args.students)]
+        continuity = []
+        for round_no in (1, 2):
+            written = run([(i % args.workers, ("write", (s,))) for i, s in enumerate(students)])
+            time.sleep(2.5)  # let write-behind buffers flush
+            read = run([((i + 1) % args.workers, ("read", (s,))) for i, s in enumerate(students)])
+            for student, w, r in zip(students, written, read):
+                ok = all(k in w and w[k] == r.get(k) for k in ("test_index", "test_answers", "test_questions"))
+                ok = ok and f"Learned: {round_no}" in r.get("flashcards", "")
+                continuity.append({"student": student, "round": round_no, "ok": ok, "written": w, "read": r})
+
+        # prefetch: every worker practises the same topic at once
+        before = dict(server.stats)
+        practice = run([(i, ("practice", (args.clicks, args.think))) for i in range(args.workers)])
+        time.sleep(args.latency * 3)  # let refills in flight finish
+        generated = server.stats["questions"] - before["questions"]
+
+        for inbox in inboxes:
+            inbox.put(None)
+        for p in procs:
+            p.join(timeout=30)
+
+    hits = sum(p.get("hits", 0) for p in practice)
+    misses = sum(p.get("misses", 0) for p in practice)
+    served = args.workers * args.clicks
+    summary = {
+        "mode": "per-process" if args.no_shared else "shared",
+        "workers": args.workers,
+        "continuity_ok": sum(c["ok"] for c in continuity),
+        "continuity_checked": len(continuity),
+        "prefetch_hits": hits,
+        "prefetch_misses": misses,
+        "prefetch_hit_rate": hits / (hits + misses) if hits + misses else None,
+        "questions_served": served,
+        "questions_generated": generated,
+        "questions_unserved": max(generated - served, 0),
+    }
+
+    print(f"mode: {summary['mode']}, {args.workers} worker processes")
+    print(f"session continuity across processes: {summary['continuity_ok']}/{summary['continuity_checked']} checks")
+    for c in continuity:
+        if not c["ok"]:
+            print(f"  {c['student']} (round {c['round']}): wrote {c['written']}, read {c['read']}")
+    rate = summary["prefetch_hit_rate"]
+    print(f"prefetch hit rate: {rate:.0%} ({hits} hits, {misses} misses)" if rate is not None else "prefetch: no lookups")
+    print(f"questions generated: {generated}, served: {served}, never served: {summary['questions_unserved']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"summary": summary, "continuity": continuity, "practice": practice}, f, indent=2)
+    return 0 if summary["continuity_ok"] == summary["continuity_checked"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
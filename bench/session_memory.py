@@ -0,0 +1,142 @@
+"""
+Per-session memory of practice state, before and after storing question refs.
+
+Builds the Practice Test / Practice MCQs state of `--sessions` simulated
+students both ways, measuring allocations with tracemalloc:
+
+- before: question dicts in session state (bank questions by reference, AI
+  questions decoded from the store per session), letter answers in a dict,
+  a feedback dict;
+- after: question refs in an array('i'), one answer byte per question, an
+  int for the current question and the last-answered index, with AI
+  questions decoded once per process into shared Question records.
+
+    python -m bench.session_memory --sessions 1000
+
+Also reports the bank's own size as JSON dicts and as Question records.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+from array import array
+
+from studyhub import content
+from studyhub.question_bank import LETTERS, Question
+from studyhub.question_store import QuestionStore
+
+
+def deep_size(obj, seen=None):
+    """Bytes held by `obj` and everything it references, counting shared objects once."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(deep_size(v, seen) for v in obj)
+    elif isinstance(obj, Question):
+        size += sum(deep_size(getattr(obj, k), seen) for k in Question.__slots__)
+    return size
+
+
+def fill_store(store, bank_dicts, n):
+    """`n` distinct AI-style questions, made by varying the bank's."""
+    for i in range(n):
+        q = dict(random.choice(bank_dicts))
+        q["question"] = f"{q['question']} (variant {i})"
+        store.add(q, topic=q.get("topic") or "Unit 5")
+
+
+def session_before(bank_dicts, store, test_len, ai_share):
+    n_ai = round(test_len * ai_share)
+    questions = random.sample(bank_dicts, test_len - n_ai) + store.sample(n_ai)
+    answers = {i: random.choice(LETTERS) for i in range(test_len // 2)}
+    q = questions[len(answers) - 1]
+    return {
+        "current_mcq": store.random(),
+        "test_questions": questions,
+        "test_answers": answers,
+        "test_feedback": {
+            "number": len(answers), "chosen": answers[len(answers) - 1],
+            "correct": q["correct"], "explanation": q.get("explanation"),
+        },
+    }
+
+
+def session_after(bank_size, store, test_len, ai_share):
+    n_ai = round(test_len * ai_share)
+    refs = random.sample(range(bank_size), test_len - n_ai)
+    refs += [-qid for qid, _ in store.sample(n_ai, with_ids=True)]
+    answers = bytearray([255]) * test_len
+    for i in range(test_len // 2):
+        answers[i] = random.randrange(4)
+    return {
+        "current_mcq": -store.sample(1, with_ids=True)[0][0],
+        "test_questions": array("i", refs),
+        "test_answers": answers,
+        "test_feedback": test_len // 2 - 1,
+    }
+
+
+def measure(build, sessions):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    states = [build() for _ in range(sessions)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used, states
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--test-length", type=int, default=15)
+    parser.add_argument("--ai-share", type=float, default=0.5, help="fraction of test questions from the AI store")
+    parser.add_argument("--stored", type=int, default=500, help="AI questions in the store")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args(argv)
+    random.seed(0)
+
+    bank_dicts = [dict(q) for unit in content.units() for q in content.load_mcqs(unit)]
+    bank = content.load_question_bank()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = QuestionStore(os.path.join(tmp, "questions.sqlite3"))
+        fill_store(store, bank_dicts, args.stored)
+
+        before, _ = measure(
+            lambda: session_before(bank_dicts, store, args.test_length, args.ai_share), args.sessions
+        )
+        after, _ = measure(
+            lambda: session_after(len(bank), store, args.test_length, args.ai_share), args.sessions
+        )
+
+    results = {
+        "sessions": args.sessions,
+        "before_bytes_per_session": before / args.sessions,
+        "after_bytes_per_session": after / args.sessions,
+        "bank_as_dicts_bytes": deep_size(bank_dicts),
+        "bank_as_records_bytes": deep_size(bank.questions),
+    }
+    print(f"{args.sessions} sessions, {args.test_length}-question tests, {args.ai_share:.0%} AI questions")
+    print(f"  before: {results['before_bytes_per_session'] / 1024:8.1f} KiB/session "
+          f"({before / 2**20:.1f} MiB total)")
+    print(f"  after:  {results['after_bytes_per_session'] / 1024:8.1f} KiB/session "
+          f"({after / 2**20:.1f} MiB total, including shared records decoded once)")
+    print(f"bank: {results['bank_as_dicts_bytes'] / 1024:.1f} KiB as dicts, "
+          f"{results['bank_as_records_bytes'] / 1024:.1f} KiB as Question records")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+"""
+Support code for the WHAP Unit 5 Study Hub (app.py).
+"""
@@ -0,0 +1,593 @@
+import json
+import logging
+import re
+import threading
+import time
+
+from studyhub.jsonstream import IncrementalJSONParser
+from studyhub.metrics import METRICS
+from studyhub.resilience import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+MODEL = "gpt-4.1-mini"
+DEFAULT_TOPIC = "Unit 5: Revolutions and Industrialization"
+
+SYSTEM_MSG = (
+    "You are an expert AP World History: Modern teacher. "
+    "Write challenging multiple-choice questions for Unit 5 (c. 1750–1900) "
+    "covering Enlightenment, Atlantic Revolutions, Nationalism, Industrial Revolution, ideologies, and art movements."
+)
+
+LETTERS = "ABCD"
+
+_REQUIREMENTS = """
+- Focus on higher-order thinking (comparison, causation, continuity/change, evaluation).
+- Have exactly 4 answer options labeled A, B, C, D.
+- Clearly indicate the single correct option.
+- Include a short explanation of why that option is correct."""
+
+_QUESTION_JSON = """{
+  "question": "...",
+  "options": ["A. ...", "B. ...", "C. ...", "D. ..."],
+  "answer": "B",
+  "explanation": "..."
+}"""
+
+
+def single_prompt(topic: str, context: str) -> str:
+    return f"""
+Using the following context, write ONE difficult AP World History multiple-choice question
+about {topic}. It must:
+{_REQUIREMENTS}
+
+Context:
+{context}
+
+Return ONLY valid JSON in this format:
+{_QUESTION_JSON}
+"""
+
+
+def batch_prompt(n: int, topic: str, context: str) -> str:
+    return f"""
+Using the following context, write {n} different difficult AP World History multiple-choice questions
+about {topic}. Cover different events, people and skills; do not repeat a question. Each question must:
+{_REQUIREMENTS}
+
+Context:
+{context}
+
+Return ONLY valid JSON in this format, with exactly {n} items in "questions":
+{{"questions": [
+{_QUESTION_JSON},
+  ...
+]}}
+"""
+
+
+def reask_prompt(items) -> str:
+    return f"""
+These multiple-choice questions are missing some fields. For each item, write only the
+fields listed in its "missing" list, consistent with the question and options given.
+
+Items:
+{json.dumps(items, ensure_ascii=False)}
+
+Return ONLY valid JSON in this format:
+{{"items": [{{"index": 0, "options": ["A. ...", "B. ...", "C. ...", "D. ..."], "answer": "B", "explanation": "..."}}]}}
+"""
+
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.S | re.I)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_LABEL = re.compile(r"^\s*(?:\(([A-Da-d])\)|([A-Da-d])\s*[.):\-])\s*")
+# an answer letter: capital, and followed by a delimiter or nothing, so "a treaty…" or
+# "A treaty…" written out as text isn't read as the letter A
+_ANSWER = re.compile(r"^\s*(?i:(?:correct\s+)?(?:answer|option)\s*(?:is)?\s*[:\-]?\s*)?\(?([A-D])\s*(?:[.):\-]|$)")
+
+
+def extract_json(text: str):
+    """
+    Parses the JSON value in a model reply, tolerating code fences, prose
+    around it, curly quotes and trailing commas. Raises ValueError if there
+    is none.
+    """
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        raise ValueError("no JSON in reply")
+    text = text[min(starts):]
+    decoder = json.JSONDecoder()
+    repaired = _TRAILING_COMMA.sub(r"\1", text.replace("\u201c", '"').replace("\u201d", '"'))
+    for candidate in (text, repaired):
+        try:
+            return decoder.raw_decode(candidate)[0]
+        except ValueError:
+            continue
+    raise ValueError("unparseable JSON in reply")
+
+
+def salvage_questions(text: str):
+    """
+    Complete question objects found anywhere in `text`, e.g. the ones before
+    the cut in a truncated batch reply.
+    """
+    decoder = json.JSONDecoder()
+    found = []
+    i = text.find("{", 1)
+    while i != -1:
+        try:
+            value, end = decoder.raw_decode(text, i)
+        except ValueError:
+            i = text.find("{", i + 1)
+            continue
+        if isinstance(value, dict) and "question" in value:
+            found.append(value)
+            i = text.find("{", end)
+        else:
+            i = text.find("{", i + 1)
+    return found
+
+
+def _options(raw):
+    if isinstance(raw, dict):
+        raw = [raw.get(k, raw.get(k.lower())) for k in LETTERS]
+    if not isinstance(raw, list) or len(raw) != 4 or not all(isinstance(o, str) and o.strip() for o in raw):
+        return None
+    # always shown as "A. ...": drop whatever label the model used and add our own
+    return [f"{letter}. {_LABEL.sub('', o.strip(), count=1)}" for letter, o in zip(LETTERS, raw)]
+
+
+def _words(text: str) -> str:
+    """Lowercase words of `text`, ignoring punctuation and spacing."""
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def _answer(raw, options):
+    if isinstance(raw, int) and not isinstance(raw, bool) and 0 <= raw < 4:
+        return LETTERS[raw]
+    if not isinstance(raw, str) or not raw.strip():
+        return None
+    # the model wrote out the option text instead of its letter
+    text = _words(_LABEL.sub("", raw.strip(), count=1))
+    texts = [_words(option[3:]) for option in options or []]
+    if text and text in texts:
+        return LETTERS[texts.index(text)]
+    m = _ANSWER.match(raw)
+    if m:
+        return m.group(1)
+    # or the start of it, cut off (two words at least), or it with more text after
+    close = [
+        letter for letter, t in zip(LETTERS, texts)
+        if t and ((" " in text and t.startswith(text + " ")) or text.startswith(t + " "))
+    ]
+    return close[0] if len(close) == 1 else None
+
+
+def validate_mcq(data):
+    """
+    Checks and normalizes one question as returned by the model.
+
+    Returns (question, missing): `question` in the question bank format with
+    whatever could be recovered, `missing` the fields still absent or invalid
+    ("options", "answer", "explanation"). Returns (None, None) if there is no
+    question text, which can't be asked for again.
+    """
+    if not isinstance(data, dict):
+        return None, None
+    question = data.get("question")
+    if not isinstance(question, str) or not question.strip():
+        return None, None
+    q = {"question": question.strip()}
+    missing = []
+    options = _options(data.get("options", data.get("choices")))
+    if options is None:
+        missing.append("options")
+    else:
+        q["options"] = options
+    raw_answer = next(
+        (data[k] for k in ("answer", "correct", "correct_answer", "answer_letter") if k in data), None
+    )
+    correct = _answer(raw_answer, options)
+    if correct is None:
+        missing.append("answer")
+    else:
+        q["correct"] = correct
+    explanation = data.get("explanation")
+    if not isinstance(explanation, str) or not explanation.strip():
+        missing.append("explanation")
+    else:
+        q["explanation"] = explanation.strip()
+    return q, missing
+
+
+def to_internal_mcq(data):
+    """
+    Converts one question as returned by the model into the question bank format,
+    or returns None if it is missing parts.
+    """
+    q, missing = validate_mcq(data)
+    return q if q is not None and not missing else None
+
+
+class GenerationStats:
+    """
+    Per-mode totals ("single" / "batch" / "stream" / "reask") used to compare the cost of each
+    generation path and to see how much is paid for replies that yield nothing.
+
+    Every answered call is recorded. A call's tokens count as wasted in
+    proportion to the questions it was asked for but didn't produce; a call
+    that produced none is a wasted call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._modes = {}
+
+    def record(self, mode: str, seconds: float, questions: int, usage=None, requested: int = 1,
+               recovered: int = 0):
+        tokens = 0
+        if usage is not None:
+            tokens = (getattr(usage, "prompt_tokens", 0) or 0) + (getattr(usage, "completion_tokens", 0) or 0)
+        with self._lock:
+            m = self._modes.setdefault(
+                mode,
+                {
+                    "calls": 0, "requested": 0, "questions": 0, "recovered": 0, "seconds": 0.0,
+                    "prompt_tokens": 0, "completion_tokens": 0, "wasted_calls": 0, "wasted_tokens": 0.0,
+                },
+            )
+            m["calls"] += 1
+            m["requested"] += requested
+            m["questions"] += questions
+            m["recovered"] += recovered
+            m["seconds"] += seconds
+            if usage is not None:
+                m["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+                m["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+            if questions == 0:
+                m["wasted_calls"] += 1
+            if requested:
+                m["wasted_tokens"] += tokens * max(requested - questions, 0) / requested
+
+    def summary(self):
+        """Returns tokens-per-question, seconds-per-question and waste rates for each mode."""
+        with self._lock:
+            out = {}
+            for mode, m in self._modes.items():
+                n = m["questions"]
+                tokens = m["prompt_tokens"] + m["completion_tokens"]
+                out[mode] = {
+                    **m,
+                    "tokens_per_question": tokens / n if n else None,
+                    "seconds_per_question": m["seconds"] / n if n else None,
+                    "wasted_call_rate": m["wasted_calls"] / m["calls"] if m["calls"] else None,
+                    "wasted_token_rate": m["wasted_tokens"] / tokens if tokens else None,
+                }
+            return out
+
+
+STATS = GenerationStats()
+
+
+def _record(mode: str, start: float, questions: int, usage=None, requested: int = 1, recovered: int = 0):
+    """Adds an answered call to STATS and to the latency histograms and token counters."""
+    seconds = time.perf_counter() - start
+    STATS.record(mode, seconds, questions, usage, requested=requested, recovered=recovered)
+    METRICS.observe("ai_call_seconds", seconds, mode=mode, outcome="ok" if questions else "invalid")
+    if usage is not None:
+        METRICS.inc("ai_prompt_tokens_total", getattr(usage, "prompt_tokens", 0) or 0, mode=mode)
+        METRICS.inc("ai_completion_tokens_total", getattr(usage, "completion_tokens", 0) or 0, mode=mode)
+    if not questions:
+        METRICS.inc("ai_failures_total", mode=mode, reason="invalid_reply")
+
+
+def _record_failure(mode: str, start: float, exc: Exception):
+    """A call that raised: timed out, hit the breaker or rate limit, or got an API error."""
+    METRICS.observe("ai_call_seconds", time.perf_counter() - start, mode=mode, outcome="error")
+    METRICS.inc("ai_failures_total", mode=mode, reason=type(exc).__name__)
+
+
+# rough completion size per question, for reserving rate-limit allowance before a call
+_TOKENS_PER_QUESTION = 350
+
+# the API's JSON mode, until a model rejects it
+_json_mode = True
+
+
+def _estimate(user_msg: str, questions: int = 1) -> int:
+    """Tokens to reserve for a call: the prompt at ~4 characters a token plus the expected reply."""
+    return (len(SYSTEM_MSG) + len(user_msg)) // 4 + questions * _TOKENS_PER_QUESTION
+
+
+def _complete(client, user_msg: str, policy=None, questions: int = 1, stream: bool = False):
+    """
+    Sends one chat completion request in JSON mode (plain text if the model
+    doesn't support it). With a resilience.CallPolicy the request gets a
+    deadline, bounded retries, the shared circuit breaker and, if the policy
+    has one, the shared rate limiter.
+
+    With `stream` it returns the open stream of chunks as soon as the API
+    answers; the policy covers opening it, and settling the rate limiter
+    with the final usage is left to the caller.
+    """
+    logger.info("prompt %d chars (~%d tokens)", len(SYSTEM_MSG) + len(user_msg), (len(SYSTEM_MSG) + len(user_msg)) // 4)
+    estimate = _estimate(user_msg, questions)
+    if stream:
+        kwargs = {"stream": True, "stream_options": {"include_usage": True}}
+    else:
+        kwargs = {}
+
+    def create(**more):
+        return client.chat.completions.create(
+            model=MODEL,
+            messages=[
+                {"role": "system", "content": SYSTEM_MSG},
+                {"role": "user", "content": user_msg},
+            ],
+            temperature=0.9,
+            **kwargs,
+            **more,
+        )
+
+    def attempt(**kwargs):
+        global _json_mode
+        if _json_mode:
+            try:
+                return create(response_format={"type": "json_object"}, **kwargs)
+            except Exception as exc:
+                if getattr(exc, "status_code", None) != 400 or "response_format" not in str(exc):
+                    raise
+                logger.warning("model rejected response_format; asking for JSON in the prompt only")
+                _json_mode = False
+        return create(**kwargs)
+
+    if policy is None:
+        return attempt()
+    completion = policy.call(lambda timeout: attempt(timeout=timeout), tokens=estimate)
+    if stream:
+        return completion
+    usage = getattr(completion, "usage", None)
+    if policy.limiter is not None and usage is not None:
+        policy.limiter.settle(estimate, getattr(usage, "total_tokens", estimate) or estimate)
+    return completion
+
+
+def _reply_items(text: str):
+    """Question objects in a reply: the parsed JSON if possible, else whatever complete ones survive."""
+    try:
+        data = extract_json(text)
+    except ValueError:
+        return salvage_questions(text)
+    if isinstance(data, dict):
+        data = data.get("questions", data.get("items", [data]))
+    return data if isinstance(data, list) else []
+
+
+def _reask(client, partial, policy=None):
+    """
+    One follow-up call asking only for the fields each (question, missing)
+    pair in `partial` lacks. Returns the questions it completed.
+    """
+    items = [
+        {"index": i, "question": q["question"], **({"options": q["options"]} if "options" in q else {}),
+         "missing": missing}
+        for i, (q, missing) in enumerate(partial)
+    ]
+    start = time.perf_counter()
+    try:
+        completion = _complete(client, reask_prompt(items), policy, questions=1)
+        fixes = _reply_items(completion.choices[0].message.content or "")
+    except Exception as exc:
+        _record_failure("reask", start, exc)
+        return []
+    done = []
+    for fix in fixes:
+        if not isinstance(fix, dict) or not isinstance(fix.get("index"), int):
+            continue
+        if not 0 <= fix["index"] < len(partial):
+            continue
+        q, _ = partial[fix["index"]]
+        merged = {
+            "question": q["question"],
+            "options": q.get("options", fix.get("options")),
+            "answer": q.get("correct", fix.get("answer")),
+            "explanation": q.get("explanation", fix.get("explanation")),
+        }
+        q = to_internal_mcq(merged)
+        if q is not None:
+            done.append(q)
+    _record("reask", start, len(done), completion.usage, requested=len(partial))
+    return done
+
+
+def _questions_from(client, text: str, n: int, policy=None):
+    """
+    Validated questions from a reply's text, at most `n`: parsed tolerantly, normalized, and
+    with missing fields asked for again in one follow-up call. Returns (questions, recovered).
+    """
+    complete, partial = [], []
+    for item in _reply_items(text)[:n]:
+        q, missing = validate_mcq(item)
+        if q is None:
+            continue
+        if missing:
+            partial.append((q, missing))
+        else:
+            complete.append(q)
+    recovered = _reask(client, partial, policy) if partial else []
+    return complete + recovered, len(recovered)
+
+
+def generate_mcq(client, topic: str, context: str, policy=None):
+    """
+    Generates one AP-style MCQ.
+    Returns a dict in the question bank format or None on failure.
+    """
+    start = time.perf_counter()
+    try:
+        completion = _complete(client, single_prompt(topic, context), policy)
+    except Exception as exc:
+        _record_failure("single", start, exc)
+        return None
+    questions, recovered = _questions_from(client, completion.choices[0].message.content or "", 1, policy)
+    _record("single", start, len(questions), completion.usage, recovered=recovered)
+    return questions[0] if questions else None
+
+
+def generate_mcq_batch(client, n: int, topic: str, context: str, policy=None):
+    """
+    Generates up to `n` MCQs with a single API call. Each question is validated
+    on its own; bad ones are dropped, so the list may be shorter than `n`.
+    """
+    start = time.perf_counter()
+    try:
+        completion = _complete(client, batch_prompt(n, topic, context), policy, questions=n)
+    except Exception as exc:
+        _record_failure("batch", start, exc)
+        return []
+    questions, recovered = _questions_from(client, completion.choices[0].message.content or "", n, policy)
+    _record("batch", start, len(questions), completion.usage, requested=n, recovered=recovered)
+    return questions
+
+
+def stream_mcq(client, topic: str, context: str, policy=None, on_partial=None):
+    """
+    Generates one AP-style MCQ like generate_mcq, but streams the reply.
+
+    After every chunk that adds to it, `on_partial` is called with the question
+    parsed so far: a dict whose "question" text and "options" list grow as
+    tokens arrive (see jsonstream.IncrementalJSONParser). Nothing in it is
+    validated; the return value is, and is None on failure, as for
+    generate_mcq. The policy's deadline covers the whole stream, not only
+    the wait for it to open.
+    """
+    start = time.perf_counter()
+    user_msg = single_prompt(topic, context)
+    parser = IncrementalJSONParser()
+    pieces = []
+    usage = None
+    opened = False
+    try:
+        stream = _complete(client, user_msg, policy, stream=True)
+        opened = True
+        deadline = start + policy.deadline_seconds if policy is not None else None
+        for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if not text:
+                continue
+            if not pieces:
+                METRICS.observe("ai_first_token_seconds", time.perf_counter() - start, mode="stream")
+            pieces.append(text)
+            parser.feed(text)
+            if on_partial is not None and isinstance(parser.value, dict):
+                on_partial(parser.value)
+            if deadline is not None and time.perf_counter() > deadline:
+                stream.close()
+                raise DeadlineExceeded(f"stream still open after {policy.deadline_seconds:.0f}s")
+    except Exception as exc:
+        if opened and policy is not None:
+            policy.breaker.record_failure()  # the call itself succeeded; the stream broke
+        _record_failure("stream", start, exc)
+        return None
+    if policy is not None and policy.limiter is not None:
+        estimate = _estimate(user_msg)
+        policy.limiter.settle(estimate, getattr(usage, "total_tokens", estimate) or estimate)
+    questions, recovered = _questions_from(client, "".join(pieces), 1, policy)
+    _record("stream", start, len(questions), usage, recovered=recovered)
+    return questions[0] if questions else None
+
+
+class QuestionStream:
+    """
+    One stream_mcq call, run on a worker thread and read from another.
+
+    `partial` is a copy of the question as parsed so far and `version` counts
+    its updates; once `done` is set, `question` holds the validated question
+    (None if generation failed) and `result` what `finish(question)` returned
+    for it, so work every reader would otherwise repeat (storing the question)
+    happens once. wait() blocks until there is something newer than a version
+    the reader has already shown.
+    """
+
+    def __init__(self, topic: str):
+        self.topic = topic
+        self.partial = {}
+        self.question = None
+        self.result = None
+        self.done = False
+        self.version = 0
+        self._changed = threading.Condition()
+
+    def run(self, client, context: str, policy=None, finish=None):
+        q = result = None
+        try:
+            q = stream_mcq(client, self.topic, context, policy, on_partial=self._update)
+            if q is not None and finish is not None:
+                result = finish(q)
+        finally:
+            with self._changed:
+                self.question = q
+                self.result = result
+                self.done = True
+                self.version += 1
+                self._changed.notify_all()
+        return q
+
+    def _update(self, partial):
+        snapshot = {k: list(v) if isinstance(v, list) else v for k, v in partial.items()}
+        with self._changed:
+            self.partial = snapshot
+            self.version += 1
+            self._changed.notify_all()
+
+    def wait(self, seen: int, timeout: float = None) -> int:
+        """Waits up to `timeout` seconds for a version other than `seen`; returns the current version."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != seen, timeout)
+            return self.version
+
+
+class StreamCoalescer:
+    """
+    Single-flight streaming per topic, the streaming counterpart of
+    ratelimit.BatchCoalescer: while a topic's QuestionStream is still running,
+    get() hands that stream to every later caller instead of starting another
+    call, so a class clicking "New Question" together watches one reply arrive.
+
+    `start(topic)` starts a QuestionStream and returns it (or None if it
+    can't); once a stream is done the next get() starts a new one.
+    """
+
+    def __init__(self, start):
+        self._start = start
+        self._lock = threading.Lock()
+        self._streams = {}
+        self._requests = 0
+        self._started = 0
+
+    def get(self, topic: str):
+        with self._lock:
+            self._requests += 1
+            stream = self._streams.get(topic)
+            if stream is None or stream.done:
+                stream = self._start(topic)
+                if stream is None:
+                    self._streams.pop(topic, None)
+                    return None
+                self._streams[topic] = stream
+                self._started += 1
+            return stream
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "streams": self._started,
+                "coalescing_ratio": self._requests / self._started if self._started else None,
+            }
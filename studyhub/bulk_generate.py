@@ -0,0 +1,326 @@
+"""
+Offline bulk generation of bank questions across every study-guide section.
+
+Uses the app's prompts (ai_mcq.generate_mcq_batch, with guide context
+retrieved per section) from a bounded pool of worker threads behind one
+rate limiter and circuit breaker, and appends the questions to a JSONL
+shard in the bank format. The shard is added to data/manifest.json, so the
+app serves the questions from the bank with no network access:
+
+    OPENAI_API_KEY=... python -m studyhub.bulk_generate --per-section 100 --workers 8
+    python -m studyhub.bulk_generate --fake --per-section 20   # local fake endpoint
+
+Progress is checkpointed after every batch. Run the same command again after
+an interruption and it picks up with the batches not yet written; batches
+that failed are retried.
+"""
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from studyhub import ai_mcq, content, openai_client
+from studyhub.dedup import NearDuplicateIndex
+from studyhub.question_bank import LETTERS
+from studyhub.question_store import question_hash
+from studyhub.ratelimit import RateLimiter
+from studyhub.resilience import CallPolicy, CircuitBreaker
+
+CHECKPOINT_VERSION = 1
+
+
+def section_topic(title: str) -> str:
+    """Bank topic for a guide section: its "##" heading without the number, e.g. "Atlantic Revolutions"."""
+    return re.sub(r"^\d+\.\s*", "", title.split(" › ")[0]).replace("*", "")
+
+
+def plan_jobs(unit: str, per_section: int, batch_size: int):
+    """
+    (key, prompt topic, bank topic, n) for every batch: `per_section` questions for
+    each guide section, in batches of at most `batch_size`.
+    """
+    jobs = []
+    for section in content.load_section_index(unit).sections:
+        if section.title == "Big Picture":
+            continue
+        prompt_topic = re.sub(r"^\d+\.\s*", "", section.title).replace("*", "")
+        for b in range(math.ceil(per_section / batch_size)):
+            n = min(batch_size, per_section - b * batch_size)
+            jobs.append((f"{section.title}#{b}", prompt_topic, section_topic(section.title), n))
+    return jobs
+
+
+def to_bank_format(q, topic: str):
+    """Bank record for a generated question: options without their "A. " labels, plus the topic."""
+    options = [o[3:] if o.startswith(f"{letter}. ") else o for letter, o in zip(LETTERS, q["options"])]
+    record = {"question": q["question"], "options": options, "correct": q["correct"]}
+    if q.get("explanation"):
+        record["explanation"] = q["explanation"]
+    record["topic"] = topic
+    return record
+
+
+class ShardWriter:
+    """
+    Appends batches to the output shard and records each one in the checkpoint.
+
+    The checkpoint holds the shard's size after the last recorded batch. On
+    resume the shard is cut back to that size, so a batch written but not
+    yet checkpointed when the run stopped is generated again, not kept twice.
+    Questions that repeat or reword one already in the shard or the bank are
+    dropped.
+    """
+
+    def __init__(self, out_path: str, checkpoint_path: str, near_dup_threshold: float = 0.4):
+        self.out_path = out_path
+        self.checkpoint_path = checkpoint_path
+        self.done = set()
+        self.written = 0
+        offset = None  # no checkpoint: keep whatever the shard already holds
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                state = json.load(f)
+            if state.get("version") != CHECKPOINT_VERSION:
+                raise SystemExit(f"{checkpoint_path}: unknown checkpoint version {state.get('version')!r}")
+            self.done = set(state["done"])
+            self.written = state["written"]
+            offset = state["offset"]
+        if os.path.dirname(out_path):
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        # appends always go to the end of the file, wherever reads have left the position
+        self._out = open(out_path, "a+b")
+        if offset is not None:
+            self._out.truncate(offset)
+        self._out.seek(0)
+        self.index = NearDuplicateIndex(near_dup_threshold)
+        existing = [json.loads(line) for line in self._out if line.strip()]
+        for q in list(content.load_question_bank().questions) + existing:
+            self.index.add(question_hash(q), q)
+        if offset is None:
+            self.written = len(existing)
+
+    def commit(self, key: str, questions):
+        """Appends a batch's new questions (dropping repeats) and checkpoints it; returns how many were new."""
+        lines = []
+        for q in questions:
+            admitted, _ = self.index.admit(question_hash(q), q)
+            if admitted:
+                lines.append(json.dumps(q, ensure_ascii=False) + "\n")
+        self._out.write("".join(lines).encode("utf-8"))
+        self._out.flush()
+        os.fsync(self._out.fileno())
+        self.done.add(key)
+        self.written += len(lines)
+        state = {
+            "version": CHECKPOINT_VERSION, "output": self.out_path, "offset": os.fstat(self._out.fileno()).st_size,
+            "written": self.written, "done": sorted(self.done),
+        }
+        tmp = f"{self.checkpoint_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.checkpoint_path)
+        return len(lines)
+
+    def close(self):
+        self._out.close()
+
+
+def _read_manifest():
+    with open(os.path.join(content.DATA_DIR, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check_shard(unit: str, out_path: str, register: bool = True):
+    """
+    Raises ValueError if appending to `out_path` (and, with `register`, listing it
+    in the manifest) would change the ids of questions already in the bank.
+
+    Bank question ids are positions over every unit's shards in manifest order,
+    and saved progress and sessions refer to questions by id, so new questions
+    may only go after all existing ones: into the last shard of the last unit.
+    """
+    name = os.path.relpath(os.path.abspath(out_path), content.DATA_DIR)
+    manifest = _read_manifest()
+    shards = manifest["units"][unit]["mcq"]
+    shards = [shards] if isinstance(shards, str) else shards
+    last_unit = list(manifest["units"])[-1]
+    listed = name in shards or (register and not name.startswith(".."))
+    if name in shards[:-1] or (listed and unit != last_unit):
+        raise ValueError(
+            f"{name}: new questions can only go into the last shard of the last unit in the "
+            f"manifest ({last_unit}); growing any other shard would shift the ids of the "
+            f"questions after it"
+        )
+
+
+def register_shard(unit: str, out_path: str):
+    """
+    Adds `out_path` to the end of the unit's MCQ shards in data/manifest.json, if
+    it isn't listed yet. Raises ValueError where check_shard would.
+    """
+    check_shard(unit, out_path)
+    name = os.path.relpath(os.path.abspath(out_path), content.DATA_DIR)
+    if name.startswith(".."):
+        print(f"{out_path} is outside {content.DATA_DIR}; not added to the manifest")
+        return False
+    manifest = _read_manifest()
+    shards = manifest["units"][unit]["mcq"]
+    shards = [shards] if isinstance(shards, str) else shards
+    if name in shards:
+        return False
+    manifest["units"][unit]["mcq"] = shards + [name]
+    path = os.path.join(content.DATA_DIR, "manifest.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp, path)
+    return True
+
+
+def run(client, unit: str, jobs, writer: ShardWriter, policy: CallPolicy, workers: int,
+        context_sections: int = 4, context_chars: int = 7000, progress_every: float = 5.0):
+    """Generates every job not yet in the checkpoint; returns a summary dict."""
+    index = content.load_section_index(unit)
+    todo = [job for job in jobs if job[0] not in writer.done]
+    stats = {"batches": 0, "failed": 0, "questions": 0, "duplicates": 0}
+
+    def generate(job):
+        key, prompt_topic, topic, n = job
+        # wait out an open breaker rather than failing every queued batch at once
+        while policy.breaker.state == "open":
+            time.sleep(0.5)
+        context = index.context(prompt_topic, k=context_sections, max_chars=context_chars)
+        if n == 1:
+            questions = [q for q in [ai_mcq.generate_mcq(client, prompt_topic, context, policy)] if q]
+        else:
+            questions = ai_mcq.generate_mcq_batch(client, n, prompt_topic, context, policy)
+        return job, [to_bank_format(q, topic) for q in questions]
+
+    start = last_report = time.monotonic()
+    pending = set()
+    queued = iter(todo)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk") as pool:
+        def fill():
+            # keep only a couple of batches per worker queued, so an interrupt loses little
+            while len(pending) < 2 * workers:
+                job = next(queued, None)
+                if job is None:
+                    return
+                pending.add(pool.submit(generate, job))
+
+        try:
+            fill()
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    (key, _, _, _), questions = future.result()
+                    if not questions:
+                        stats["failed"] += 1  # not checkpointed: retried on the next run
+                        continue
+                    new = writer.commit(key, questions)
+                    stats["batches"] += 1
+                    stats["questions"] += new
+                    stats["duplicates"] += len(questions) - new
+                fill()
+                now = time.monotonic()
+                if now - last_report >= progress_every:
+                    last_report = now
+                    done = stats["batches"] + stats["failed"]
+                    print(
+                        f"  {done}/{len(todo)} batches · {stats['questions']} questions · "
+                        f"{stats['questions'] / (now - start):.1f} questions/s · {stats['failed']} failed",
+                        flush=True,
+                    )
+        except KeyboardInterrupt:
+            for future in pending:
+                future.cancel()
+            print("interrupted; run the same command again to resume", file=sys.stderr)
+            stats["interrupted"] = True
+    stats["seconds"] = time.monotonic() - start
+    stats["already_done"] = len(jobs) - len(todo)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--unit", default=content.DEFAULT_UNIT)
+    parser.add_argument("--per-section", type=int, default=50, help="questions per guide section")
+    parser.add_argument("--batch-size", type=int, default=5, help="questions per API call")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent API calls")
+    parser.add_argument("--out", help="output shard (default: data/<unit>/mcq_generated.jsonl)")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <out>.checkpoint.json)")
+    parser.add_argument("--near-dup-threshold", type=float, default=0.4,
+                        help="drop questions this similar to a known one (Jaccard of content words)")
+    parser.add_argument("--no-register", action="store_true", help="don't add the shard to data/manifest.json")
+    parser.add_argument("--rpm", type=float, default=float(os.getenv("MCQ_RATE_RPM", "500")),
+                        help="requests per minute (0 = unlimited)")
+    parser.add_argument("--tpm", type=float, default=float(os.getenv("MCQ_RATE_TPM", "200000")),
+                        help="tokens per minute (0 = unlimited)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds per API call")
+    parser.add_argument("--base-url", default=os.getenv("OPENAI_BASE_URL"))
+    parser.add_argument("--fake", action="store_true", help="generate from a local FakeOpenAIServer")
+    parser.add_argument("--fake-duplicate-rate", type=float, default=0.2,
+                        help="with --fake, fraction of questions that reword an earlier one")
+    parser.add_argument("--json", help="also write the run summary to this file")
+    args = parser.parse_args(argv)
+
+    out = args.out or os.path.join(content.DATA_DIR, args.unit, "mcq_generated.jsonl")
+    checkpoint = args.checkpoint or f"{out}.checkpoint.json"
+    try:
+        check_shard(args.unit, out, register=not args.no_register)
+    except ValueError as exc:
+        parser.error(str(exc))
+    jobs = plan_jobs(args.unit, args.per_section, args.batch_size)
+    policy = CallPolicy(
+        deadline_seconds=args.timeout * 2,
+        attempt_timeout=args.timeout,
+        max_attempts=3,
+        breaker=CircuitBreaker(failure_threshold=10, cooldown_seconds=30),
+        limiter=RateLimiter(args.rpm, args.tpm),
+    )
+
+    fake = None
+    if args.fake:
+        from studyhub.fake_openai import FakeOpenAIServer
+
+        fake = FakeOpenAIServer(latency=0.05, duplicate_rate=args.fake_duplicate_rate).start()
+        base_url, api_key = fake.base_url, "fake"
+    else:
+        if not os.getenv("OPENAI_API_KEY"):
+            parser.error("set OPENAI_API_KEY (or use --fake)")
+        base_url, api_key = args.base_url, None
+    # one pooled connection per worker
+    client = openai_client.make_client(base_url, api_key, max_connections=args.workers, max_keepalive=args.workers)
+
+    writer = ShardWriter(out, checkpoint, args.near_dup_threshold)
+    try:
+        if not args.no_register and register_shard(args.unit, out):
+            print(f"added {os.path.relpath(out, content.DATA_DIR)} to the {args.unit} MCQ shards")
+        print(f"{len(jobs)} batches over {len({j[2] for j in jobs})} topics; "
+              f"{len(writer.done)} already done, {writer.written} questions in {out}")
+        stats = run(client, args.unit, jobs, writer, policy, args.workers)
+    finally:
+        writer.close()
+        if fake is not None:
+            fake.stop()
+
+    stats["total_written"] = writer.written
+    print(
+        f"{stats['questions']} new questions in {stats['batches']} batches, {stats['seconds']:.1f}s · "
+        f"{stats['duplicates']} repeats and near-duplicates dropped · {stats['failed']} batches failed"
+        + (" (run again to retry them)" if stats["failed"] else "")
+    )
+    print(f"{writer.written} questions in {out}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(stats, f, indent=2)
+    return 1 if stats["failed"] or stats.get("interrupted") else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,200 @@
+"""
+Study content (guide, flashcards, question bank) loaded from versioned data files.
+
+data/manifest.json lists the units and the files that make up each unit's
+shards; a unit's "mcq" entry may list several files (e.g. the hand-written
+bank plus questions from studyhub.bulk_generate), read in order. Every
+shard is read the first time a page asks for it and then kept for the life
+of the process; a shard is only re-read when its size or mtime changes, and
+only re-parsed when its content hash does.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from studyhub.question_bank import QuestionBank
+from studyhub.retrieval import SectionIndex
+from studyhub.search import SearchIndex
+
+DATA_DIR = os.getenv(
+    "STUDYHUB_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"),
+)
+DEFAULT_UNIT = "unit5"
+
+_lock = threading.Lock()
+# (path, parser name) -> (stat key, sha256, parsed value)
+_cache = {}
+# name -> (versions of the shards it was built from, value)
+_derived = {}
+
+
+def _read_jsonl(text: str):
+    return tuple(json.loads(line) for line in text.splitlines() if line.strip())
+
+
+def _guide_sections(text: str):
+    """
+    Splits the guide at its "##" headings into (title, markdown) fragments,
+    each starting with its own heading. The "#" title line is dropped.
+    """
+    sections, title, lines = [], None, []
+
+    def flush():
+        body = "\n".join(lines).strip()
+        while body.endswith("---"):
+            body = body[:-3].rstrip()
+        if title is not None:
+            sections.append((title, body))
+
+    for line in text.splitlines():
+        if line.startswith("## "):
+            flush()
+            title, lines = line[3:].strip(), [line]
+        elif not line.startswith("# "):
+            lines.append(line)
+    flush()
+    return tuple(sections)
+
+
+def _load(path: str, parser):
+    info = os.stat(path)
+    stat_key = (info.st_size, info.st_mtime_ns)
+    key = (path, parser.__name__)
+    with _lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == stat_key:
+            return cached[2], cached[1]
+    with open(path, "rb") as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    with _lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[1] == digest:
+            value = cached[2]
+        else:
+            value = parser(raw.decode("utf-8"))
+        _cache[key] = (stat_key, digest, value)
+    return value, digest
+
+
+def manifest():
+    value, _ = _load(os.path.join(DATA_DIR, "manifest.json"), json.loads)
+    return value
+
+
+def units():
+    """Unit ids in manifest order, e.g. ["unit5"]."""
+    return list(manifest()["units"])
+
+
+def unit_title(unit: str = DEFAULT_UNIT) -> str:
+    return manifest()["units"][unit]["title"]
+
+
+def _shard_path(unit: str, kind: str) -> str:
+    return os.path.join(DATA_DIR, manifest()["units"][unit][kind])
+
+
+def _mcq_shards(unit: str):
+    """(questions, sha256) for each of the unit's MCQ files, in manifest order."""
+    names = manifest()["units"][unit]["mcq"]
+    if isinstance(names, str):
+        names = [names]
+    return [_load(os.path.join(DATA_DIR, name), _read_jsonl) for name in names]
+
+
+def _mcq_version(shards) -> str:
+    if len(shards) == 1:
+        return shards[0][1]
+    return hashlib.sha256("".join(digest for _, digest in shards).encode("ascii")).hexdigest()
+
+
+def load_guide(unit: str = DEFAULT_UNIT) -> str:
+    """Study guide markdown for `unit`."""
+    return _load(_shard_path(unit, "guide"), str)[0]
+
+
+def load_guide_sections(unit: str = DEFAULT_UNIT):
+    """Tuple of (title, markdown) fragments, one per "##" section of the guide."""
+    return _load(_shard_path(unit, "guide"), _guide_sections)[0]
+
+
+def load_section_index(unit: str = DEFAULT_UNIT) -> SectionIndex:
+    """BM25 index over the unit's guide sections, built once per guide version."""
+    return _load(_shard_path(unit, "guide"), SectionIndex)[0]
+
+
+def load_flashcards(unit: str = DEFAULT_UNIT):
+    """Tuple of {"term", "definition", "group"} dicts. Shared by all sessions: don't mutate."""
+    return _load(_shard_path(unit, "flashcards"), _read_jsonl)[0]
+
+
+def load_mcqs(unit: str = DEFAULT_UNIT):
+    """Tuple of question dicts in the MCQ bank format. Shared by all sessions: don't mutate."""
+    shards = _mcq_shards(unit)
+    if len(shards) == 1:
+        return shards[0][0]
+    return _build_derived(
+        ("mcq", unit), _mcq_version(shards), lambda: tuple(q for qs, _ in shards for q in qs)
+    )
+
+
+def _build_derived(name, versions, build):
+    """Returns the cached value for `name` if built from the same `versions`, else builds it."""
+    with _lock:
+        cached = _derived.get(name)
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+    value = build()
+    with _lock:
+        _derived[name] = (versions, value)
+    return value
+
+
+def load_question_bank() -> QuestionBank:
+    """
+    Indexed bank over every unit's MCQ shard, rebuilt only when one of the shards changes.
+    """
+    versions = tuple(_mcq_version(_mcq_shards(unit)) for unit in units())
+    return _build_derived(
+        "bank", versions, lambda: QuestionBank({unit: load_mcqs(unit) for unit in units()})
+    )
+
+
+def load_search_index(unit: str = DEFAULT_UNIT) -> SearchIndex:
+    """
+    Full-text index over the unit's guide sections, flashcards and bank questions,
+    rebuilt only when one of them changes. Hit refs are ("guide", fragment index
+    in load_guide_sections), ("flashcard", index) or ("mcq", bank question id).
+    """
+    versions = tuple(content_version(unit, kind) for kind in ("guide", "flashcards", "mcq"))
+
+    def build():
+        fragment_of = {title: i for i, (title, _) in enumerate(load_guide_sections(unit))}
+        bank = load_question_bank()
+        docs = [
+            (("guide", fragment_of[s.title.split(" › ")[0]]), s.title, s.text)
+            for s in load_section_index(unit).sections
+        ]
+        docs += [
+            (("flashcard", i), card["term"], card["definition"])
+            for i, card in enumerate(load_flashcards(unit))
+        ]
+        docs += [
+            (("mcq", qid), bank.questions[qid]["question"],
+             " ".join(bank.questions[qid]["options"]) + " " + bank.questions[qid].get("explanation", ""))
+            for qid in bank.matching(unit=unit)
+        ]
+        return SearchIndex(docs)
+
+    return _build_derived(("search", unit), versions, build)
+
+
+def content_version(unit: str = DEFAULT_UNIT, kind: str = "guide") -> str:
+    """Content hash of one of the unit's shards, for keying caches of derived output."""
+    if kind == "mcq":
+        return _mcq_version(_mcq_shards(unit))
+    parser = {"guide": str, "flashcards": _read_jsonl}[kind]
+    return _load(_shard_path(unit, kind), parser)[1]
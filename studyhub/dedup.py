@@ -0,0 +1,261 @@
+"""
+Near-duplicate detection for MCQs with MinHash signatures and LSH banding.
+
+A question is reduced to the set of roughly stemmed content words in its
+stem and correct answer, so a reworded question with the same answer keeps
+most of its set. Each MinHash value is the minimum of one hash
+function over that set; two questions agree on a value with probability
+equal to the Jaccard similarity of their sets. Signatures are cut into
+bands, and questions sharing any band are candidates. Candidates are then
+compared exactly, so a lookup touches a handful of questions rather than
+the whole bank.
+
+Scan the bank (every MCQ shard in the manifest) and, optionally, the AI
+question store for clusters of near-duplicates:
+
+    python -m studyhub.dedup
+    python -m studyhub.dedup --threshold 0.4 --store .studyhub/questions.sqlite3 --json dups.json
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from array import array
+
+from studyhub.question_bank import LETTERS
+from studyhub.retrieval import tokenize
+
+# question boilerplate that says nothing about what is being asked
+_FILLER = frozenset(
+    """
+    which following best most least explain explains explained describe describes described how
+    what why did does do statement statements accurately likely both would could can one
+    effect affect impact role significance
+    """.split()
+)
+# longest first; a stem keeps at least four letters
+_SUFFIXES = ("ations", "ation", "ments", "ment", "ings", "ing", "ers", "er", "ed", "ion", "al", "es", "e", "y")
+
+
+@functools.lru_cache(maxsize=65536)
+def _stem(word: str) -> str:
+    if word.endswith("ie"):  # "factories" arrives as "factorie"
+        word = word[:-2] + "y"
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def question_text(q) -> str:
+    """Stem plus the text of the correct option, e.g. for 'B', options[1] without its 'B. ' label."""
+    options = q["options"]
+    correct = q.get("correct")
+    answer = ""
+    if correct in LETTERS and LETTERS.index(correct) < len(options):
+        answer = options[LETTERS.index(correct)]
+        if answer[:3] == f"{correct}. ":
+            answer = answer[3:]
+    return f"{q['question']} {answer}"
+
+
+def shingles(text: str):
+    """Set of stemmed content words of `text`."""
+    return frozenset(_stem(w) for w in tokenize(text) if len(w) > 1 and w not in _FILLER)
+
+
+@functools.lru_cache(maxsize=65536)
+def _word_hashes(word: str, num_perm: int, seed: int):
+    """`num_perm` independent 32-bit hashes of `word`; the vocabulary is small, so they're cached."""
+    digest = hashlib.shake_128(f"{seed}:{word}".encode("utf-8")).digest(4 * num_perm)
+    return tuple(array("I", digest))
+
+
+def jaccard(a, b) -> float:
+    if not a and not b:
+        return 1.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+def _choose_bands(num_perm: int, threshold: float, recall: float = 0.9):
+    """
+    (bands, rows) using at most `num_perm` values: the most rows per band (fewest
+    dissimilar candidates) that still make a pair at `threshold` a candidate
+    with probability `recall` or better.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= recall:
+            best = (bands, rows)
+    return best
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index of questions, keyed by any hashable id.
+
+    query() returns the indexed questions whose shingle sets have Jaccard
+    similarity of at least `threshold` with a candidate's; admit() adds the
+    candidate only if there are none. Both are thread-safe.
+    """
+
+    def __init__(self, threshold: float = 0.4, num_perm: int = 128, seed: int = 1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.seed = seed
+        self.bands, self.rows = _choose_bands(num_perm, threshold)
+        self._buckets = [{} for _ in range(self.bands)]
+        self._shingles = {}
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.rejected = 0
+
+    def __len__(self):
+        return len(self._shingles)
+
+    def signature(self, shingle_set):
+        """MinHash values of a shingle set: per hash function, the smallest hash of any word."""
+        if not shingle_set:
+            return (0,) * self.num_perm
+        return tuple(map(min, zip(*(_word_hashes(w, self.num_perm, self.seed) for w in shingle_set))))
+
+    def _band_keys(self, signature):
+        r = self.rows
+        return [hash(signature[i * r:(i + 1) * r]) for i in range(self.bands)]
+
+    def _matches(self, shingle_set, band_keys):
+        candidates = set()
+        for buckets, key in zip(self._buckets, band_keys):
+            candidates.update(buckets.get(key, ()))
+        matches = []
+        size, threshold, indexed = len(shingle_set), self.threshold, self._shingles
+        for key in candidates:
+            other = indexed[key]
+            shared = len(shingle_set & other)
+            union = size + len(other) - shared
+            if shared >= threshold * union:
+                matches.append((key, shared / union if union else 1.0))
+        matches.sort(key=lambda m: m[1], reverse=True)
+        return matches
+
+    def _insert(self, key, shingle_set, band_keys):
+        self._shingles[key] = shingle_set
+        for buckets, band_key in zip(self._buckets, band_keys):
+            buckets.setdefault(band_key, []).append(key)
+
+    def query(self, q):
+        """(key, similarity) of indexed near-duplicates of `q`, most similar first."""
+        s = shingles(question_text(q))
+        band_keys = self._band_keys(self.signature(s))
+        with self._lock:
+            return self._matches(s, band_keys)
+
+    def add(self, key, q):
+        """Indexes `q` under `key` unconditionally."""
+        s = shingles(question_text(q))
+        band_keys = self._band_keys(self.signature(s))
+        with self._lock:
+            if key not in self._shingles:
+                self._insert(key, s, band_keys)
+
+    def admit(self, key, q):
+        """
+        Indexes `q` under `key` unless it near-duplicates an indexed question.
+        Returns (admitted, matches).
+        """
+        s = shingles(question_text(q))
+        band_keys = self._band_keys(self.signature(s))
+        with self._lock:
+            matches = self._matches(s, band_keys)
+            if matches:
+                self.rejected += 1
+            else:
+                self.admitted += 1
+                if key not in self._shingles:
+                    self._insert(key, s, band_keys)
+            return not matches, matches
+
+
+def find_clusters(items, threshold: float = 0.4, num_perm: int = 128):
+    """
+    Groups (key, question) pairs into clusters of near-duplicates. Returns the
+    clusters (lists of keys, in input order) with two or more members, largest
+    first, and the mean seconds spent per question.
+    """
+    index = NearDuplicateIndex(threshold, num_perm)
+    parent = {}
+
+    def find(k):
+        while parent[k] != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    order = []
+    start = time.perf_counter()
+    for key, q in items:
+        parent[key] = key
+        order.append(key)
+        for other, _ in index.query(q):
+            parent[find(key)] = find(other)
+        index.add(key, q)
+    elapsed = time.perf_counter() - start
+
+    groups = {}
+    for key in order:
+        groups.setdefault(find(key), []).append(key)
+    clusters = sorted((g for g in groups.values() if len(g) > 1), key=len, reverse=True)
+    return clusters, elapsed / len(order) if order else 0.0
+
+
+def main(argv=None):
+    from studyhub import content
+    from studyhub.question_store import QuestionStore
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threshold", type=float, default=0.4, help="Jaccard similarity for a near-duplicate")
+    parser.add_argument("--num-perm", type=int, default=128, help="MinHash values per question")
+    parser.add_argument("--store", help="also scan the AI question store at this path")
+    parser.add_argument("--limit", type=int, default=20, help="clusters to print")
+    parser.add_argument("--json", help="write every cluster to this file")
+    args = parser.parse_args(argv)
+
+    items = []
+    bank = content.load_question_bank()
+    for qid, q in enumerate(bank.questions):
+        items.append((f"bank:{qid}", q))
+    if args.store:
+        if not os.path.exists(args.store):
+            parser.error(f"{args.store} not found")
+        for qid, _, q in QuestionStore(args.store).items():
+            items.append((f"store:{qid}", q))
+    questions = dict(items)
+
+    clusters, per_question = find_clusters(items, args.threshold, args.num_perm)
+    duplicated = sum(len(c) - 1 for c in clusters)
+    print(
+        f"{len(items)} questions · {len(clusters)} near-duplicate clusters · "
+        f"{duplicated} questions that repeat another ({duplicated / max(len(items), 1):.1%}) · "
+        f"{per_question * 1e6:.0f} µs per question"
+    )
+    for cluster in clusters[:args.limit]:
+        print(f"\n{len(cluster)} questions:")
+        for key in cluster:
+            text = questions[key]["question"]
+            print(f"  {key:>12}  {text[:110]}{'…' if len(text) > 110 else ''}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                [[{"key": k, "question": questions[k]["question"], "topic": questions[k].get("topic")}
+                  for k in cluster] for cluster in clusters],
+                f, indent=2, ensure_ascii=False,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+Local stand-in for the OpenAI chat completions endpoint, for benchmarks and
+offline runs. It answers POST /v1/chat/completions with made-up MCQs in the
+format the prompts ask for, after a configurable delay, and can be told to
+fail, return malformed JSON or reword earlier questions at a given rate.
+Requests with "stream": true get the reply as server-sent events, a few
+characters per chunk, the way the real API streams tokens.
+
+Run it standalone and point the app at it:
+
+    python -m studyhub.fake_openai --port 8765 --latency 1.5
+    OPENAI_API_KEY=fake OPENAI_BASE_URL=http://127.0.0.1:8765/v1 streamlit run app.py
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_LETTERS = "ABCD"
+
+
+def _fake_word(rng: random.Random) -> str:
+    return "".join(rng.choice("bdfgklmnprstvz") + rng.choice("aeiou") for _ in range(3))
+
+
+def _fake_question(seq: int, topic: str, rng: random.Random, words=None):
+    """
+    A made-up question built around ten random words, so questions don't look
+    alike. Given the `words` of an earlier question, it rewords that one instead.
+    """
+    answer = rng.choice(_LETTERS)
+    if words is None:
+        words = [_fake_word(rng) for _ in range(10)]
+        stem = (f"Fake question #{seq} about {topic}: how did {words[0]} and {words[1]} change "
+                f"{words[2]} {words[3]} {words[4]} {words[5]}?")
+    else:
+        stem = (f"Fake question #{seq} on {topic}: what link between {words[0]}, {words[1]} "
+                f"and {words[2]} shaped {words[3]} {words[4]} {words[5]}?")
+    options = [f"{letter}. Option {letter} for question {seq}" for letter in _LETTERS]
+    options[_LETTERS.index(answer)] = f"{answer}. {' '.join(words[6:])}"
+    return {
+        "question": stem,
+        "options": options,
+        "answer": answer,
+        "explanation": f"Option {answer} is correct for fake question {seq}.",
+    }, words
+
+
+def _malformed(content: str, rng: random.Random, json_mode: bool = False):
+    """
+    A broken or sloppy version of `content` and the finish reason to report.
+    In JSON mode replies are always valid JSON unless cut off, as with the real API.
+    """
+    kinds = ["truncated", "missing", "unlabeled"]
+    if not json_mode:
+        kinds += ["fenced", "prefixed", "trailing_comma"]
+    kind = rng.choice(kinds)
+    if kind == "truncated":
+        return content[: len(content) // 2], "length"
+    if kind == "fenced":
+        return f"```json\n{content}\n```", "stop"
+    if kind == "prefixed":
+        return f"Here is your question:\n{content}", "stop"
+    if kind == "trailing_comma":
+        return content.replace("]", ",]").replace("}", ",}"), "stop"
+    data = json.loads(content)
+    target = data["questions"][0] if "questions" in data else data
+    if kind == "missing":
+        target.pop("answer", None)
+        target.pop("explanation", None) if rng.random() < 0.5 else None
+    else:
+        # options without "A. " labels, answer given as the option's text
+        target["options"] = [o[3:] for o in target["options"]]
+        target["answer"] = target["options"][_LETTERS.index(target["answer"])]
+    return json.dumps(data), "stop"
+
+
+def _reask_reply(prompt: str, rng: random.Random):
+    """Fills in just the fields each item of a re-ask prompt lists as missing."""
+    m = re.search(r"Items:\n(.*?)\n\nReturn ONLY", prompt, re.S)
+    items = json.loads(m.group(1)) if m else []
+    fixes = []
+    for item in items:
+        fix = {"index": item.get("index")}
+        for field in item.get("missing", []):
+            if field == "options":
+                fix["options"] = [f"{letter}. Re-asked option {letter}" for letter in _LETTERS]
+            elif field == "answer":
+                fix["answer"] = rng.choice(_LETTERS)
+            elif field == "explanation":
+                fix["explanation"] = "Re-asked explanation."
+        fixes.append(fix)
+    return json.dumps({"items": fixes})
+
+
+class FakeOpenAIServer:
+    """
+    Threaded HTTP server on localhost. Attributes can be changed while it runs.
+
+    latency / jitter   seconds to wait before answering (uniform jitter added)
+    error_rate         fraction of requests answered with a 500 or 429
+    duplicate_rate     fraction of questions that reword a recent one instead of being new
+    connect_latency    seconds added to each new connection, standing in for a TCP/TLS handshake
+    malformed_rate     fraction of answers that are cut off, not clean JSON or miss fields
+                       (only cut-off or incomplete ones in JSON mode)
+    first_token_share  for streamed replies, the part of `latency` spent before the first
+                       chunk; the rest is spread over the chunks
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        seed: int = None,
+        duplicate_rate: float = 0.0,
+        connect_latency: float = 0.0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.duplicate_rate = duplicate_rate
+        self.connect_latency = connect_latency
+        self.first_token_share = 0.1
+        self._recent = []  # words of recent questions, for rewording
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self.stats = {
+            "requests": 0, "streams": 0, "connections": 0, "errors": 0, "malformed": 0, "reasks": 0, "questions": 0, "reworded": 0,
+            "prompt_tokens": 0, "completion_tokens": 0,
+        }
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serves on the calling thread until interrupted."""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+    def _roll(self, rate: float) -> bool:
+        with self._rng_lock:
+            return self._rng.random() < rate
+
+    def completion(self, body):
+        """
+        Builds the (status, payload) answer for one chat completion request. For a
+        streamed request only the wait for the first chunk is spent here.
+        """
+        self._count("requests")
+        with self._rng_lock:
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if body.get("stream"):
+            self._count("streams")
+            delay *= self.first_token_share
+        if delay:
+            time.sleep(delay)
+        if self._roll(self.error_rate):
+            self._count("errors")
+            status = 429 if self._roll(0.5) else 500
+            return status, {"error": {"message": "fake upstream failure", "type": "server_error", "code": status}}
+
+        messages = body.get("messages", [])
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        finish_reason = "stop"
+        if "are missing some fields" in prompt:
+            self._count("reasks")
+            with self._rng_lock:
+                content = _reask_reply(prompt, self._rng)
+        else:
+            m = re.search(r"write (\d+) different", prompt)
+            n = int(m.group(1)) if m else 1
+            t = re.search(r"question(?:s)?\s+about (.+?)\.", prompt)
+            topic = t.group(1) if t else "Unit 5"
+            questions, reworded = [], 0
+            with self._rng_lock:
+                for _ in range(n):
+                    reword = self._recent and self.duplicate_rate and self._rng.random() < self.duplicate_rate
+                    q, words = _fake_question(
+                        next(self._seq), topic, self._rng, self._rng.choice(self._recent) if reword else None
+                    )
+                    questions.append(q)
+                    if reword:
+                        reworded += 1
+                    else:
+                        self._recent = (self._recent + [words])[-50:]
+            self._count("reworded", reworded)
+            content = json.dumps({"questions": questions} if m else questions[0])
+            if self._roll(self.malformed_rate):
+                self._count("malformed")
+                with self._rng_lock:
+                    content, finish_reason = _malformed(content, self._rng, json_mode)
+            else:
+                self._count("questions", n)
+        self._count("prompt_tokens", len(prompt) // 4)
+        self._count("completion_tokens", len(content) // 4)
+
+        return 200, {
+            "id": f"chatcmpl-fake-{next(self._seq)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": finish_reason,
+                }
+            ],
+            "usage": {
+                "prompt_tokens": len(prompt) // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": len(prompt) // 4 + len(content) // 4,
+            },
+        }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                server._count("connections")
+                if server.connect_latency:
+                    time.sleep(server.connect_latency)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    body = {}
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    status, payload = 404, {"error": {"message": f"unknown path {self.path}"}}
+                else:
+                    status, payload = server.completion(body)
+                if status == 200 and body.get("stream"):
+                    self._stream(body, payload)
+                    return
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, body, payload):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                events = list(server.stream_chunks(body, payload))
+                pause = server.latency * (1 - server.first_token_share) / max(len(events) - 1, 1)
+                for i, event in enumerate(events):
+                    if i and pause:
+                        time.sleep(pause)
+                    self._write_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                self._write_chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+            def _write_chunk(self, data: bytes):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def stream_chunks(self, body, payload, chars: int = 4):
+        """
+        The chat.completion.chunk events for a finished `payload`: its content
+        `chars` at a time, the finish reason, then the usage if the request asked
+        for it, as the API does with stream_options.include_usage.
+        """
+        choice = payload["choices"][0]
+        content = choice["message"]["content"]
+        base = {k: payload[k] for k in ("id", "created", "model")}
+        base["object"] = "chat.completion.chunk"
+        for i in range(0, len(content), chars):
+            delta = {"content": content[i:i + chars]}
+            if i == 0:
+                delta["role"] = "assistant"
+            yield {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+        yield {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": choice["finish_reason"]}]}
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield {**base, "choices": [], "usage": payload["usage"]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI chat completions API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=1.0, help="seconds before each answer")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--duplicate-rate", type=float, default=0.0)
+    parser.add_argument("--connect-latency", type=float, default=0.0, help="seconds added per new connection")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    server = FakeOpenAIServer(
+        args.host, args.port, args.latency, args.jitter, args.error_rate, args.malformed_rate, args.seed,
+        args.duplicate_rate, args.connect_latency,
+    )
+    print(f"fake OpenAI endpoint at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
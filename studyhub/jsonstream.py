@@ -0,0 +1,262 @@
+"""
+Incremental JSON parsing for streamed model replies.
+
+IncrementalJSONParser is fed a reply chunk by chunk and keeps the value
+parsed so far: objects and arrays as they fill, with a string that is still
+arriving present under its key holding the text received so far. Numbers,
+true/false/null and object keys appear once they are complete. Each
+character is parsed once, so parsing a reply costs time linear in its length
+however it is chunked. A string that is still arriving is only put together
+when `value` is read; that copies the text received so far, so reading
+`value` after every chunk of a long string costs its length each time.
+
+Prose or a code fence before the JSON is skipped; anything after the top-level
+value is ignored.
+"""
+
+_WHITESPACE = " \t\r\n"
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_LITERALS = {"true": True, "false": False, "null": None}
+
+
+class IncrementalJSONParser:
+    """
+    Push parser for one JSON value.
+
+        parser = IncrementalJSONParser()
+        for chunk in chunks:
+            parser.feed(chunk)
+            show(parser.value)   # partial dicts/lists/strings so far
+        parser.complete          # True once the top-level value has closed
+
+    Malformed input stops the parser (`error` says where); `value` keeps what
+    was parsed before that point.
+    """
+
+    def __init__(self):
+        self._value = None
+        self.complete = False
+        self.error = None
+        self._started = False
+        # open containers: [container, key] where key is the pending object key
+        # (or None), and the state of the innermost one
+        self._stack = []
+        self._state = "value"  # value | key | colon | comma | string | key_string | scalar
+        self._buf = []
+        self._escape = None  # None, "" after a backslash, or the hex digits of a \\u escape
+        self._high = None  # a \\u high surrogate waiting for the low one after it
+        self._stale = False  # whether the partial string in `_value` lags what has been read
+        self.chars = 0
+
+    # -- public ------------------------------------------------------------------
+
+    @property
+    def value(self):
+        """The value parsed so far (None before the first bracket)."""
+        if self._stale:
+            self._stale = False
+            if self._state == "string":
+                self._show_partial_string()
+        return self._value
+
+    def feed(self, text: str):
+        """Parses `text`, continuing from where the previous chunk ended."""
+        if self.complete or self.error:
+            return self
+        self.chars += len(text)
+        i = 0
+        if not self._started:
+            starts = [j for j in (text.find("{"), text.find("[")) if j != -1]
+            if not starts:
+                return self
+            i = min(starts)
+            self._started = True
+        n = len(text)
+        while i < n and not self.complete and not self.error:
+            state = self._state
+            if state in ("string", "key_string"):
+                i = self._read_string(text, i)
+                continue
+            c = text[i]
+            i += 1
+            if state == "scalar":
+                if c in ",]}" or c in _WHITESPACE:
+                    self._end_scalar()
+                    i -= 1  # the delimiter belongs to the container
+                else:
+                    self._buf.append(c)
+                continue
+            if c in _WHITESPACE:
+                continue
+            if state == "value":
+                self._start_value(c)
+            elif state == "key":
+                if c == '"':
+                    self._state = "key_string"
+                    self._buf = []
+                elif c == "}":
+                    self._close("}")
+                else:
+                    self._fail(f"expected a key, got {c!r}")
+            elif state == "colon":
+                if c == ":":
+                    self._state = "value"
+                else:
+                    self._fail(f"expected ':', got {c!r}")
+            elif state == "comma":
+                if c == ",":
+                    self._state = "key" if isinstance(self._stack[-1][0], dict) else "value"
+                elif c in "]}":
+                    self._close(c)
+                else:
+                    self._fail(f"expected ',' or a closing bracket, got {c!r}")
+        self._stale = self._state == "string"
+        return self
+
+    # -- internals ---------------------------------------------------------------
+
+    def _fail(self, message: str):
+        self.error = f"{message} after {self.chars} characters"
+
+    def _start_value(self, c: str):
+        if c == "{" or c == "[":
+            container = {} if c == "{" else []
+            self._attach(container)
+            self._stack.append([container, None])
+            self._state = "key" if c == "{" else "value"
+        elif c == '"':
+            self._state = "string"
+            self._buf = []
+            self._attach("")
+        elif c == "]" and self._stack and isinstance(self._stack[-1][0], list):
+            self._close("]")  # empty array, or a trailing comma before the bracket
+        elif c == "}" and self._stack and isinstance(self._stack[-1][0], dict):
+            self._close("}")
+        elif c in "-0123456789tfn":
+            self._state = "scalar"
+            self._buf = [c]
+        else:
+            self._fail(f"unexpected {c!r}")
+
+    def _attach(self, value):
+        """Puts a new value in the innermost container, or makes it the top-level value."""
+        if not self._stack:
+            self._value = value
+            return
+        container, key = self._stack[-1]
+        if isinstance(container, dict):
+            container[key] = value
+        else:
+            container.append(value)
+
+    def _replace(self, value):
+        """Replaces the value last attached (a partial string or a scalar placeholder)."""
+        if not self._stack:
+            self._value = value
+            return
+        container, key = self._stack[-1]
+        if isinstance(container, dict):
+            container[key] = value
+        else:
+            container[-1] = value
+
+    def _after_value(self):
+        if self._stack:
+            self._state = "comma"
+        else:
+            self.complete = True
+
+    def _close(self, bracket: str):
+        container, _ = self._stack.pop()
+        if isinstance(container, dict) != (bracket == "}"):
+            self._fail(f"mismatched {bracket!r}")
+            return
+        self._after_value()
+
+    def _end_scalar(self):
+        token = "".join(self._buf)
+        if token in _LITERALS:
+            value = _LITERALS[token]
+        else:
+            try:
+                value = float(token) if any(ch in token for ch in ".eE") else int(token)
+            except ValueError:
+                self._fail(f"bad literal {token!r}")
+                return
+        self._attach(value)
+        self._after_value()
+
+    def _read_string(self, text: str, i: int) -> int:
+        """Consumes string characters from text[i:]; returns the index after what it used."""
+        buf = self._buf
+        n = len(text)
+        while i < n:
+            if self._escape is not None:
+                c = text[i]
+                i += 1
+                if self._escape == "":
+                    if c == "u":
+                        self._escape = "u"
+                    else:
+                        self._end_surrogate(buf)
+                        buf.append(_ESCAPES.get(c, c))
+                        self._escape = None
+                else:
+                    self._escape += c
+                    if len(self._escape) == 5:  # "u" + 4 hex digits
+                        try:
+                            self._code_point(buf, int(self._escape[1:], 16))
+                        except ValueError:
+                            pass
+                        self._escape = None
+                continue
+            # copy a run of plain characters in one go
+            j = i
+            while j < n and text[j] not in '"\\':
+                j += 1
+            if j > i:
+                self._end_surrogate(buf)
+                buf.append(text[i:j])
+                i = j
+                continue
+            c = text[i]
+            i += 1
+            if c == "\\":
+                self._escape = ""
+                continue
+            # closing quote
+            self._end_surrogate(buf)
+            s = "".join(buf)
+            self._buf = []
+            if self._state == "key_string":
+                self._stack[-1][1] = s
+                self._state = "colon"
+            else:
+                self._replace(s)
+                self._after_value()
+            return i
+        return i
+
+    def _code_point(self, buf, cp: int):
+        """Adds a \\u escape's code point, joining a surrogate pair into one character as json does."""
+        if self._high is not None:
+            if 0xDC00 <= cp <= 0xDFFF:
+                buf.append(chr(0x10000 + ((self._high - 0xD800) << 10) + (cp - 0xDC00)))
+                self._high = None
+                return
+            self._end_surrogate(buf)
+        if 0xD800 <= cp <= 0xDBFF:
+            self._high = cp
+        else:
+            buf.append(chr(cp))
+
+    def _end_surrogate(self, buf):
+        """Keeps a high surrogate that no low one followed as a lone character, as json does."""
+        if self._high is not None:
+            buf.append(chr(self._high))
+            self._high = None
+
+    def _show_partial_string(self):
+        s = "".join(self._buf)
+        self._buf = [s]
+        self._replace(s)
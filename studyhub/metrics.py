@@ -0,0 +1,224 @@
+import bisect
+import functools
+import os
+import random
+import threading
+import time
+
+# upper bounds in seconds, roughly 2.5x apart: sub-millisecond cache hits up to slow API calls
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+class Histogram:
+    """Prometheus-style histogram: observation counts per bucket, plus their sum and count."""
+
+    __slots__ = ("bounds", "counts", "sum", "count", "max")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float):
+        """Estimate of the q-quantile, interpolating linearly inside its bucket (never above the max)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.bounds[i - 1] if i else 0.0
+                if i == len(self.bounds):
+                    return self.max
+                return min(self.max, lower + (self.bounds[i] - lower) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("_metrics", "_name", "_labels", "_start")
+
+    def __init__(self, metrics, name, labels):
+        self._metrics = metrics
+        self._name = name
+        self._labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._metrics._record(self._name, self._labels, time.perf_counter() - self._start)
+        return False
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _key(name: str, labels: dict):
+    return name, tuple(sorted(labels.items()))
+
+
+class Metrics:
+    """
+    In-process timing histograms and counters, exported as Prometheus text.
+
+    `sample_rate` is the fraction of timings recorded (1 = all of them, 0 =
+    none). At 0, timer() hands back a shared no-op context manager and
+    observe() and inc() return straight away, so instrumented code pays for
+    little more than the call. Counters aren't sampled while enabled.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, prefix: str = "studyhub"):
+        self.sample_rate = sample_rate
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._exporter = None
+
+    def _record(self, name: str, labels: dict, value: float):
+        key = _key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram()
+            hist.observe(value)
+
+    def timer(self, name: str, **labels):
+        """Context manager recording the time spent inside it under `name` and `labels`."""
+        rate = self.sample_rate
+        if rate < 1 and (rate <= 0 or random.random() >= rate):
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def timed(self, name: str, **labels):
+        """Decorator form of timer()."""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Records a duration measured by the caller."""
+        rate = self.sample_rate
+        if rate < 1 and (rate <= 0 or random.random() >= rate):
+            return
+        self._record(name, labels, seconds)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        if self.sample_rate <= 0:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self):
+        """
+        {"histograms": [...], "counters": [...]}, each entry a dict with the
+        metric name and labels; histograms carry count, sum, mean, p50/p95/p99 and max.
+        """
+        with self._lock:
+            histograms = [
+                {
+                    "name": name, "labels": dict(labels), "count": h.count, "sum": h.sum,
+                    "mean": h.sum / h.count if h.count else None,
+                    "p50": h.quantile(0.5), "p95": h.quantile(0.95), "p99": h.quantile(0.99),
+                    "max": h.max,
+                }
+                for (name, labels), h in sorted(self._histograms.items())
+            ]
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+        return {"histograms": histograms, "counters": counters}
+
+    def prometheus_text(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        def fmt(labels, extra=()):
+            items = list(labels) + list(extra)
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}" if items else ""
+
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), h in sorted(self._histograms.items()):
+                full = f"{self.prefix}_{name}"
+                if full not in typed:
+                    typed.add(full)
+                    lines.append(f"# TYPE {full} histogram")
+                cumulative = 0
+                for bound, n in zip(h.bounds + (float("inf"),), h.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{full}_bucket{fmt(labels, [('le', le)])} {cumulative}")
+                lines.append(f"{full}_sum{fmt(labels)} {h.sum!r}")
+                lines.append(f"{full}_count{fmt(labels)} {h.count}")
+            for (name, labels), value in sorted(self._counters.items()):
+                full = f"{self.prefix}_{name}"
+                if full not in typed:
+                    typed.add(full)
+                    lines.append(f"# TYPE {full} counter")
+                lines.append(f"{full}{fmt(labels)} {value!r}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Writes prometheus_text() to `path` atomically (for node_exporter's textfile collector)."""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+    def start_export(self, path: str, interval_seconds: float = 15.0):
+        """Rewrites the Prometheus file at `path` every `interval_seconds` from a daemon thread."""
+        if self._exporter is not None:
+            return
+
+        def run():
+            while True:
+                try:
+                    self.write_prometheus(path)
+                except OSError:
+                    pass
+                time.sleep(interval_seconds)
+
+        self._exporter = threading.Thread(target=run, name="metrics-export", daemon=True)
+        self._exporter.start()
+
+
+METRICS = Metrics()
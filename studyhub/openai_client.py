@@ -0,0 +1,54 @@
+"""
+OpenAI client construction with a tuned connection pool.
+
+`openai` (and the HTTP library under it) is only imported when a client is
+made, so a process that never generates AI questions doesn't load it. The
+client keeps idle connections open between calls, so a call made shortly
+after another reuses its TCP/TLS connection instead of handshaking again,
+and speaks HTTP/2 (the `h2` package, listed in requirements.txt), which lets
+concurrent calls share one connection.
+"""
+import importlib.util
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def available() -> bool:
+    """Whether the openai package is installed, without importing it."""
+    return importlib.util.find_spec("openai") is not None
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def make_client(base_url: str = None, api_key: str = None, max_connections: int = 20,
+                max_keepalive: int = 10, keepalive_seconds: float = 30.0, http2: bool = True):
+    """
+    An OpenAI client whose pool holds up to `max_connections` connections,
+    keeping `max_keepalive` of them open for `keepalive_seconds` when idle.
+    HTTP/2 is used unless `http2` is false; without `h2` installed the client
+    falls back to HTTP/1.1 and logs a warning. Retries are left to
+    resilience.CallPolicy (max_retries=0).
+    """
+    from openai import DEFAULT_CONNECTION_LIMITS, DefaultHttpxClient, OpenAI
+
+    if http2 and not http2_available():
+        logger.warning("h2 is not installed, so OpenAI calls use HTTP/1.1; pip install -r requirements.txt")
+        http2 = False
+    # the Limits class of whichever HTTP library the installed SDK is built on
+    limits = type(DEFAULT_CONNECTION_LIMITS)
+    http_client = DefaultHttpxClient(
+        http2=http2,
+        limits=limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_seconds,
+        ),
+    )
+    logger.info(
+        "OpenAI client: %d connections, %d kept alive for %.0fs, HTTP/%s",
+        max_connections, max_keepalive, keepalive_seconds, "2" if http2 else "1.1",
+    )
+    return OpenAI(base_url=base_url, api_key=api_key, max_retries=0, http_client=http_client)
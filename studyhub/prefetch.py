@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MemoryQueue:
+    """
+    Ready questions and in-flight refill counts for one process; the default
+    QuestionPrefetcher queue. See shared_queue.SharedQuestionQueue for one
+    that several processes can share.
+    """
+
+    def __init__(self):
+        self._queues = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def pop(self, topic: str):
+        with self._lock:
+            queue = self._queues.setdefault(topic, deque())
+            return queue.popleft() if queue else None
+
+    def reserve(self, topic: str, low_watermark: int, high_watermark: int, batch_size: int):
+        """
+        If ready plus in-flight questions are below `low_watermark`, records refill
+        jobs up to `high_watermark` as in flight and returns them as (job, n) pairs.
+        """
+        with self._lock:
+            depth = len(self._queues.setdefault(topic, deque())) + self._in_flight.get(topic, 0)
+            if depth >= low_watermark:
+                return []
+            jobs = []
+            needed = high_watermark - depth
+            while needed > 0:
+                n = min(needed, batch_size)
+                needed -= n
+                self._in_flight[topic] = self._in_flight.get(topic, 0) + n
+                jobs.append((None, n))
+            return jobs
+
+    def complete(self, topic: str, job, n: int, questions, high_watermark: int):
+        """Ends a refill job, queueing its questions up to `high_watermark`."""
+        with self._lock:
+            self._in_flight[topic] -= n
+            queue = self._queues[topic]
+            room = high_watermark - len(queue)
+            queue.extend(questions[:max(room, 0)])
+
+    def depths(self):
+        with self._lock:
+            return {topic: len(queue) for topic, queue in self._queues.items()}
+
+    def in_flight(self):
+        with self._lock:
+            return dict(self._in_flight)
+
+
+class QuestionPrefetcher:
+    """
+    Keeps a bounded queue of ready AI questions per topic, refilled by a
+    background worker pool.
+
+    `generate(topic, n)` must return a list of up to `n` questions; each
+    refill job asks for at most `batch_size` at once. When a topic's queue
+    (plus questions already in flight) drops below `low_watermark`, enough
+    jobs are scheduled to bring it back up to `high_watermark`. `get()`
+    never blocks: it returns None on an empty queue and the caller decides
+    how to fall back.
+
+    Queues live in `queue` (a MemoryQueue unless given), so several
+    processes can share them; hit/miss and refill stats are per process.
+    """
+
+    def __init__(
+        self,
+        generate,
+        high_watermark: int = 8,
+        low_watermark: int = 3,
+        workers: int = 2,
+        batch_size: int = 1,
+        queue=None,
+    ):
+        if not 0 <= low_watermark <= high_watermark:
+            raise ValueError("low_watermark must be between 0 and high_watermark")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self._generate = generate
+        self.batch_size = batch_size
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self._queue = queue if queue is not None else MemoryQueue()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mcq-prefetch")
+        self._hits = 0
+        self._misses = 0
+        self._failures = 0
+        self._refills = 0
+        self._refill_seconds = 0.0
+        self._last_refill_seconds = None
+
+    def get(self, topic: str):
+        """
+        Pops a ready question for `topic`, or returns None if the queue is empty.
+        Either way a refill is scheduled if the queue is below the low watermark.
+        """
+        question = self._queue.pop(topic)
+        with self._lock:
+            if question is not None:
+                self._hits += 1
+            else:
+                self._misses += 1
+        self._schedule_refill(topic)
+        return question
+
+    def warm(self, topic: str):
+        """Starts filling `topic`'s queue without taking anything from it."""
+        self._schedule_refill(topic)
+
+    def _schedule_refill(self, topic: str):
+        jobs = self._queue.reserve(topic, self.low_watermark, self.high_watermark, self.batch_size)
+        for job, n in jobs:
+            self._executor.submit(self._refill, topic, job, n)
+
+    def _refill(self, topic: str, job, n: int):
+        start = time.perf_counter()
+        try:
+            questions = self._generate(topic, n) or []
+        except Exception:
+            questions = []
+        elapsed = time.perf_counter() - start
+
+        self._queue.complete(topic, job, n, questions, self.high_watermark)
+        with self._lock:
+            if not questions:
+                self._failures += 1
+                return
+            self._refills += 1
+            self._refill_seconds += elapsed
+            self._last_refill_seconds = elapsed
+
+    def stats(self):
+        """Returns a snapshot of queue depths, hit/miss counts and refill latency."""
+        depth, in_flight = self._queue.depths(), self._queue.in_flight()
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "depth": depth,
+                "in_flight": in_flight,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else None,
+                "refills": self._refills,
+                "failed_refills": self._failures,
+                "avg_refill_seconds": self._refill_seconds / self._refills if self._refills else None,
+                "last_refill_seconds": self._last_refill_seconds,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
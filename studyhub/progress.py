@@ -0,0 +1,152 @@
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress (
+    student TEXT NOT NULL,
+    key TEXT NOT NULL,
+    format TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (student, key)
+);
+"""
+
+
+def _encode(value):
+    if isinstance(value, (bytes, bytearray)):
+        return "bytes", bytes(value)
+    return "json", json.dumps(value, ensure_ascii=False)
+
+
+def _decode(fmt: str, data):
+    return bytes(data) if fmt == "bytes" else json.loads(data)
+
+
+class ProgressStore:
+    """
+    Per-student progress (key -> JSON value or bytes) in SQLite, WAL mode.
+
+    Writes go to an in-memory buffer, where repeated writes to the same key
+    collapse into one, and a background thread upserts the buffer in a single
+    transaction every `flush_seconds`, or sooner once `flush_rows` keys are
+    pending. Reads check the buffer, then an LRU cache of recently read or
+    written values, and only then the database. The buffer is flushed on
+    close(), which also runs at interpreter exit.
+    """
+
+    def __init__(self, path: str, flush_seconds: float = 2.0, flush_rows: int = 500,
+                 cache_size: int = 10000):
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self.flush_rows = flush_rows
+        self._cache_size = cache_size
+        self._pending = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._writes = 0
+        self._flushes = 0
+        self._rows_flushed = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+        self._thread = threading.Thread(target=self._run, name="progress-flush", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _remember(self, key, value):
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def put(self, student: str, key: str, value):
+        """Queues a write; it reaches the database with the next flush."""
+        with self._lock:
+            self._pending[(student, key)] = value
+            self._remember((student, key), value)
+            self._writes += 1
+            if len(self._pending) >= self.flush_rows:
+                self._wake.set()
+
+    def get(self, student: str, key: str, default=None):
+        with self._lock:
+            if (student, key) in self._pending:
+                return self._pending[(student, key)]
+            if (student, key) in self._cache:
+                self._cache.move_to_end((student, key))
+                return self._cache[(student, key)]
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT format, data FROM progress WHERE student = ? AND key = ?", (student, key)
+            ).fetchone()
+        if row is None:
+            return default
+        value = _decode(*row)
+        with self._lock:
+            # a put() may have landed while we were reading
+            if (student, key) in self._pending:
+                return self._pending[(student, key)]
+            self._remember((student, key), value)
+        return value
+
+    def flush(self):
+        """Writes every pending value now, in one transaction."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        rows = [(student, key, *_encode(value)) for (student, key), value in pending.items()]
+        try:
+            with self._db_lock, self._conn:
+                self._conn.executemany(
+                    "INSERT INTO progress (student, key, format, data) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (student, key) DO UPDATE SET format = excluded.format, data = excluded.data",
+                    rows,
+                )
+        except sqlite3.Error:
+            log.exception("progress flush of %d rows failed; will retry", len(rows))
+            with self._lock:
+                # keep anything written since, it is newer
+                self._pending = {**pending, **self._pending}
+            return
+        with self._lock:
+            self._flushes += 1
+            self._rows_flushed += len(rows)
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stops the flush thread and writes whatever is still buffered."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "writes": self._writes,
+                "flushes": self._flushes,
+                "rows_flushed": self._rows_flushed,
+            }
@@ -0,0 +1,154 @@
+import random
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+
+FIELDS = ("unit", "topic", "skill", "difficulty")
+DIFFICULTIES = ("easy", "medium", "hard")
+LETTERS = "ABCD"
+
+
+class Question:
+    """
+    Immutable MCQ record. Reads like the dicts it is built from (q["options"],
+    q.get("explanation")), but with __slots__, options as a tuple and
+    interned tags, so the bank holds each question once in a small object.
+    """
+
+    __slots__ = ("question", "options", "correct", "explanation", "topic", "skill", "difficulty")
+
+    def __init__(self, question, options, correct, explanation=None, topic=None, skill=None,
+                 difficulty=None):
+        set_field = super().__setattr__
+        set_field("question", question)
+        set_field("options", tuple(options))
+        set_field("correct", correct)
+        set_field("explanation", explanation)
+        for name, value in (("topic", topic), ("skill", skill), ("difficulty", difficulty)):
+            set_field(name, sys.intern(value) if value is not None else None)
+
+    @classmethod
+    def from_dict(cls, q):
+        return cls(**{k: q[k] for k in cls.__slots__ if k in q})
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Question records are read-only")
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.__slots__ and getattr(self, key) is not None
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__ if getattr(self, k) is not None}
+
+
+class QuestionBank:
+    """
+    All bank questions with inverted indexes over unit, topic, skill and
+    difficulty. Built once per content version; read-only afterwards.
+
+    Question ids are positions in `questions` (Question records), numbered
+    across units in manifest order; they stay stable only while new questions
+    go after all existing ones (into the last unit's last shard, or a new unit
+    at the end of the manifest). Each index maps a field value
+    to a sorted array of ids, so a single-field filter samples straight from
+    its posting list. Multi-field filters intersect posting lists (smallest
+    first) once and keep the result in a small LRU cache.
+    """
+
+    def __init__(self, questions_by_unit, cache_size: int = 256):
+        self.questions = []
+        self._index = {field: {} for field in FIELDS}
+        for unit, questions in questions_by_unit.items():
+            for q in questions:
+                qid = len(self.questions)
+                self.questions.append(Question.from_dict(q))
+                for field in FIELDS:
+                    value = unit if field == "unit" else q.get(field)
+                    if value is not None:
+                        self._index[field].setdefault(value, array("i")).append(qid)
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.questions)
+
+    def values(self, field: str):
+        """Distinct values of `field`, for filter selectors (difficulties easiest first)."""
+        if field == "difficulty":
+            order = {d: i for i, d in enumerate(DIFFICULTIES)}
+            return sorted(self._index[field], key=lambda d: (order.get(d, len(order)), d))
+        return sorted(self._index[field])
+
+    def matching(self, **filters):
+        """
+        Ids of questions matching every given filter (None means "any").
+        Returns a sequence that must not be mutated.
+        """
+        active = tuple(sorted((f, v) for f, v in filters.items() if v is not None))
+        if not active:
+            return range(len(self.questions))
+        with self._lock:
+            if active in self._cache:
+                self._cache.move_to_end(active)
+                return self._cache[active]
+
+        postings = sorted((self._index[f].get(v, array("i")) for f, v in active), key=len)
+        if len(postings) == 1:
+            ids = postings[0]
+        else:
+            ids = set(postings[0])
+            for p in postings[1:]:
+                ids.intersection_update(p)
+                if not ids:
+                    break
+            ids = array("i", sorted(ids))
+
+        with self._lock:
+            self._cache[active] = ids
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return ids
+
+    def groups(self, field: str, **filters):
+        """
+        Ids matching `filters`, split by their value of `field`: {value: ids}, with
+        questions that have no value under None. Empty groups are left out.
+        """
+        if filters.get(field) is not None:
+            ids = self.matching(**filters)
+            return {filters[field]: ids} if len(ids) else {}
+        out = {}
+        for value in self._index[field]:
+            ids = self.matching(**{**filters, field: value})
+            if len(ids):
+                out[value] = ids
+        grouped = sum(len(ids) for ids in out.values())
+        ids = self.matching(**filters)
+        if grouped < len(ids):
+            has_value = set().union(*out.values())
+            out[None] = array("i", (i for i in ids if i not in has_value))
+        return out
+
+    def count(self, **filters) -> int:
+        return len(self.matching(**filters))
+
+    def random(self, **filters):
+        """One random matching question, or None if nothing matches."""
+        ids = self.matching(**filters)
+        return self.questions[random.choice(ids)] if len(ids) else None
+
+    def sample(self, k: int, **filters):
+        """Up to `k` distinct random matching questions."""
+        ids = self.matching(**filters)
+        return [self.questions[i] for i in random.sample(ids, min(k, len(ids)))]
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from studyhub.question_bank import Question
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    hash TEXT PRIMARY KEY,
+    topic TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS questions_topic ON questions (topic);
+CREATE INDEX IF NOT EXISTS questions_last_used ON questions (last_used);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """Lowercases, drops punctuation and collapses whitespace."""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def question_hash(q) -> str:
+    return hashlib.sha256(normalize_text(q["question"]).encode("utf-8")).hexdigest()
+
+
+def is_complete_mcq(q) -> bool:
+    """Minimal shape check before a question is worth keeping."""
+    return (
+        isinstance(q, dict)
+        and bool(str(q.get("question", "")).strip())
+        and isinstance(q.get("options"), list)
+        and len(q["options"]) == 4
+        and q.get("correct") in ("A", "B", "C", "D")
+    )
+
+
+class QuestionStore:
+    """
+    SQLite (WAL mode) store of generated questions, deduplicated by a hash of
+    the normalized question text and shared by every session and process
+    using the same file.
+
+    Entries older than `ttl_seconds` are never served and are purged on
+    write; once more than `max_items` are stored, the least recently served
+    ones are evicted.
+
+    Every question also has an integer id (its SQLite rowid), so sessions can
+    hold ids instead of copies; get() turns an id back into a shared Question
+    record, decoding each one once per process while it stays in an LRU cache.
+    """
+
+    def __init__(self, path: str, max_items: int = 5000, ttl_seconds: float = 30 * 24 * 3600,
+                 cache_size: int = 2000):
+        self.path = path
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._records = OrderedDict()
+        self._records_size = cache_size
+        self._records_lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, q, topic: str) -> bool:
+        """
+        Saves a question. Returns False if it is incomplete or a question
+        with the same normalized text is already stored.
+        """
+        if not is_complete_mcq(q):
+            return False
+        now = time.time()
+        data = json.dumps(
+            {k: q[k] for k in ("question", "options", "correct", "explanation") if k in q},
+            ensure_ascii=False,
+        )
+        with self._conn() as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO questions (hash, topic, data, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (question_hash(q), topic, data, now, now),
+            )
+            if cur.rowcount:
+                self._evict(conn, now)
+        return bool(cur.rowcount)
+
+    def _evict(self, conn, now: float):
+        conn.execute("DELETE FROM questions WHERE created_at < ?", (now - self.ttl_seconds,))
+        conn.execute(
+            "DELETE FROM questions WHERE hash IN ("
+            " SELECT hash FROM questions ORDER BY last_used"
+            " LIMIT max(0, (SELECT count(*) FROM questions) - ?))",
+            (self.max_items,),
+        )
+
+    def sample(self, k: int, topic: str = None, with_ids: bool = False):
+        """
+        Returns up to `k` random live questions, marking them as used; as
+        (id, question) pairs if `with_ids` is set.
+        """
+        if k <= 0:
+            return []
+        now = time.time()
+        sql = "SELECT hash, data, rowid FROM questions WHERE created_at >= ?"
+        params = [now - self.ttl_seconds]
+        if topic is not None:
+            sql += " AND topic = ?"
+            params.append(topic)
+        sql += " ORDER BY random() LIMIT ?"
+        params.append(k)
+        with self._conn() as conn:
+            rows = conn.execute(sql, params).fetchall()
+            conn.executemany(
+                "UPDATE questions SET last_used = ?, uses = uses + 1 WHERE hash = ?",
+                [(now, h) for h, _, _ in rows],
+            )
+        if with_ids:
+            return [(rowid, self._record(rowid, data)) for _, data, rowid in rows]
+        return [json.loads(data) for _, data, _ in rows]
+
+    def random(self, topic: str = None):
+        """Returns one random live question, or None if there are none."""
+        found = self.sample(1, topic=topic)
+        return found[0] if found else None
+
+    def id_of(self, q):
+        """Id of the stored question with the same normalized text, or None."""
+        with self._conn() as conn:
+            row = conn.execute(
+                "SELECT rowid FROM questions WHERE hash = ?", (question_hash(q),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _record(self, qid: int, data: str) -> Question:
+        with self._records_lock:
+            record = self._records.get(qid)
+            if record is not None:
+                self._records.move_to_end(qid)
+                return record
+        record = Question.from_dict(json.loads(data))
+        with self._records_lock:
+            self._records[qid] = record
+            if len(self._records) > self._records_size:
+                self._records.popitem(last=False)
+        return record
+
+    def get(self, qid: int):
+        """The question with id `qid` as a Question record, or None if it has expired or been evicted."""
+        with self._records_lock:
+            if qid in self._records:
+                self._records.move_to_end(qid)
+                return self._records[qid]
+        with self._conn() as conn:
+            row = conn.execute(
+                "SELECT data FROM questions WHERE rowid = ? AND created_at >= ?",
+                (qid, time.time() - self.ttl_seconds),
+            ).fetchone()
+        return self._record(qid, row[0]) if row else None
+
+    def items(self):
+        """(id, topic, question dict) for every live question, without marking any as used."""
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT rowid, topic, data FROM questions WHERE created_at >= ? ORDER BY rowid",
+                (time.time() - self.ttl_seconds,),
+            ).fetchall()
+        return [(rowid, topic, json.loads(data)) for rowid, topic, data in rows]
+
+    def count(self, topic: str = None) -> int:
+        sql = "SELECT count(*) FROM questions WHERE created_at >= ?"
+        params = [time.time() - self.ttl_seconds]
+        if topic is not None:
+            sql += " AND topic = ?"
+            params.append(topic)
+        with self._conn() as conn:
+            return conn.execute(sql, params).fetchone()[0]
@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import deque
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a call can't get under the rate limit before its deadline."""
+
+
+class RateLimiter:
+    """
+    Process-wide token buckets for requests per minute and tokens per minute.
+
+    Each bucket holds up to one minute's allowance and refills continuously.
+    Callers wait in arrival order: only the caller at the head of the queue
+    may take from the buckets, so a large request isn't starved by a stream
+    of small ones. A limit of None or 0 means unlimited.
+
+    Token counts are estimates made before the call; settle() corrects the
+    bucket once the real usage is known.
+    """
+
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None,
+                 clock=time.monotonic):
+        self.requests_per_minute = requests_per_minute or None
+        self.tokens_per_minute = tokens_per_minute or None
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._requests = float(self.requests_per_minute or 0)
+        self._tokens = float(self.tokens_per_minute or 0)
+        self._refilled_at = clock()
+        self._acquired = 0
+        self._timeouts = 0
+        self._delayed = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self._refilled_at
+        self._refilled_at = now
+        if self.requests_per_minute:
+            self._requests = min(
+                self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60
+            )
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def _time_until_available(self, tokens: int) -> float:
+        wait = 0.0
+        if self.requests_per_minute and self._requests < 1:
+            wait = (1 - self._requests) * 60 / self.requests_per_minute
+        if self.tokens_per_minute and self._tokens < tokens:
+            wait = max(wait, (tokens - self._tokens) * 60 / self.tokens_per_minute)
+        return wait
+
+    def acquire(self, tokens: int = 0, timeout: float = None) -> float:
+        """
+        Waits for one request and `tokens` tokens of allowance; returns the
+        seconds waited. Raises RateLimitTimeout if that takes longer than
+        `timeout` seconds.
+        """
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)
+        start = self._clock()
+        deadline = None if timeout is None else start + timeout
+        ticket = object()
+        with self._cond:
+            self._queue.append(ticket)
+            try:
+                while True:
+                    now = self._clock()
+                    self._refill(now)
+                    wait = None  # not at the head: wait until someone leaves the queue
+                    if self._queue[0] is ticket:
+                        wait = self._time_until_available(tokens)
+                        if wait <= 0:
+                            self._requests -= 1 if self.requests_per_minute else 0
+                            self._tokens -= tokens if self.tokens_per_minute else 0
+                            break
+                    if deadline is not None:
+                        left = deadline - now
+                        if left <= 0 or (wait is not None and wait > left):
+                            self._timeouts += 1
+                            raise RateLimitTimeout(f"rate limit wait exceeds {timeout:.1f}s")
+                        wait = left if wait is None else wait
+                    self._cond.wait(wait)
+            finally:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+            waited = self._clock() - start
+            self._acquired += 1
+            if waited > 0.001:
+                self._delayed += 1
+            self._wait_seconds += waited
+            self._max_wait_seconds = max(self._max_wait_seconds, waited)
+        return waited
+
+    def settle(self, estimated_tokens: int, actual_tokens: int):
+        """Gives back (or takes) the difference between a call's estimated and real token use."""
+        if not self.tokens_per_minute:
+            return
+        with self._cond:
+            self._tokens = min(self.tokens_per_minute, self._tokens + estimated_tokens - actual_tokens)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "acquired": self._acquired,
+                "delayed": self._delayed,
+                "timeouts": self._timeouts,
+                "waiting": len(self._queue),
+                "avg_wait_seconds": self._wait_seconds / self._acquired if self._acquired else None,
+                "max_wait_seconds": self._max_wait_seconds,
+            }
+
+
+class _Batch:
+    __slots__ = ("size", "results", "done")
+
+    def __init__(self):
+        self.size = 1
+        self.results = []
+        self.done = threading.Event()
+
+
+class BatchCoalescer:
+    """
+    Single-flight generation per topic: concurrent get() calls for the same
+    topic share one upstream batch instead of each making its own call.
+
+    The first caller opens a batch and waits `window_seconds` for others to
+    join (at most `max_batch` callers per batch), then calls
+    `generate_batch(topic, n)` once for all of them and hands one result to
+    each. A caller whose slot isn't filled (the batch came back short or
+    failed) gets None and falls back on its own.
+    """
+
+    def __init__(self, generate_batch, max_batch: int = 8, window_seconds: float = 0.05):
+        self._generate = generate_batch
+        self.max_batch = max_batch
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._open = {}
+        self._requests = 0
+        self._batches = 0
+        self._short = 0
+
+    def get(self, topic: str, timeout: float = None):
+        with self._lock:
+            self._requests += 1
+            batch = self._open.get(topic)
+            if batch is not None and batch.size < self.max_batch:
+                slot = batch.size
+                batch.size += 1
+                leader = False
+            else:
+                batch = self._open[topic] = _Batch()
+                slot = 0
+                leader = True
+
+        if not leader:
+            batch.done.wait(timeout)
+            return batch.results[slot] if slot < len(batch.results) else None
+
+        if self.window_seconds > 0:
+            time.sleep(self.window_seconds)
+        with self._lock:
+            # no one joins after this
+            if self._open.get(topic) is batch:
+                del self._open[topic]
+            n = batch.size
+        try:
+            results = list(self._generate(topic, n) or [])
+        except Exception:
+            results = []
+        with self._lock:
+            self._batches += 1
+            self._short += max(n - len(results), 0)
+        batch.results = results
+        batch.done.set()
+        return results[0] if results else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "batches": self._batches,
+                "coalescing_ratio": self._requests / self._batches if self._batches else None,
+                "unfilled": self._short,
+            }
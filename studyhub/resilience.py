@@ -0,0 +1,163 @@
+import random
+import threading
+import time
+
+from studyhub.ratelimit import RateLimitTimeout
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit breaker is open."""
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the retry budget runs out of time before a call succeeds."""
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Timeouts, connection errors, 408/409/429 and 5xx are worth another attempt."""
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    if type(exc).__name__ in ("APITimeoutError", "APIConnectionError"):
+        return True
+    status = getattr(exc, "status_code", None)
+    return status in (408, 409, 429) or (status is not None and status >= 500)
+
+
+class CircuitBreaker:
+    """
+    Shared breaker for an upstream dependency.
+
+    After `failure_threshold` consecutive failed calls the breaker opens and
+    every call is rejected for `cooldown_seconds`. Then a single probe call
+    is let through ("half-open"): success closes the breaker, failure opens
+    it for another cool-down, and a probe that ends without reaching the
+    upstream hands its slot back through release().
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown_seconds: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == "open" and self._clock() - self._opened_at >= self.cooldown_seconds:
+                return "half_open"
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == "closed":
+                return True
+            if self._state == "open" and self._clock() - self._opened_at >= self.cooldown_seconds:
+                # let exactly one probe through; the rest wait for its result
+                self._state = "half_open"
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+
+    def release(self):
+        """
+        Ends a call that recorded neither success nor failure. If it was the
+        half-open probe, the breaker reopens for a fresh cool-down, so a later
+        call gets to probe instead of every call being rejected.
+        """
+        with self._lock:
+            if self._state == "half_open":
+                self._state = "open"
+                self._opened_at = self._clock()
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    self.trips += 1
+                self._state = "open"
+                self._opened_at = self._clock()
+
+
+class CallPolicy:
+    """
+    Per-call deadline plus a bounded retry budget with jittered exponential
+    backoff, all behind a shared circuit breaker and, optionally, a shared
+    ratelimit.RateLimiter.
+
+    `call(fn, tokens)` invokes `fn(timeout)` where `timeout` is the time the
+    attempt may take: at most `attempt_timeout`, and never past the overall
+    deadline. With a limiter, every attempt first waits for one request of
+    allowance, and the first one also for `tokens` tokens: the caller
+    settles the estimate once against the usage of the attempt that
+    succeeded, so retries don't take it again. Time spent waiting counts
+    against the deadline, and running out of it while waiting isn't held
+    against the breaker (the upstream was never called).
+    """
+
+    def __init__(
+        self,
+        deadline_seconds: float = 15.0,
+        attempt_timeout: float = 10.0,
+        max_attempts: int = 2,
+        backoff_seconds: float = 0.25,
+        breaker: CircuitBreaker = None,
+        limiter=None,
+    ):
+        self.deadline_seconds = deadline_seconds
+        self.attempt_timeout = attempt_timeout
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.limiter = limiter
+
+    def call(self, fn, tokens: int = 0):
+        if not self.breaker.allow():
+            raise CircuitOpenError("upstream circuit is open")
+        settled = False  # whether the breaker has been told how the call went
+        try:
+            deadline = time.monotonic() + self.deadline_seconds
+            attempt = 0
+            while True:
+                attempt += 1
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining <= 0:
+                        raise DeadlineExceeded(f"no time left after {attempt - 1} attempts")
+                    if self.limiter is not None:
+                        self.limiter.acquire(tokens if attempt == 1 else 0, timeout=remaining)
+                        remaining = deadline - time.monotonic()
+                    result = fn(min(self.attempt_timeout, remaining))
+                except RateLimitTimeout:
+                    raise
+                except Exception as exc:
+                    delay = self.backoff_seconds * (2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+                    retry = (
+                        attempt < self.max_attempts
+                        and is_retryable(exc)
+                        and time.monotonic() + delay < deadline
+                    )
+                    if not retry:
+                        settled = True
+                        self.breaker.record_failure()
+                        raise
+                    time.sleep(delay)
+                    continue
+                settled = True
+                self.breaker.record_success()
+                return result
+        finally:
+            if not settled:
+                # e.g. the limiter wait ran out: the upstream was never called, so
+                # this says nothing about it, but a half-open probe slot must be freed
+                self.breaker.release()
@@ -0,0 +1,119 @@
+import logging
+import math
+import random
+import re
+import time
+from collections import Counter, namedtuple
+
+logger = logging.getLogger(__name__)
+
+# title: heading text, with the parent "##" heading prefixed for "###" sections
+Section = namedtuple("Section", ["title", "level", "text"])
+
+_STOPWORDS = frozenset(
+    """
+    a an and are as at be but by for from had has have he her his in into is it its
+    of on or she that the their them they this to was were which who with
+    """.split()
+)
+
+
+def split_sections(markdown: str):
+    """
+    Splits the guide into "##" / "###" sections. Text before the first "##"
+    heading and sections with no body of their own are dropped.
+    """
+    sections = []
+    parent = None
+    title, level, body = None, None, []
+
+    def flush():
+        text = "\n".join(line for line in body if line.strip() not in ("", "---")).strip()
+        if title is not None and text:
+            sections.append(Section(title, level, text))
+
+    for line in markdown.splitlines():
+        m = re.match(r"^(##|###) (.+)$", line)
+        if m is None:
+            body.append(line)
+            continue
+        flush()
+        level = len(m.group(1))
+        heading = m.group(2).strip()
+        if level == 2:
+            parent = heading
+            title = heading
+        else:
+            title = f"{parent} › {heading}" if parent else heading
+        body = []
+    flush()
+    return sections
+
+
+def tokenize(text: str):
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    # crude plural folding so "revolutions" matches "revolution"
+    return [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+            for w in words if w not in _STOPWORDS]
+
+
+class SectionIndex:
+    """
+    BM25 index over study-guide sections, built once and queried locally.
+    Heading words are counted twice so a topic name matches its own section first.
+    """
+
+    def __init__(self, markdown: str, k1: float = 1.5, b: float = 0.75):
+        self.sections = split_sections(markdown)
+        self.k1 = k1
+        self.b = b
+        self._tf = []
+        for s in self.sections:
+            self._tf.append(Counter(tokenize(s.title) * 2 + tokenize(s.text)))
+        self._lengths = [sum(tf.values()) for tf in self._tf]
+        self._avg_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        df = Counter(term for tf in self._tf for term in tf)
+        n = len(self.sections)
+        self._idf = {t: math.log(1 + (n - d + 0.5) / (d + 0.5)) for t, d in df.items()}
+
+    def search(self, query: str, k: int = 3):
+        """Returns up to `k` (score, Section) pairs, best first; sections with no match are skipped."""
+        terms = set(tokenize(query))
+        scored = []
+        for i, tf in enumerate(self._tf):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[i] / self._avg_length)
+            for t in terms:
+                f = tf.get(t)
+                if f:
+                    score += self._idf[t] * f * (self.k1 + 1) / (f + norm)
+            if score > 0:
+                scored.append((score, self.sections[i]))
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        return scored[:k]
+
+    def context(self, query: str = None, k: int = 3, max_chars: int = 7000):
+        """
+        Joins the `k` sections most relevant to `query` (or `k` random sections
+        if there is no query or nothing matches) into a prompt context of at
+        most `max_chars`.
+        """
+        start = time.perf_counter()
+        picked = [s for _, s in self.search(query, k)] if query else []
+        if not picked:
+            picked = random.sample(self.sections, min(k, len(self.sections)))
+        parts, size = [], 0
+        for s in picked:
+            part = f"## {s.title}\n{s.text}"
+            if size + len(part) > max_chars:
+                part = part[: max_chars - size]
+            parts.append(part)
+            size += len(part) + 2
+            if size >= max_chars:
+                break
+        context = "\n\n".join(parts)
+        logger.info(
+            "retrieved %d sections (%d chars) for %r in %.2f ms",
+            len(parts), len(context), query, (time.perf_counter() - start) * 1000,
+        )
+        return context
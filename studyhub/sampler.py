@@ -0,0 +1,149 @@
+"""
+Weighted sampling without replacement over groups of question ids.
+
+A session draws from a pool of ids split into groups (e.g. one per topic),
+each with a weight. A group is picked with probability proportional to its
+weight times the ids it has left, then an id is taken from it uniformly at
+random. An id isn't drawn again until every id in the pool has been; then a
+new round starts with the whole pool.
+
+Group weights live in a Fenwick tree, so picking a group and changing a
+group's weight are O(log g) for g groups. Inside a group ids are taken by a
+Fisher-Yates shuffle run lazily, one step per draw, which only records the
+positions it has swapped. A sampler's memory therefore grows with its draws,
+not with the size of the bank. With one group per question (per-question
+weights) both operations are O(log n).
+"""
+import random
+from array import array
+
+
+class FenwickTree:
+    """Non-negative weights with O(log n) updates, prefix sums and weighted search."""
+
+    def __init__(self, weights):
+        n = len(weights)
+        tree = array("d", [0.0]) * (n + 1)
+        for i, w in enumerate(weights, 1):
+            tree[i] += w
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._top = 1 << n.bit_length() >> 1 if n else 0  # highest power of two <= n
+
+    def __len__(self):
+        return len(self._tree) - 1
+
+    def add(self, i: int, delta: float):
+        tree, n = self._tree, len(self._tree) - 1
+        i += 1
+        while i <= n:
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i: int) -> float:
+        """Sum of the first `i` weights."""
+        tree, total = self._tree, 0.0
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def total(self) -> float:
+        return self.prefix(len(self))
+
+    def find(self, u: float) -> int:
+        """Smallest index whose prefix sum (itself included) exceeds `u`, for 0 <= u < total()."""
+        tree, n = self._tree, len(self._tree) - 1
+        pos, step = 0, self._top
+        while step:
+            nxt = pos + step
+            if nxt <= n and tree[nxt] <= u:
+                pos = nxt
+                u -= tree[nxt]
+            step >>= 1
+        return min(pos, n - 1)
+
+
+class WeightedSampler:
+    """
+    Draws ids from `groups` ({key: sequence of ids}) without replacement.
+
+    `weights` ({key: weight}, default 1 each) sets how much more likely one
+    group's ids are than another's; set_weight() changes a weight between
+    draws. Ids in a group must be distinct and not appear in another group.
+    """
+
+    def __init__(self, groups, weights=None, rng=None):
+        self._keys = list(groups)
+        self._slot = {key: i for i, key in enumerate(self._keys)}
+        self._ids = [groups[key] for key in self._keys]
+        self._weights = [float((weights or {}).get(key, 1.0)) for key in self._keys]
+        self._rng = rng or random.Random()
+        self.size = sum(len(ids) for ids in self._ids)
+        self.rounds = 0
+        self._new_round()
+
+    def _new_round(self):
+        self.rounds += 1
+        self._left = [len(ids) for ids in self._ids]
+        self.remaining = self.size  # ids not yet drawn this round
+        self._swapped = {}  # group -> {position: id index moved there}, for groups drawn from
+        self._tree = FenwickTree([w * n for w, n in zip(self._weights, self._left)])
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, key):
+        return key in self._slot
+
+    def set_weight(self, key, weight: float):
+        g = self._slot[key]
+        old, self._weights[g] = self._weights[g], float(weight)
+        self._tree.add(g, (self._weights[g] - old) * self._left[g])
+
+    def _pick_group(self) -> int:
+        total = self._tree.total()
+        if total > 0:
+            g = self._tree.find(self._rng.random() * total)
+            if self._left[g]:
+                return g
+        # every group left has weight 0 (or rounding landed on an empty one): draw evenly
+        left = [g for g, n in enumerate(self._left) if n]
+        return self._rng.choice(left)
+
+    def draw(self):
+        """The next id, or None if the pool is empty."""
+        if not self.size:
+            return None
+        if not self.remaining:
+            self._new_round()
+        g = self._pick_group()
+        # one step of Fisher-Yates: take a random position among the n left, and move
+        # whatever sits at the last of them into its place
+        n = self._left[g]
+        swapped = self._swapped.setdefault(g, {})
+        j = self._rng.randrange(n)
+        position = swapped.get(j, j)
+        if j != n - 1:
+            swapped[j] = swapped.get(n - 1, n - 1)
+        swapped.pop(n - 1, None)
+        if n == 1:
+            del self._swapped[g]
+        self._left[g] = n - 1
+        self.remaining -= 1
+        self._tree.add(g, -self._weights[g])
+        return self._ids[g][position]
+
+    def sample(self, k: int):
+        """Up to `k` distinct ids, continuing into a new round if this one runs out."""
+        k = min(k, self.size)
+        chosen, seen = [], set()
+        while len(chosen) < k:
+            qid = self.draw()
+            # after a new round starts, ids already chosen here are skipped (and so used up)
+            if qid not in seen:
+                seen.add(qid)
+                chosen.append(qid)
+        return chosen
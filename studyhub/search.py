@@ -0,0 +1,127 @@
+import heapq
+import math
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter, namedtuple
+
+# ref: where the hit lives, e.g. ("guide", 3), ("flashcard", 12), ("mcq", 40)
+Hit = namedtuple("Hit", ["score", "ref", "title", "snippet"])
+
+_SUFFIXES = (
+    "izations", "ization", "izing", "ized", "izes", "ize",
+    "ations", "ation", "ingly", "ing", "edly", "ed", "ly", "ments", "ment", "ness",
+)
+_MAX_PREFIX_TERMS = 50
+
+
+def stem(word: str) -> str:
+    """
+    Small suffix-stripping stemmer: folds plurals and common verb/noun endings
+    so "industrialized", "industrialization" and "industrial" share a stem.
+    """
+    if len(word) > 3:
+        if word.endswith("sses"):
+            word = word[:-2]
+        elif word.endswith("ies"):
+            word = word[:-3] + "y"
+        elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+            word = word[:-1]
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            word = word[: -len(suffix)]
+            break
+    if len(word) > 4 and word.endswith("e"):
+        word = word[:-1]
+    return word
+
+
+def words(text: str):
+    # fold accents so "Bolívar" matches "bolivar"
+    text = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode("ascii")
+    return re.findall(r"[a-z0-9]+", text)
+
+
+def _snippet(text: str, limit: int = 140) -> str:
+    text = " ".join(re.sub(r"[*#`>_]|^\s*-\s*", "", text, flags=re.M).split())
+    return text if len(text) <= limit else text[: limit - 1].rsplit(" ", 1)[0] + "…"
+
+
+class SearchIndex:
+    """
+    Inverted index over (ref, title, text) documents with BM25 ranking.
+
+    Terms are stemmed. Each query word also matches every indexed term that
+    starts with it (so "revol" finds "revolution"), at half weight. Postings
+    are arrays of doc ids with their precomputed BM25 term weight, so a query
+    only multiplies by idf and adds; the vocabulary is kept sorted so prefix
+    lookups are a bisect.
+    """
+
+    def __init__(self, docs, k1: float = 1.2, b: float = 0.75):
+        self._docs = []
+        doc_terms = []
+        for ref, title, text in docs:
+            self._docs.append((ref, title, _snippet(text)))
+            # title words count double
+            doc_terms.append(Counter(stem(w) for w in words(title) * 2 + words(text)))
+        lengths = [sum(terms.values()) for terms in doc_terms]
+        avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+
+        postings = {}
+        for doc_id, terms in enumerate(doc_terms):
+            norm = k1 * (1 - b + b * lengths[doc_id] / avg_length)
+            for term, tf in terms.items():
+                ids, weights = postings.setdefault(term, (array("i"), array("f")))
+                ids.append(doc_id)
+                weights.append(tf * (k1 + 1) / (tf + norm))
+        self._postings = postings
+        self._vocab = sorted(postings)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _idf(self, term: str) -> float:
+        df = len(self._postings[term][0])
+        return math.log(1 + (len(self._docs) - df + 0.5) / (df + 0.5))
+
+    def _rare(self, terms) -> bool:
+        return any(len(self._postings[t][0]) * 2 <= len(self._docs) for t in terms)
+
+    def _expand(self, word: str):
+        """(term, weight) pairs a query word matches: its stem, plus prefix matches."""
+        matches = {}
+        exact = stem(word)
+        if exact in self._postings:
+            matches[exact] = 1.0
+        i = bisect_left(self._vocab, word)
+        while i < len(self._vocab) and self._vocab[i].startswith(word) and len(matches) < _MAX_PREFIX_TERMS:
+            matches.setdefault(self._vocab[i], 0.5)
+            i += 1
+        return matches
+
+    def search(self, query: str, limit: int = 10):
+        """Best `limit` hits for `query`, highest score first."""
+        scores = {}
+        matched = {}
+        query_words = list(dict.fromkeys(words(query)))
+        expanded = {word: self._expand(word) for word in query_words}
+        rare = [w for w in query_words if self._rare(expanded[w])]
+        for word in query_words:
+            # words found in most documents barely move BM25 scores; skip their long
+            # posting lists whenever the query has a more selective word
+            if rare and word not in rare:
+                continue
+            for term, weight in expanded[word].items():
+                idf = self._idf(term) * weight
+                ids, weights = self._postings[term]
+                for doc_id, w in zip(ids, weights):
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * w
+                    matched.setdefault(doc_id, set()).add(word)
+        query_words = rare or query_words
+        # documents matching every query word rank above partial matches
+        best = heapq.nlargest(
+            limit, scores, key=lambda d: (len(matched[d]) == len(query_words), scores[d])
+        )
+        return [Hit(scores[d], *self._docs[d]) for d in best]
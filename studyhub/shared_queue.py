@@ -0,0 +1,125 @@
+"""
+Prefetch queues shared by several app processes through one SQLite file.
+
+With STUDYHUB_MULTIPROCESS=1 the app hands a SharedQuestionQueue on
+MCQ_QUEUE_PATH to its QuestionPrefetcher, so a question generated by one
+server process can be served by any of them and the processes don't each
+refill the same topic.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ready (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    topic TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ready_topic ON ready (topic, id);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    topic TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    started_at REAL NOT NULL
+);
+"""
+
+
+class SharedQuestionQueue:
+    """
+    Prefetch queue (see prefetch.MemoryQueue) kept in a SQLite file, so every
+    app process pointed at the same path fills and drains one set of queues.
+
+    Ready questions are popped with a single DELETE ... RETURNING, so two
+    processes never get the same one. Watermark checks and refill
+    reservations run inside BEGIN IMMEDIATE transactions, so processes don't
+    overfill a topic between them. Jobs older than `job_timeout` are treated
+    as lost (their process died) and no longer count as in flight.
+    """
+
+    def __init__(self, path: str, job_timeout: float = 120.0):
+        self.path = path
+        self.job_timeout = job_timeout
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # autocommit; transactions are opened explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, work):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = work(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def pop(self, topic: str):
+        row = self._conn().execute(
+            "DELETE FROM ready WHERE id = (SELECT id FROM ready WHERE topic = ? ORDER BY id LIMIT 1) "
+            "RETURNING data",
+            (topic,),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def reserve(self, topic: str, low_watermark: int, high_watermark: int, batch_size: int):
+        def work(conn):
+            now = time.time()
+            conn.execute("DELETE FROM jobs WHERE started_at < ?", (now - self.job_timeout,))
+            ready = conn.execute("SELECT count(*) FROM ready WHERE topic = ?", (topic,)).fetchone()[0]
+            flight = conn.execute(
+                "SELECT coalesce(sum(n), 0) FROM jobs WHERE topic = ?", (topic,)
+            ).fetchone()[0]
+            depth = ready + flight
+            if depth >= low_watermark:
+                return []
+            jobs = []
+            needed = high_watermark - depth
+            while needed > 0:
+                n = min(needed, batch_size)
+                needed -= n
+                cur = conn.execute(
+                    "INSERT INTO jobs (topic, n, started_at) VALUES (?, ?, ?)", (topic, n, now)
+                )
+                jobs.append((cur.lastrowid, n))
+            return jobs
+
+        return self._transaction(work)
+
+    def complete(self, topic: str, job, n: int, questions, high_watermark: int):
+        def work(conn):
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job,))
+            ready = conn.execute("SELECT count(*) FROM ready WHERE topic = ?", (topic,)).fetchone()[0]
+            room = max(high_watermark - ready, 0)
+            conn.executemany(
+                "INSERT INTO ready (topic, data) VALUES (?, ?)",
+                [(topic, json.dumps(q, ensure_ascii=False)) for q in questions[:room]],
+            )
+
+        self._transaction(work)
+
+    def depths(self):
+        rows = self._conn().execute("SELECT topic, count(*) FROM ready GROUP BY topic").fetchall()
+        return dict(rows)
+
+    def in_flight(self):
+        rows = self._conn().execute(
+            "SELECT topic, sum(n) FROM jobs WHERE started_at >= ? GROUP BY topic",
+            (time.time() - self.job_timeout,),
+        ).fetchall()
+        return dict(rows)
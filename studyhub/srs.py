@@ -0,0 +1,177 @@
+import heapq
+import struct
+import threading
+import time
+from array import array
+
+DAY = 24 * 3600.0
+GRADES = ("Again", "Hard", "Good", "Easy")
+AGAIN, HARD, GOOD, EASY = range(4)
+
+_RELEARN_SECONDS = 60.0
+_START_EASE = 2500  # ease factors are stored in thousandths
+_MIN_EASE = 1300
+
+
+class Scheduler:
+    """
+    SM-2 style spaced-repetition schedule for one student over one deck.
+
+    Per-card state lives in parallel arrays (due time, interval, ease, reps),
+    about 16 bytes a card. Cards already seen sit in a heap ordered by due
+    time; a review pushes a fresh entry and stale ones are skipped when they
+    reach the top, so picking the next card is O(log n). Unseen cards are
+    introduced in deck order, only once nothing seen is due.
+
+    The counts stats() reports are kept up to date as cards are reviewed and
+    fall due (a second heap holds the cards not yet counted as due), so they
+    cost O(log n) amortized too. They follow the latest `now` seen: a call
+    with an earlier time doesn't count cards as no longer due.
+    """
+
+    def __init__(self, deck_size: int):
+        self._due = array("d")  # epoch seconds; 0.0 means never seen
+        self._interval = array("f")  # days
+        self._ease = array("H")
+        self._reps = array("H")
+        self._heap = []
+        self._next_new = 0
+        self._seen = 0  # cards reviewed at least once
+        self._due_count = 0  # seen cards due by self._counted_to
+        self._pending = []  # (due, card) heap of seen cards not yet counted as due
+        self._counted_to = 0.0
+        self._lock = threading.Lock()
+        self.resize(deck_size)
+
+    def __len__(self):
+        return len(self._due)
+
+    def resize(self, deck_size: int):
+        """Grows the schedule when cards are added to the end of the deck."""
+        with self._lock:
+            extra = deck_size - len(self._due)
+            if extra > 0:
+                self._due.extend([0.0] * extra)
+                self._interval.extend([0.0] * extra)
+                self._ease.extend([_START_EASE] * extra)
+                self._reps.extend([0] * extra)
+
+    def _top(self):
+        """Heap top as (due, card), dropping entries superseded by a later review."""
+        heap = self._heap
+        while heap and heap[0][0] != self._due[heap[0][1]]:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def _count_due(self, now: float):
+        """Moves cards that fell due by `now` from _pending into _due_count."""
+        self._counted_to = max(self._counted_to, now)
+        pending = self._pending
+        while pending and pending[0][0] <= self._counted_to:
+            due, card = heapq.heappop(pending)
+            if due == self._due[card]:  # else a later review superseded it
+                self._due_count += 1
+
+    def _new_card(self):
+        while self._next_new < len(self._due) and self._due[self._next_new]:
+            self._next_new += 1
+        return self._next_new if self._next_new < len(self._due) else None
+
+    def next_card(self, now: float = None, ahead: bool = False):
+        """
+        Index of the card to review next: the most overdue seen card, else the
+        next unseen one. Returns None when nothing is due, unless `ahead` is
+        set, in which case the earliest upcoming card is returned.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            top = self._top()
+            if top is not None and top[0] <= now:
+                return top[1]
+            new = self._new_card()
+            if new is not None:
+                return new
+            return top[1] if ahead and top is not None else None
+
+    def review(self, card: int, grade: int, now: float = None):
+        """Records a review of `card` with one of AGAIN, HARD, GOOD or EASY."""
+        if grade not in (AGAIN, HARD, GOOD, EASY):
+            raise ValueError(f"unknown grade {grade!r}")
+        now = time.time() if now is None else now
+        with self._lock:
+            self._count_due(now)
+            if not self._due[card]:
+                self._seen += 1
+            elif self._due[card] <= self._counted_to:
+                self._due_count -= 1
+            ease, reps, interval = self._ease[card], self._reps[card], self._interval[card]
+            if grade == AGAIN:
+                ease = max(_MIN_EASE, ease - 200)
+                reps, interval = 0, 0.0
+                due = now + _RELEARN_SECONDS
+            else:
+                ease = max(_MIN_EASE, ease + (-150, 0, 150)[grade - HARD])
+                reps += 1
+                if reps == 1:
+                    interval = 4.0 if grade == EASY else 1.0
+                elif reps == 2:
+                    interval = 6.0
+                elif grade == HARD:
+                    interval *= 1.2
+                else:
+                    interval *= ease / 1000
+                if grade == EASY and reps > 1:
+                    interval *= 1.3
+                due = now + interval * DAY
+            self._ease[card] = ease
+            self._reps[card] = min(reps, 0xFFFF)
+            self._interval[card] = interval
+            self._due[card] = due
+            heapq.heappush(self._heap, (due, card))
+            heapq.heappush(self._pending, (due, card))
+            self._count_due(now)
+            # keep lazily deleted entries from piling up
+            if len(self._heap) > 2 * len(self._due) + 64:
+                self._heap = [(d, i) for i, d in enumerate(self._due) if d]
+                heapq.heapify(self._heap)
+            if len(self._pending) > 2 * len(self._due) + 64:
+                self._pending = [(d, i) for i, d in enumerate(self._due) if d > self._counted_to]
+                heapq.heapify(self._pending)
+
+    def dumps(self) -> bytes:
+        """Compact binary form of the schedule; Scheduler.loads() reverses it."""
+        with self._lock:
+            return b"".join((
+                struct.pack("<I", len(self._due)),
+                self._due.tobytes(), self._interval.tobytes(),
+                self._ease.tobytes(), self._reps.tobytes(),
+            ))
+
+    @classmethod
+    def loads(cls, data: bytes) -> "Scheduler":
+        (n,) = struct.unpack_from("<I", data)
+        scheduler = cls(0)
+        offset = 4
+        for name in ("_due", "_interval", "_ease", "_reps"):
+            column = getattr(scheduler, name)
+            size = n * column.itemsize
+            column.frombytes(data[offset:offset + size])
+            offset += size
+        scheduler._heap = [(d, i) for i, d in enumerate(scheduler._due) if d]
+        heapq.heapify(scheduler._heap)
+        scheduler._pending = list(scheduler._heap)
+        scheduler._seen = len(scheduler._heap)
+        return scheduler
+
+    def stats(self, now: float = None):
+        """Counts of due, unseen and learned (seen, not due) cards."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._count_due(now)
+            top = self._top()
+            return {
+                "due": self._due_count,
+                "new": len(self._due) - self._seen,
+                "learned": self._seen - self._due_count,
+                "next_due": top[0] if top is not None else None,
+            }
@@ -0,0 +1,401 @@
+"""
+Static HTML export of the read-only content: the study guide, the flashcards
+as flip cards and a practice quiz over the question bank.
+
+Reading the guide or flipping cards in the app holds a websocket session and
+reruns the script on every click. The exported pages are plain files that
+flip cards and check answers in the browser, so any file server can serve
+them without running Python. Streamlit serves them too, from ./static
+(see .streamlit/config.toml), at /app/static/index.html:
+
+    python -m studyhub.static_export
+    python -m studyhub.static_export --out /var/www/studyhub
+
+Run it again after changing data/; each page notes the content it was built from.
+"""
+import argparse
+import html
+import json
+import os
+import re
+import time
+
+from studyhub import content
+
+DEFAULT_OUT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+_ITALIC = re.compile(r"(?<![*\w])\*(?!\s)(.+?)(?<!\s)\*(?![*\w])")
+_LIST_ITEM = re.compile(r"^(\s*)[-*+]\s+(.*)$")
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*$")
+
+
+def _inline(text: str) -> str:
+    text = html.escape(text, quote=False)
+    return _ITALIC.sub(r"<em>\1</em>", _BOLD.sub(r"<strong>\1</strong>", text))
+
+
+def slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "section"
+
+
+def markdown_html(md: str) -> str:
+    """
+    HTML for the markdown the guide uses: headings, paragraphs, nested "-" lists,
+    "---" rules, **bold**, *italic* and trailing-double-space line breaks.
+    Anything else is kept as escaped text.
+    """
+    out, paragraph, lists = [], [], []  # lists: indents of the open <ul>s, each with an open <li>
+
+    def end_paragraph():
+        if paragraph:
+            out.append("<p>" + "\n".join(paragraph) + "</p>")
+            paragraph.clear()
+
+    def close_lists(indent=-1):
+        while lists and lists[-1] > indent:
+            lists.pop()
+            out.append("</li></ul>")
+
+    for line in md.splitlines():
+        text = line.rstrip()
+        if not text:
+            end_paragraph()
+            continue
+        item = _LIST_ITEM.match(text)
+        heading = _HEADING.match(text)
+        if item:
+            end_paragraph()
+            indent = len(item.group(1))
+            close_lists(indent)
+            if lists and lists[-1] == indent:
+                out.append("</li><li>")
+            else:
+                out.append("<ul><li>")
+                lists.append(indent)
+            out.append(_inline(item.group(2)))
+        elif heading:
+            end_paragraph()
+            close_lists()
+            level = len(heading.group(1))
+            title = heading.group(2)
+            out.append(f'<h{level} id="{slug(title)}">{_inline(title)}</h{level}>')
+        elif re.fullmatch(r"\s*(-{3,}|\*{3,})", text):
+            end_paragraph()
+            close_lists()
+            out.append("<hr>")
+        elif lists and line[:1].isspace():
+            out.append(" " + _inline(text.strip()))  # continuation of a list item
+        else:
+            close_lists()
+            paragraph.append(_inline(text.strip()) + ("<br>" if line.endswith("  ") else ""))
+    end_paragraph()
+    close_lists()
+    return "\n".join(out)
+
+
+def _json_script(element_id: str, data) -> str:
+    """Data for a page's script, as JSON that can't close the <script> element early."""
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+    return f'<script id="{element_id}" type="application/json">{payload}</script>'
+
+
+def _page(title: str, body: str, built: str, script: str = "", back: str = "index.html", root: str = "../") -> str:
+    """A page of the bundle; `root` is the path from it to the bundle's top, `back` the page its back link opens."""
+    nav = f'<nav><a href="{back}">← Back</a></nav>\n' if back else ""
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{html.escape(title)}</title>
+<link rel="stylesheet" href="{root}style.css">
+</head>
+<body>
+{nav}<main>
+<h1>{html.escape(title)}</h1>
+{body}
+</main>
+<footer>{html.escape(built)}</footer>
+{script}
+</body>
+</html>
+"""
+
+
+_STYLE = """\
+body { font-family: system-ui, -apple-system, "Segoe UI", sans-serif; margin: 0; color: #1f2430; background: #fafafa; line-height: 1.5; }
+nav { padding: .75rem 1.5rem; background: #fff; border-bottom: 1px solid #e4e4e8; }
+main { max-width: 52rem; margin: 0 auto; padding: 1rem 1.5rem 3rem; }
+footer { text-align: center; color: #888; font-size: .8rem; padding: 1rem; }
+a { color: #c4302b; }
+details { background: #fff; border: 1px solid #e4e4e8; border-radius: .5rem; margin: .5rem 0; padding: .25rem 1rem; }
+summary { cursor: pointer; font-weight: 600; padding: .5rem 0; }
+.toc { columns: 2; }
+.links li { margin: .4rem 0; font-size: 1.1rem; }
+.toolbar { display: flex; gap: .5rem; flex-wrap: wrap; align-items: center; margin: 1rem 0; }
+button, select { font: inherit; padding: .4rem .9rem; border-radius: .4rem; border: 1px solid #c9c9d1; background: #fff; cursor: pointer; }
+button:disabled { opacity: .45; cursor: default; }
+.card { perspective: 60rem; height: 16rem; cursor: pointer; margin: 1rem 0; }
+.card-inner { position: relative; height: 100%; transition: transform .45s; transform-style: preserve-3d; }
+.card.flipped .card-inner { transform: rotateY(180deg); }
+.face { position: absolute; inset: 0; backface-visibility: hidden; display: flex; flex-direction: column; justify-content: center;
+        align-items: center; text-align: center; padding: 1.5rem; border-radius: .75rem; background: #fff; border: 1px solid #e4e4e8;
+        box-shadow: 0 2px 6px rgba(0, 0, 0, .06); }
+.face.back { transform: rotateY(180deg); }
+.term { font-size: 1.6rem; font-weight: 700; }
+.muted { color: #888; font-size: .85rem; }
+.options label { display: block; background: #fff; border: 1px solid #e4e4e8; border-radius: .4rem; padding: .5rem .75rem; margin: .4rem 0; cursor: pointer; }
+.feedback { padding: .6rem .9rem; border-radius: .4rem; margin: .75rem 0; }
+.correct { background: #e6f4ea; }
+.incorrect { background: #fce8e6; }
+.explanation { background: #e8f0fe; }
+"""
+
+_FLASHCARDS_JS = """
+<script>
+(function () {
+  var all = JSON.parse(document.getElementById("cards").textContent);
+  var key = "studyhub-flashcards-" + document.body.dataset.unit;
+  var deck = all.slice(), i = parseInt(localStorage.getItem(key) || "0", 10) || 0;
+  var card = document.getElementById("card"), group = document.getElementById("group");
+  function show() {
+    if (!deck.length) { return; }
+    i = (i + deck.length) % deck.length;
+    card.classList.remove("flipped");
+    document.getElementById("term").textContent = deck[i].term;
+    document.getElementById("definition").textContent = deck[i].definition;
+    document.getElementById("group-label").textContent = deck[i].group || "";
+    document.getElementById("count").textContent = "Card " + (i + 1) + " of " + deck.length;
+    localStorage.setItem(key, String(i));
+  }
+  function flip() { card.classList.toggle("flipped"); }
+  function step(n) { i += n; show(); }
+  function filter() {
+    deck = all.filter(function (c) { return !group.value || c.group === group.value; });
+    i = 0; show();
+  }
+  function shuffle() {
+    for (var j = deck.length - 1; j > 0; j--) {
+      var k = Math.floor(Math.random() * (j + 1)), t = deck[j]; deck[j] = deck[k]; deck[k] = t;
+    }
+    i = 0; show();
+  }
+  card.addEventListener("click", flip);
+  document.getElementById("prev").addEventListener("click", function () { step(-1); });
+  document.getElementById("next").addEventListener("click", function () { step(1); });
+  document.getElementById("shuffle").addEventListener("click", shuffle);
+  group.addEventListener("change", filter);
+  document.addEventListener("keydown", function (e) {
+    if (e.target.tagName === "SELECT") { return; }
+    if (e.key === "ArrowLeft") { step(-1); }
+    else if (e.key === "ArrowRight") { step(1); }
+    else if (e.key === " ") { e.preventDefault(); flip(); }
+  });
+  show();
+})();
+</script>
+"""
+
+_QUIZ_JS = """
+<script>
+(function () {
+  var LETTERS = "ABCD";
+  var all = JSON.parse(document.getElementById("questions").textContent);
+  var topic = document.getElementById("topic"), difficulty = document.getElementById("difficulty");
+  var check = document.getElementById("check"), feedback = document.getElementById("feedback");
+  var order = [], q = null, answered = 0, correct = 0;
+  // each question once, in random order, before any repeats
+  function refill() {
+    order = all.filter(function (x) {
+      return (!topic.value || x.topic === topic.value) && (!difficulty.value || x.difficulty === difficulty.value);
+    });
+    for (var j = order.length - 1; j > 0; j--) {
+      var k = Math.floor(Math.random() * (j + 1)), t = order[j]; order[j] = order[k]; order[k] = t;
+    }
+  }
+  function next() {
+    if (!order.length) { refill(); }
+    q = order.pop() || null;
+    feedback.innerHTML = "";
+    check.disabled = true;
+    var options = document.getElementById("options");
+    options.innerHTML = "";
+    document.getElementById("question").textContent = q ? q.question : "No questions match these filters.";
+    if (!q) { return; }
+    q.options.forEach(function (text, n) {
+      var label = document.createElement("label"), input = document.createElement("input");
+      input.type = "radio"; input.name = "choice"; input.value = LETTERS[n];
+      input.addEventListener("change", function () { check.disabled = false; });
+      label.appendChild(input);
+      label.appendChild(document.createTextNode(" " + LETTERS[n] + ". " + text));
+      options.appendChild(label);
+    });
+  }
+  function note(cls, text) {
+    var div = document.createElement("div");
+    div.className = "feedback " + cls; div.textContent = text;
+    feedback.appendChild(div);
+  }
+  check.addEventListener("click", function () {
+    var chosen = document.querySelector("input[name=choice]:checked");
+    if (!q || !chosen) { return; }
+    check.disabled = true;
+    document.querySelectorAll("input[name=choice]").forEach(function (input) { input.disabled = true; });
+    answered += 1;
+    if (chosen.value === q.correct) { correct += 1; note("correct", "Correct! (" + q.correct + ")"); }
+    else { note("incorrect", "Incorrect. You chose " + chosen.value + ", correct is " + q.correct + "."); }
+    if (q.explanation) { note("explanation", "Explanation: " + q.explanation); }
+    document.getElementById("score").textContent = "Your record: " + correct + " of " + answered + " correct";
+  });
+  document.getElementById("new").addEventListener("click", next);
+  topic.addEventListener("change", function () { order = []; next(); });
+  difficulty.addEventListener("change", function () { order = []; next(); });
+  next();
+})();
+</script>
+"""
+
+
+def _select(element_id: str, label: str, values) -> str:
+    options = "".join(f'<option value="{html.escape(v)}">{html.escape(v)}</option>' for v in values)
+    return f'<label>{label} <select id="{element_id}"><option value="">Any</option>{options}</select></label>'
+
+
+def guide_page(unit: str, built: str) -> str:
+    sections = content.load_guide_sections(unit)
+    toc = "".join(f'<li><a href="#{slug(title)}">{html.escape(title)}</a></li>' for title, _ in sections)
+    parts = []
+    for i, (title, md) in enumerate(sections):
+        body = markdown_html(md.split("\n", 1)[1] if "\n" in md else "")  # without its "##" heading
+        parts.append(
+            f'<details id="{slug(title)}"{" open" if i == 0 else ""}>'
+            f"<summary>{_inline(title)}</summary>\n{body}\n</details>"
+        )
+    body = f'<ul class="toc">{toc}</ul>\n' + "\n".join(parts)
+    script = (
+        "<script>function openHash() { var d = document.getElementById(location.hash.slice(1)); "
+        "if (d && d.tagName === 'DETAILS') { d.open = true; } }"
+        " addEventListener('hashchange', openHash); openHash();</script>"
+    )
+    return _page(f"{content.unit_title(unit)}: Study Guide", body, built, script)
+
+
+def flashcards_page(unit: str, built: str) -> str:
+    cards = [{k: c.get(k) for k in ("term", "definition", "group")} for c in content.load_flashcards(unit)]
+    groups = list(dict.fromkeys(c["group"] for c in cards if c.get("group")))
+    body = f"""
+<div class="toolbar">{_select("group", "Group", groups)}<button id="shuffle">Shuffle</button></div>
+<div class="card" id="card" title="Click or press space to flip">
+  <div class="card-inner">
+    <div class="face front"><div class="term" id="term"></div><div class="muted" id="group-label"></div></div>
+    <div class="face back"><div id="definition"></div></div>
+  </div>
+</div>
+<div class="toolbar"><button id="prev">◀ Previous</button><button id="next">Next ▶</button>
+<span class="muted" id="count"></span></div>
+<p class="muted">Click the card or press space to flip it; ← and → move through the deck.</p>
+"""
+    page = _page(f"{content.unit_title(unit)}: Flashcards", body, built, _json_script("cards", cards) + _FLASHCARDS_JS)
+    return page.replace("<body>", f'<body data-unit="{html.escape(unit)}">', 1)
+
+
+def quiz_page(unit: str, built: str) -> str:
+    bank = content.load_question_bank()
+    ids = bank.matching(unit=unit)
+    questions = []
+    for qid in ids:
+        q = bank.questions[qid]
+        item = {"question": q["question"], "options": list(q["options"]), "correct": q["correct"]}
+        for field in ("explanation", "topic", "difficulty"):
+            if q.get(field):
+                item[field] = q[field]
+        questions.append(item)
+    topics = sorted({q["topic"] for q in questions if "topic" in q})
+    difficulties = [d for d in bank.values("difficulty") if any(q.get("difficulty") == d for q in questions)]
+    body = f"""
+<div class="toolbar">{_select("topic", "Topic", topics)}{_select("difficulty", "Difficulty", difficulties)}
+<button id="new">New Question</button></div>
+<h2>Question</h2>
+<p id="question"></p>
+<div class="options" id="options"></div>
+<button id="check" disabled>Check answer</button>
+<div id="feedback"></div>
+<p class="muted" id="score"></p>
+<p class="muted">{len(questions)} questions from the bank. AI-generated questions and saved progress are in the app.</p>
+"""
+    return _page(f"{content.unit_title(unit)}: Practice Quiz", body, built, _json_script("questions", questions) + _QUIZ_JS)
+
+
+def unit_index(unit: str, built: str, app_url: str) -> str:
+    links = [
+        ("guide.html", "Study Guide", "every section of the guide"),
+        ("flashcards.html", "Flashcards", "flip cards for key terms and people"),
+        ("quiz.html", "Practice Quiz", "questions from the bank, checked in your browser"),
+    ]
+    items = "".join(
+        f'<li><a href="{href}">{label}</a> <span class="muted">– {note}</span></li>' for href, label, note in links
+    )
+    body = (
+        f'<ul class="links">{items}</ul>\n<p>For AI questions, spaced review and saved progress, '
+        f'use the <a href="{html.escape(app_url)}">full app</a>.</p>'
+    )
+    return _page(content.unit_title(unit), body, built, back="../index.html")
+
+
+def root_index(units, built: str, app_url: str) -> str:
+    items = "".join(f'<li><a href="{u}/index.html">{html.escape(content.unit_title(u))}</a></li>' for u in units)
+    body = (
+        f'<ul class="links">{items}</ul>\n<p>The <a href="{html.escape(app_url)}">full app</a> adds AI questions, '
+        f"spaced review and saved progress.</p>"
+    )
+    return _page("AP World History Study Hub", body, built, back=None, root="")
+
+
+def _write(path: str, text: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def export(out_dir: str = DEFAULT_OUT, units=None, app_url: str = "/"):
+    """Writes the bundle to `out_dir`; returns the paths written."""
+    units = list(units or content.units())
+    written = []
+    stamp = time.strftime("%Y-%m-%d %H:%M")
+
+    def write(name: str, text: str):
+        path = os.path.join(out_dir, name)
+        _write(path, text)
+        written.append(path)
+
+    write("style.css", _STYLE)
+    write("index.html", root_index(units, f"Built {stamp}", app_url))
+    for unit in units:
+        built = (
+            f"Built {stamp} from guide {content.content_version(unit, 'guide')[:8]}, "
+            f"flashcards {content.content_version(unit, 'flashcards')[:8]}, "
+            f"questions {content.content_version(unit, 'mcq')[:8]}"
+        )
+        write(f"{unit}/index.html", unit_index(unit, built, app_url))
+        write(f"{unit}/guide.html", guide_page(unit, built))
+        write(f"{unit}/flashcards.html", flashcards_page(unit, built))
+        write(f"{unit}/quiz.html", quiz_page(unit, built))
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", default=DEFAULT_OUT, help="output directory (default: ./static next to app.py)")
+    parser.add_argument("--unit", action="append", help="unit to export (repeatable; default: every unit)")
+    parser.add_argument("--app-url", default="/", help="where the pages link to the full app (default: /)")
+    args = parser.parse_args(argv)
+    written = export(args.out, args.unit, args.app_url)
+    size = sum(os.path.getsize(p) for p in written)
+    print(f"wrote {len(written)} files ({size / 1024:.0f} KB) to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
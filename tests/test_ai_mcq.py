@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from studyhub.ai_mcq import extract_json, salvage_questions, to_internal_mcq, validate_mcq
+
+OPTIONS = ["A treaty between Britain and France", "The Congress of Vienna", "The Continental System", "Spain"]
+
+
+def reply(answer, options=OPTIONS):
+    return {"question": "Which settlement followed Napoleon's defeat?", "options": options,
+            "answer": answer, "explanation": "It redrew the map of Europe."}
+
+
+@pytest.mark.parametrize("answer, letter", [
+    ("B", "B"), ("B.", "B"), ("(B)", "B"), ("B) The Congress of Vienna", "B"), ("Answer: B", "B"),
+    ("correct answer is B", "B"), ("Option B", "B"), (1, "B"),
+    ("The Congress of Vienna", "B"), ("the congress of vienna.", "B"), ("B. The Congress of Vienna", "B"),
+    ("a treaty between Britain and France", "A"), ("a treaty between…", "A"), ("A treaty between Britain", "A"),
+    ("Spain, which lost its colonies", "D"),
+])
+def test_answer_forms(answer, letter):
+    q, missing = validate_mcq(reply(answer))
+    assert missing == [] and q["correct"] == letter
+
+
+@pytest.mark.parametrize("answer", ["a treaty with Russia", "A treaty", "b", "an", "The", "E", "", None, True])
+def test_unclear_answers_are_missing_not_guessed(answer):
+    options = ["The Treaty of Paris", "The Congress of Vienna", "The Continental System", "Spain"]
+    q, missing = validate_mcq(reply(answer, options))
+    assert missing == ["answer"] and "correct" not in q
+
+
+def test_options_are_relabelled():
+    q, _ = validate_mcq(reply("A", ["(a) one", "B) two", "c. three", "four"]))
+    assert q["options"] == ["A. one", "B. two", "C. three", "D. four"]
+
+
+def test_missing_parts_are_reported():
+    q, missing = validate_mcq({"question": "Why?", "options": ["x", "y"], "correct": "Z"})
+    assert q == {"question": "Why?"} and missing == ["options", "answer", "explanation"]
+    assert validate_mcq({"options": OPTIONS}) == (None, None)
+    assert to_internal_mcq({"question": "Why?"}) is None
+
+
+def test_extract_json_from_prose_and_fences():
+    data = reply("B")
+    assert extract_json(f"Sure! Here you go:\n```json\n{json.dumps(data)}\n```") == data
+
+
+def test_salvage_complete_questions_from_a_truncated_batch():
+    first, second = reply("A"), reply("C")
+    text = json.dumps({"questions": [first, second, reply("D")]})
+    cut = text[: text.rindex('"answer"')]
+    assert salvage_questions(cut) == [first, second]
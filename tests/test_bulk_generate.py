@@ -0,0 +1,108 @@
+import json
+import shutil
+
+import pytest
+
+from studyhub import bulk_generate, content
+from studyhub.question_store import question_hash
+
+REPO_DATA = content.DATA_DIR
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """A copy of data/ for the run to write to, with content's caches cleared around it."""
+    data = tmp_path / "data"
+    shutil.copytree(REPO_DATA, data)
+    monkeypatch.setattr(content, "DATA_DIR", str(data))
+    content._cache.clear()
+    content._derived.clear()
+    yield data
+    content._cache.clear()
+    content._derived.clear()
+
+
+def generate(data_dir, *args):
+    summary = data_dir / "summary.json"
+    code = bulk_generate.main(["--fake", "--batch-size", "2", "--workers", "4", "--json", str(summary), *args])
+    return code, json.loads(summary.read_text())
+
+
+def lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+
+def test_fake_run_writes_bank_records_and_registers_the_shard(data_dir):
+    code, stats = generate(data_dir, "--per-section", "2")
+    assert code == 0
+    jobs = bulk_generate.plan_jobs(content.DEFAULT_UNIT, 2, 2)
+    assert stats["batches"] == len(jobs) and stats["failed"] == 0 and stats["already_done"] == 0
+
+    shard = data_dir / "unit5" / "mcq_generated.jsonl"
+    written = lines(shard)
+    assert len(written) == stats["questions"] == stats["total_written"] > 0
+    topics = {topic for _, _, topic, _ in jobs}
+    for q in written:
+        assert set(q) <= {"question", "options", "correct", "explanation", "topic"}
+        assert len(q["options"]) == 4 and q["correct"] in "ABCD"
+        assert not any(o.startswith(f"{letter}. ") for letter, o in zip("ABCD", q["options"]))
+        assert q["topic"] in topics
+    assert len({question_hash(q) for q in written}) == len(written)
+
+    mcq = json.loads((data_dir / "manifest.json").read_text())["units"]["unit5"]["mcq"]
+    assert mcq == ["unit5/mcq.jsonl", "unit5/mcq_generated.jsonl"]
+    hand_written = lines(data_dir / "unit5" / "mcq.jsonl")
+    assert len(content.load_question_bank().questions) == len(hand_written) + len(written)
+
+
+def test_rerun_resumes_from_the_checkpoint(data_dir):
+    generate(data_dir, "--per-section", "2")
+    shard = data_dir / "unit5" / "mcq_generated.jsonl"
+    first = lines(shard)
+
+    # the same run again has nothing left to do
+    code, stats = generate(data_dir, "--per-section", "2")
+    assert code == 0
+    assert stats["batches"] == 0 and stats["already_done"] == len(bulk_generate.plan_jobs("unit5", 2, 2))
+    assert lines(shard) == first
+
+    # a bigger run only generates the batches it adds, after the questions already written
+    code, stats = generate(data_dir, "--per-section", "4")
+    assert code == 0
+    jobs = bulk_generate.plan_jobs("unit5", 4, 2)
+    assert stats["already_done"] == len(jobs) // 2 and stats["batches"] == len(jobs) // 2
+    assert lines(shard)[:len(first)] == first
+    assert stats["total_written"] == len(lines(shard))
+    mcq = json.loads((data_dir / "manifest.json").read_text())["units"]["unit5"]["mcq"]
+    assert mcq.count("unit5/mcq_generated.jsonl") == 1
+
+
+def test_no_register_leaves_the_manifest_alone(data_dir):
+    before = (data_dir / "manifest.json").read_text()
+    code, stats = generate(data_dir, "--per-section", "2", "--no-register")
+    assert code == 0 and stats["questions"] > 0
+    assert (data_dir / "manifest.json").read_text() == before
+
+
+def test_refuses_shards_that_would_shift_bank_ids(data_dir):
+    path = data_dir / "manifest.json"
+    manifest = json.loads(path.read_text())
+    manifest["units"]["unit6"] = dict(manifest["units"]["unit5"], mcq=["unit5/mcq.jsonl"])
+    path.write_text(json.dumps(manifest))
+
+    # unit5 is no longer the last unit: a new shard there would renumber unit6's questions
+    with pytest.raises(SystemExit):
+        generate(data_dir, "--per-section", "2")
+    assert not (data_dir / "unit5" / "mcq_generated.jsonl").exists()
+    assert json.loads(path.read_text()) == manifest
+    with pytest.raises(ValueError):
+        bulk_generate.register_shard("unit5", str(data_dir / "unit5" / "more.jsonl"))
+    # nor may a listed shard grow unless it is the last one of the last unit
+    with pytest.raises(ValueError):
+        bulk_generate.check_shard("unit5", str(data_dir / "unit5" / "mcq.jsonl"), register=False)
+    bulk_generate.check_shard("unit5", str(data_dir / "unit5" / "other.jsonl"), register=False)
+    assert bulk_generate.register_shard("unit6", str(data_dir / "unit6.jsonl"))
+    assert json.loads(path.read_text())["units"]["unit6"]["mcq"] == ["unit5/mcq.jsonl", "unit6.jsonl"]
+    with pytest.raises(ValueError):
+        bulk_generate.check_shard("unit6", str(data_dir / "unit5" / "mcq.jsonl"), register=False)
+    bulk_generate.check_shard("unit6", str(data_dir / "unit6.jsonl"), register=False)
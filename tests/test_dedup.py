@@ -0,0 +1,105 @@
+import random
+import threading
+
+import pytest
+
+from studyhub import content
+from studyhub.dedup import NearDuplicateIndex, _choose_bands, find_clusters, jaccard, question_text, shingles
+
+
+def mcq(stem, answer="The Haitian Revolution"):
+    options = [answer, "The Meiji Restoration", "The Taiping Rebellion", "The Boxer Rebellion"]
+    return {"question": stem, "options": options, "correct": "A"}
+
+
+ORIGINAL = mcq("Which revolution led enslaved people to overthrow French colonial rule in Saint-Domingue?")
+REWORDED = mcq("Which of the following revolutions saw enslaved people overthrow French colonial rule in Saint-Domingue?")
+UNRELATED = mcq("Which economic policy did Britain adopt when it repealed the Corn Laws?", "Free trade")
+
+
+def test_question_text_uses_the_correct_option_without_its_label():
+    q = {"question": "Stem?", "options": ["A. one", "B. two", "C. three", "D. four"], "correct": "B"}
+    assert question_text(q) == "Stem? two"
+
+
+def test_shingles_drop_filler_and_stem_words():
+    assert shingles("Which of the following best explains industrialization?") == shingles(
+        "What explains industrializations"
+    )
+    assert "which" not in shingles("Which factories")
+
+
+def test_jaccard():
+    assert jaccard(frozenset("ab"), frozenset("bc")) == pytest.approx(1 / 3)
+    assert jaccard(frozenset(), frozenset()) == 1.0
+
+
+def test_bands_reach_the_recall_target():
+    for threshold in (0.3, 0.4, 0.6, 0.8):
+        bands, rows = _choose_bands(128, threshold)
+        assert bands * rows <= 128
+        assert 1 - (1 - threshold ** rows) ** bands >= 0.9
+
+
+def test_signature_agreement_estimates_jaccard():
+    index = NearDuplicateIndex(num_perm=256)
+    rng = random.Random(0)
+    words = [f"w{i}" for i in range(400)]
+    for _ in range(20):
+        a = frozenset(rng.sample(words, 60))
+        b = frozenset(rng.sample(sorted(a), 30) + rng.sample(words, 30))
+        sa, sb = index.signature(a), index.signature(b)
+        agree = sum(x == y for x, y in zip(sa, sb)) / len(sa)
+        assert agree == pytest.approx(jaccard(a, b), abs=0.12)
+
+
+def test_rewording_is_rejected_and_unrelated_question_admitted():
+    index = NearDuplicateIndex()
+    assert index.admit("orig", ORIGINAL) == (True, [])
+    admitted, matches = index.admit("reworded", REWORDED)
+    assert not admitted and matches[0][0] == "orig"
+    assert index.admit("other", UNRELATED)[0]
+    assert len(index) == 2 and (index.admitted, index.rejected) == (2, 1)
+
+
+def test_same_stem_different_answer_is_not_a_duplicate():
+    index = NearDuplicateIndex(threshold=0.8)
+    index.add("q", ORIGINAL)
+    changed = mcq(ORIGINAL["question"], "The Mexican War of Independence against Spain")
+    assert index.query(changed) == []
+
+
+def test_query_matches_agree_with_exact_jaccard():
+    bank = content.load_question_bank()
+    index = NearDuplicateIndex(threshold=0.4)
+    sets = {}
+    for qid, q in enumerate(bank.questions):
+        index.add(qid, q)
+        sets[qid] = shingles(question_text(q))
+    for qid, q in enumerate(bank.questions):
+        for key, similarity in index.query(q):
+            assert similarity == pytest.approx(jaccard(sets[qid], sets[key]))
+            assert similarity >= 0.4
+        assert index.query(q)[0] == (qid, 1.0)
+
+
+def test_concurrent_admits_keep_one_of_each_rewording():
+    index = NearDuplicateIndex()
+    results = []
+    threads = [
+        threading.Thread(target=lambda i=i: results.append(index.admit(i, REWORDED if i % 2 else ORIGINAL)[0]))
+        for i in range(16)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results.count(True) == 1 and len(index) == 1
+
+
+def test_find_clusters_groups_rewordings():
+    shorter = mcq("Which revolutions overthrew French colonial rule in Saint-Domingue?")
+    items = [("a", ORIGINAL), ("b", UNRELATED), ("c", REWORDED), ("d", shorter)]
+    clusters, per_question = find_clusters(items)
+    assert clusters == [["a", "c", "d"]]
+    assert per_question > 0
@@ -0,0 +1,96 @@
+import json
+import random
+import time
+
+import pytest
+
+from studyhub.jsonstream import IncrementalJSONParser
+
+DOCS = [
+    '{"question": "Which event began in 1789?", "options": ["A", "B", "C", "D"], "correct": "A"}',
+    '{"a": [], "b": {}, "c": [1, -2.5, 3e2, true, false, null], "d": {"e": [{"f": "g"}]}}',
+    '[{"x": 1}, {"y": [2, [3, [4]]]}, "s", 0]',
+    r'{"esc": "quote \" backslash \\ slash \/ \b\f\n\r\t", "u": "é中"}',
+    r'{"astral": "\ud83d\ude00 and \ud834\udd1e", "lone": "\ud83d x \ude00 y \ud83dA \ud83d\n"}',
+    '{"raw": "Simón Bolívar — \U0001f600", "key é": 1}',
+    '{"nested": "a \\\\u0041 b"}',
+]
+
+
+def chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def parse(pieces):
+    parser = IncrementalJSONParser()
+    for piece in pieces:
+        parser.feed(piece)
+    return parser
+
+
+@pytest.mark.parametrize("doc", DOCS)
+def test_matches_json_loads_however_chunked(doc):
+    expected = json.loads(doc)
+    for size in (1, 2, 3, 5, 7, len(doc)):
+        parser = parse(chunks(doc, size))
+        assert parser.complete and parser.error is None, (size, parser.error)
+        assert parser.value == expected, size
+
+
+@pytest.mark.parametrize("doc", DOCS)
+def test_matches_json_loads_with_random_chunks(doc):
+    rng = random.Random(doc)
+    expected = json.loads(doc)
+    for _ in range(20):
+        cuts = sorted(rng.sample(range(1, len(doc)), min(6, len(doc) - 1)))
+        pieces = [doc[i:j] for i, j in zip([0] + cuts, cuts + [len(doc)])]
+        assert parse(pieces).value == expected, pieces
+
+
+def test_partial_values_grow_as_chunks_arrive():
+    parser = IncrementalJSONParser()
+    parser.feed('{"question": "Which rev')
+    assert parser.value == {"question": "Which rev"}
+    parser.feed('olution", "options": ["Fra')
+    assert parser.value == {"question": "Which revolution", "options": ["Fra"]}
+    parser.feed('nce"], "n": 12')
+    assert parser.value == {"question": "Which revolution", "options": ["France"]}  # 12 may go on
+    parser.feed("}")
+    assert parser.complete and parser.value["n"] == 12
+
+
+def test_partial_string_keeps_a_half_received_escape_out():
+    parser = IncrementalJSONParser()
+    parser.feed(r'{"q": "caf\u00')
+    assert parser.value == {"q": "caf"}
+    parser.feed(r'e9 \ud83d')
+    assert parser.value == {"q": "café "}  # the high surrogate waits for its pair
+    parser.feed(r'\ude00"}')
+    assert parser.value == {"q": "café \U0001f600"}
+
+
+def test_skips_prose_and_code_fences_and_ignores_trailing_text():
+    parser = parse(['Here it is:\n```json\n{"a"', ': 1}\n```\nHope that helps {"b": 2}'])
+    assert parser.complete and parser.value == {"a": 1}
+
+
+@pytest.mark.parametrize("bad", ['{"a" 1}', '{"a": 1]', "{a: 1}", '{"a": tru}', '["x" "y"]'])
+def test_malformed_input_stops_with_an_error(bad):
+    parser = parse(chunks(bad, 2))
+    assert parser.error and not parser.complete
+
+
+def test_long_string_in_small_chunks_is_linear():
+    def seconds(n):
+        parser = IncrementalJSONParser()
+        parser.feed('{"q": "')
+        start = time.perf_counter()
+        for _ in range(n):
+            parser.feed("abcd")
+        parser.feed('"}')
+        assert len(parser.value["q"]) == 4 * n
+        return time.perf_counter() - start
+
+    seconds(1000)  # warm up
+    small, large = min(seconds(5000) for _ in range(3)), min(seconds(40000) for _ in range(3))
+    assert large < small * 16  # 8x the input; re-joining the string on every feed took ~35x
@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+
+from studyhub.prefetch import MemoryQueue, QuestionPrefetcher
+
+
+class Generator:
+    """generate(topic, n) that records each call; held back until `gate` is set."""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.fail = fail
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def __call__(self, topic, n):
+        self.gate.wait(2)
+        with self._lock:
+            self.calls.append((topic, n))
+            if self.fail:
+                raise RuntimeError("model unavailable")
+            start, self._next = self._next, self._next + n
+        return [{"topic": topic, "q": i} for i in range(start, start + n)]
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def prefetcher():
+    made = []
+
+    def make(generate, **kwargs):
+        made.append(QuestionPrefetcher(generate, **kwargs))
+        return made[-1]
+
+    yield make
+    for p in made:
+        p.shutdown()
+
+
+def settled(p, topic, depth):
+    return lambda: p.stats()["depth"].get(topic) == depth and not p.stats()["in_flight"].get(topic)
+
+
+def test_get_on_an_empty_queue_returns_none_and_refills_to_the_high_watermark(prefetcher):
+    generate = Generator()
+    p = prefetcher(generate, high_watermark=5, low_watermark=2, batch_size=2)
+    assert p.get("Napoleon") is None
+    wait_for(lambda: p.stats()["refills"] == 3)
+    assert p.stats()["depth"] == {"Napoleon": 5}
+    assert sorted(n for _, n in generate.calls) == [1, 2, 2]
+    stats = p.stats()
+    assert stats["misses"] == 1 and stats["hits"] == 0 and stats["in_flight"] == {"Napoleon": 0}
+    assert p.get("Napoleon")["topic"] == "Napoleon"
+    assert p.stats()["hit_rate"] == 0.5
+
+
+def test_refills_only_once_below_the_low_watermark(prefetcher):
+    generate = Generator()
+    p = prefetcher(generate, high_watermark=4, low_watermark=2, batch_size=4)
+    p.warm("a")
+    wait_for(settled(p, "a", 4))
+    assert generate.calls == [("a", 4)]
+
+    assert p.get("a") and p.get("a")  # 2 left: at the low watermark, no refill
+    time.sleep(0.05)
+    assert generate.calls == [("a", 4)]
+
+    assert p.get("a")  # 1 left: refill the 3 missing
+    wait_for(settled(p, "a", 4))
+    assert generate.calls == [("a", 4), ("a", 3)]
+    assert [p.get("a")["q"] for _ in range(4)] == [3, 4, 5, 6]  # oldest first
+
+
+def test_questions_in_flight_count_towards_the_watermark(prefetcher):
+    generate = Generator()
+    generate.gate.clear()
+    p = prefetcher(generate, high_watermark=3, low_watermark=2, batch_size=3)
+    for _ in range(5):
+        assert p.get("a") is None
+    assert p.stats()["in_flight"] == {"a": 3}
+    generate.gate.set()
+    wait_for(settled(p, "a", 3))
+    assert generate.calls == [("a", 3)]
+
+
+def test_failed_refills_are_counted_and_release_their_reservation(prefetcher):
+    generate = Generator(fail=True)
+    p = prefetcher(generate, high_watermark=2, low_watermark=1)
+    assert p.get("a") is None
+    wait_for(lambda: p.stats()["failed_refills"] == 2)
+    assert p.stats()["in_flight"] == {"a": 0} and p.stats()["depth"] == {"a": 0}
+    generate.fail = False
+    assert p.get("a") is None  # nothing in flight any more, so this schedules a new refill
+    wait_for(settled(p, "a", 2))
+
+
+def test_memory_queue_keeps_at_most_the_high_watermark():
+    queue = MemoryQueue()
+    [(job, n)] = queue.reserve("a", 1, 3, 3)
+    queue.complete("a", job, n, [1, 2, 3, 4, 5], 3)
+    assert queue.depths() == {"a": 3} and queue.in_flight() == {"a": 0}
+    assert [queue.pop("a") for _ in range(4)] == [1, 2, 3, None]
+
+
+def test_rejects_bad_settings():
+    with pytest.raises(ValueError):
+        QuestionPrefetcher(Generator(), high_watermark=2, low_watermark=3)
+    with pytest.raises(ValueError):
+        QuestionPrefetcher(Generator(), batch_size=0)
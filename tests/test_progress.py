@@ -0,0 +1,125 @@
+import sqlite3
+import time
+
+import pytest
+
+from studyhub.progress import ProgressStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "progress.db")
+
+
+@pytest.fixture
+def open_store(path):
+    stores = []
+
+    def make(**kwargs):
+        kwargs.setdefault("flush_seconds", 60)
+        stores.append(ProgressStore(path, **kwargs))
+        return stores[-1]
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+def rows(path):
+    """What is actually in the database, read over a connection of its own."""
+    with sqlite3.connect(path) as conn:
+        return {(student, key): (fmt, bytes(data) if fmt == "bytes" else data)
+                for student, key, fmt, data in conn.execute("SELECT student, key, format, data FROM progress")}
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_writes_are_buffered_until_a_flush(open_store, path):
+    store = open_store()
+    store.put("ann", "deck", {"due": [1, 2]})
+    store.put("ann", "blob", b"\x00\x01")
+    assert rows(path) == {}
+    assert store.get("ann", "deck") == {"due": [1, 2]}
+    assert store.stats()["pending"] == 2
+
+    store.flush()
+    assert rows(path) == {("ann", "deck"): ("json", '{"due": [1, 2]}'), ("ann", "blob"): ("bytes", b"\x00\x01")}
+    assert store.stats() == {"pending": 0, "writes": 2, "flushes": 1, "rows_flushed": 2}
+
+
+def test_repeated_writes_to_a_key_coalesce(open_store, path):
+    store = open_store()
+    for i in range(100):
+        store.put("ann", "streak", i)
+    store.put("bob", "streak", 7)
+    assert store.stats()["pending"] == 2
+    store.flush()
+    assert rows(path) == {("ann", "streak"): ("json", "99"), ("bob", "streak"): ("json", "7")}
+    assert store.stats()["rows_flushed"] == 2 and store.stats()["writes"] == 101
+
+
+def test_flushes_on_the_timer(open_store, path):
+    store = open_store(flush_seconds=0.02)
+    store.put("ann", "streak", 1)
+    wait_for(lambda: store.stats()["flushes"] == 1)
+    assert rows(path) == {("ann", "streak"): ("json", "1")}
+
+
+def test_flushes_early_once_enough_keys_are_pending(open_store, path):
+    store = open_store(flush_rows=3)
+    store.put("ann", "a", 1)
+    store.put("ann", "a", 2)
+    store.put("ann", "b", 1)
+    time.sleep(0.05)
+    assert rows(path) == {}  # two keys pending: under the limit
+    store.put("ann", "c", 1)
+    wait_for(lambda: store.stats()["flushes"] == 1)
+    assert set(rows(path)) == {("ann", "a"), ("ann", "b"), ("ann", "c")}
+
+
+def test_close_writes_what_is_still_pending(open_store, path):
+    store = open_store()
+    store.put("ann", "streak", 3)
+    store.close()
+    assert rows(path) == {("ann", "streak"): ("json", "3")}
+    assert open_store().get("ann", "streak") == 3
+
+
+def test_failed_flush_is_retried_without_losing_newer_writes(open_store, path):
+    store = open_store()
+    store.put("ann", "streak", 1)
+    store.put("ann", "deck", [1])
+    with sqlite3.connect(path) as conn:
+        conn.execute("ALTER TABLE progress RENAME TO progress_away")
+
+    store.flush()  # no progress table: the rows go back into the buffer
+    assert store.stats()["pending"] == 2 and store.stats()["flushes"] == 0
+    store.put("ann", "streak", 2)  # newer than the failed write
+    assert store.get("ann", "streak") == 2
+
+    with sqlite3.connect(path) as conn:
+        conn.execute("ALTER TABLE progress_away RENAME TO progress")
+    store.flush()
+    assert rows(path) == {("ann", "streak"): ("json", "2"), ("ann", "deck"): ("json", "[1]")}
+    assert store.stats()["pending"] == 0
+
+
+def test_reads_come_from_the_cache_once_loaded(open_store, path):
+    writer = open_store()
+    writer.put("ann", "streak", 5)
+    writer.put("bob", "streak", 6)
+    writer.flush()
+
+    store = open_store(cache_size=1)
+    assert store.get("ann", "streak") == 5
+    assert store.get("nobody", "streak", "missing") == "missing"
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE progress SET data = '50' WHERE student = 'ann'")
+    assert store.get("ann", "streak") == 5  # cached: the database isn't read again
+    assert store.get("bob", "streak") == 6  # evicts ann, the cache holds one value
+    assert store.get("ann", "streak") == 50
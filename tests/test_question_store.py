@@ -0,0 +1,108 @@
+import sqlite3
+
+import pytest
+
+from studyhub import question_store
+from studyhub.question_bank import Question
+from studyhub.question_store import QuestionStore, normalize_text, question_hash
+
+
+class Clock:
+    """Stands in for the time module inside question_store."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(question_store, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "questions.db")
+
+
+def mcq(text, correct="A"):
+    return {"question": text, "options": ["w", "x", "y", "z"], "correct": correct, "explanation": "because"}
+
+
+def stored(path):
+    with sqlite3.connect(path) as conn:
+        return {text for (text,) in conn.execute("SELECT json_extract(data, '$.question') FROM questions")}
+
+
+def test_dedups_by_normalized_question_text(path, clock):
+    store = QuestionStore(path)
+    assert store.add(mcq("Who led the Haitian Revolution?"), "Haiti")
+    assert not store.add(mcq("who led the  haitian revolution", correct="B"), "Haiti")
+    assert not store.add(mcq("WHO LED THE HAITIAN REVOLUTION!?"), "Other")
+    assert store.count() == 1 and store.count("Other") == 0
+    assert normalize_text("Who led the  Haitian Revolution?") == "who led the haitian revolution"
+    assert question_hash(mcq("Who led, the Haitian revolution")) == question_hash(mcq("who led the haitian revolution"))
+
+
+def test_rejects_incomplete_questions(path, clock):
+    store = QuestionStore(path)
+    assert not store.add({"question": "", "options": ["a", "b", "c", "d"], "correct": "A"}, "t")
+    assert not store.add({"question": "q", "options": ["a", "b", "c"], "correct": "A"}, "t")
+    assert not store.add({"question": "q", "options": ["a", "b", "c", "d"], "correct": "E"}, "t")
+    assert store.count() == 0
+
+
+def test_evicts_the_least_recently_served_past_the_size_cap(path, clock):
+    store = QuestionStore(path, max_items=3)
+    for i, text in enumerate(["one", "two", "three"]):
+        clock.now = 1000 + i
+        store.add(mcq(text), text)
+    clock.now = 1010
+    assert store.sample(5, topic="one")[0]["question"] == "one"  # now the most recently served
+
+    clock.now = 1011
+    store.add(mcq("four"), "four")
+    assert stored(path) == {"one", "three", "four"}
+    clock.now = 1012
+    store.add(mcq("five"), "five")
+    assert stored(path) == {"one", "four", "five"}
+    assert not store.add(mcq("five"), "five")  # a repeat is not stored, so evicts nothing
+    assert store.count() == 3
+
+
+def test_expired_questions_are_not_served_and_purged_on_write(path, clock):
+    store = QuestionStore(path, ttl_seconds=100)
+    store.add(mcq("old"), "t")
+    clock.now += 50
+    store.add(mcq("newer"), "t")
+    clock.now += 60  # "old" is 110s old, "newer" 60s
+    assert [q["question"] for q in store.sample(5)] == ["newer"]
+    assert store.count("t") == 1 and [q["question"] for _, _, q in store.items()] == ["newer"]
+    assert store.random(topic="elsewhere") is None
+    assert stored(path) == {"old", "newer"}  # expired rows are only deleted by the next add
+    store.add(mcq("newest"), "t")
+    assert stored(path) == {"newer", "newest"}
+
+
+def test_sample_by_topic_with_ids(path, clock):
+    store = QuestionStore(path)
+    for i in range(6):
+        store.add(mcq(f"haiti {i}"), "Haiti")
+    store.add(mcq("france"), "France")
+
+    found = store.sample(10, topic="Haiti", with_ids=True)
+    assert len(found) == 6
+    for qid, q in found:
+        assert isinstance(q, Question) and q["question"].startswith("haiti")
+        assert store.id_of({"question": q["question"]}) == qid
+        assert store.get(qid) is q  # one shared record per id
+    assert len({qid for qid, _ in found}) == 6
+
+    [(qid, q)] = store.sample(1, topic="France", with_ids=True)
+    assert q.to_dict() == dict(mcq("france"), options=("w", "x", "y", "z"))
+    assert QuestionStore(path).get(qid).to_dict() == q.to_dict()  # another process reads it from the file
+    assert store.sample(0) == [] and store.id_of(mcq("missing")) is None
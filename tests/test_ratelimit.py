@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from studyhub.ratelimit import BatchCoalescer, RateLimiter, RateLimitTimeout
+
+
+def test_unlimited_never_waits():
+    limiter = RateLimiter()
+    assert all(limiter.acquire(10_000) < 0.01 for _ in range(100))
+
+
+def test_burst_up_to_a_minute_then_waits_for_refill():
+    limiter = RateLimiter(requests_per_minute=1200)  # one request per 50 ms
+    for _ in range(1200):
+        assert limiter.acquire(timeout=0) < 0.01
+    waited = limiter.acquire(timeout=1)
+    assert 0.03 < waited < 0.5
+    assert limiter.stats()["delayed"] == 1
+
+
+def test_timeout_raises_without_taking_allowance():
+    limiter = RateLimiter(requests_per_minute=1)
+    limiter.acquire()
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire(timeout=0.05)
+    stats = limiter.stats()
+    assert stats["timeouts"] == 1 and stats["acquired"] == 1 and stats["waiting"] == 0
+
+
+def test_token_bucket_and_settle():
+    limiter = RateLimiter(tokens_per_minute=600)  # 10 tokens a second
+    limiter.acquire(600)
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire(100, timeout=0.05)
+    limiter.settle(estimated_tokens=600, actual_tokens=200)  # the call used less than estimated
+    assert limiter.acquire(400, timeout=0) < 0.01
+
+
+def test_oversized_request_is_capped_at_the_bucket():
+    limiter = RateLimiter(tokens_per_minute=100)
+    assert limiter.acquire(10_000, timeout=0) < 0.01
+
+
+def test_waiters_are_served_in_arrival_order():
+    # a large request at the head isn't overtaken by small ones that would fit sooner
+    limiter = RateLimiter(tokens_per_minute=6000)  # 100 tokens a second
+    limiter.acquire(6000)
+    order = []
+
+    def take(name, tokens):
+        limiter.acquire(tokens, timeout=5)
+        order.append(name)
+
+    big = threading.Thread(target=take, args=("big", 30))
+    big.start()
+    time.sleep(0.05)
+    small = threading.Thread(target=take, args=("small", 1))
+    small.start()
+    big.join()
+    small.join()
+    assert order == ["big", "small"]
+
+
+def test_coalescer_shares_one_call_among_concurrent_callers():
+    calls = []
+
+    def generate(topic, n):
+        calls.append((topic, n))
+        return [f"{topic}-{i}" for i in range(n)]
+
+    coalescer = BatchCoalescer(generate, max_batch=8, window_seconds=0.2)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(coalescer.get("t", timeout=5))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == [("t", 5)]
+    assert sorted(results) == [f"t-{i}" for i in range(5)]
+    assert coalescer.stats()["coalescing_ratio"] == 5
+
+
+def test_coalescer_batches_per_topic_and_caps_batch_size():
+    calls = []
+    lock = threading.Lock()
+
+    def generate(topic, n):
+        with lock:
+            calls.append((topic, n))
+        return [topic] * n
+
+    coalescer = BatchCoalescer(generate, max_batch=3, window_seconds=0.2)
+    topics = ["a"] * 5 + ["b"] * 2
+    threads = [threading.Thread(target=coalescer.get, args=(t, 5)) for t in topics]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(calls) == [("a", 2), ("a", 3), ("b", 2)]
+
+
+def test_coalescer_short_or_failed_batches_leave_callers_empty_handed():
+    def short(topic, n):
+        return ["only one"]
+
+    def broken(topic, n):
+        raise RuntimeError("upstream down")
+
+    for generate, expected in ((short, ["only one", None, None]), (broken, [None, None, None])):
+        coalescer = BatchCoalescer(generate, window_seconds=0.2)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(coalescer.get("t", timeout=5))) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert sorted(results, key=lambda r: r is None) == expected
+        assert coalescer.stats()["unfilled"] == expected.count(None)
@@ -0,0 +1,196 @@
+import pytest
+
+from studyhub.ratelimit import RateLimiter, RateLimitTimeout
+from studyhub.resilience import CallPolicy, CircuitBreaker, CircuitOpenError, DeadlineExceeded
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Upstream5xx(Exception):
+    status_code = 503
+
+
+def fail(timeout):
+    raise Upstream5xx()
+
+
+def tripped(threshold=2, cooldown=30.0):
+    clock = Clock()
+    breaker = CircuitBreaker(threshold, cooldown, clock=clock)
+    for _ in range(threshold):
+        breaker.record_failure()
+    return breaker, clock
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(3, 30.0, clock=Clock())
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # resets the count
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.trips == 1
+
+
+def test_rejects_while_open():
+    breaker, clock = tripped()
+    clock.now = 29.9
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+
+
+def test_lets_one_probe_through_after_cooldown():
+    breaker, clock = tripped()
+    clock.now = 30.0
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # the probe is still out
+
+
+def test_probe_success_closes():
+    breaker, clock = tripped()
+    clock.now = 30.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_probe_failure_reopens_for_another_cooldown():
+    breaker, clock = tripped()
+    clock.now = 30.0
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.trips == 2
+    clock.now = 59.9
+    assert not breaker.allow()
+    clock.now = 60.0
+    assert breaker.allow()
+
+
+def test_release_reopens_a_half_open_breaker():
+    breaker, clock = tripped()
+    clock.now = 30.0
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == "open"
+    clock.now = 60.0
+    assert breaker.allow()
+
+
+def test_release_leaves_a_closed_breaker_closed():
+    breaker = CircuitBreaker(2, 30.0, clock=Clock())
+    breaker.release()
+    assert breaker.state == "closed"
+
+
+def test_policy_counts_one_failure_per_call_after_retries():
+    breaker = CircuitBreaker(2, 30.0, clock=Clock())
+    policy = CallPolicy(deadline_seconds=5, max_attempts=3, backoff_seconds=0, breaker=breaker)
+    with pytest.raises(Upstream5xx):
+        policy.call(fail)
+    assert breaker.state == "closed"
+    with pytest.raises(Upstream5xx):
+        policy.call(fail)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        policy.call(lambda timeout: "unreached")
+
+
+def test_policy_retries_then_succeeds():
+    calls = []
+
+    def flaky(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            raise Upstream5xx()
+        return "ok"
+
+    policy = CallPolicy(deadline_seconds=5, max_attempts=2, backoff_seconds=0, breaker=CircuitBreaker(1))
+    assert policy.call(flaky) == "ok"
+    assert len(calls) == 2
+    assert policy.breaker.state == "closed"
+
+
+def test_policy_takes_the_token_estimate_once_across_retries():
+    limiter = RateLimiter(tokens_per_minute=1000, clock=Clock())  # frozen: no refill
+    attempts = []
+
+    def flaky(timeout):
+        attempts.append(timeout)
+        if len(attempts) < 3:
+            raise Upstream5xx()
+        return "ok"
+
+    policy = CallPolicy(deadline_seconds=5, max_attempts=3, backoff_seconds=0, breaker=CircuitBreaker(5),
+                        limiter=limiter)
+    assert policy.call(flaky, tokens=300) == "ok"
+    assert len(attempts) == 3 and limiter.stats()["acquired"] == 3  # a request slot per attempt
+    limiter.settle(300, 250)  # what the caller does with the successful attempt's usage
+    limiter.acquire(750, timeout=0)  # 3 x 300 would have left only 100
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire(1, timeout=0)
+
+
+def test_policy_does_not_retry_client_errors():
+    class BadRequest(Exception):
+        status_code = 400
+
+    calls = []
+
+    def bad(timeout):
+        calls.append(timeout)
+        raise BadRequest()
+
+    policy = CallPolicy(deadline_seconds=5, max_attempts=3, backoff_seconds=0)
+    with pytest.raises(BadRequest):
+        policy.call(bad)
+    assert len(calls) == 1
+
+
+def test_policy_deadline():
+    policy = CallPolicy(deadline_seconds=0, breaker=CircuitBreaker(1))
+    with pytest.raises(DeadlineExceeded):
+        policy.call(lambda timeout: "unreached")
+
+
+def test_probe_rate_limit_timeout_frees_the_probe_slot():
+    # regression: a probe that timed out waiting for the limiter left the
+    # breaker half-open, rejecting every later call until a restart
+    breaker, clock = tripped()
+    limiter = RateLimiter(requests_per_minute=1)
+    limiter.acquire()  # the bucket is empty for the next minute
+    policy = CallPolicy(deadline_seconds=0.05, breaker=breaker, limiter=limiter)
+    clock.now = 30.0
+    with pytest.raises(RateLimitTimeout):
+        policy.call(lambda timeout: "unreached")
+    assert breaker.state == "open"
+    assert breaker.trips == 1  # the upstream wasn't called, so this isn't a failure
+
+    clock.now = 60.0
+    policy.limiter = None
+    assert policy.call(lambda timeout: "ok") == "ok"
+    assert breaker.state == "closed"
+
+
+def test_interrupted_probe_frees_the_probe_slot():
+    breaker, clock = tripped()
+    policy = CallPolicy(breaker=breaker)
+
+    def interrupted(timeout):
+        raise KeyboardInterrupt
+
+    clock.now = 30.0
+    with pytest.raises(KeyboardInterrupt):
+        policy.call(interrupted)
+    assert breaker.state == "open"
@@ -0,0 +1,115 @@
+import random
+from collections import Counter
+
+import pytest
+
+from studyhub.sampler import FenwickTree, WeightedSampler
+
+
+def test_fenwick_prefix_and_find_match_a_scan():
+    rng = random.Random(0)
+    weights = [rng.choice((0.0, 0.5, 1.0, 3.0)) for _ in range(37)]
+    tree = FenwickTree(weights)
+    for _ in range(200):
+        i = rng.randrange(len(weights))
+        delta = rng.uniform(-weights[i], 2.0)
+        weights[i] += delta
+        tree.add(i, delta)
+        assert tree.prefix(i + 1) == pytest.approx(sum(weights[:i + 1]))
+        u = rng.uniform(0, sum(weights))
+        expected = next(j for j in range(len(weights)) if sum(weights[:j + 1]) > u)
+        assert tree.find(u) == expected
+    assert tree.total() == pytest.approx(sum(weights))
+
+
+def test_fenwick_find_skips_zero_weights():
+    tree = FenwickTree([0.0, 2.0, 0.0, 0.0, 1.0])
+    assert [tree.find(u) for u in (0.0, 1.9, 2.0, 2.9)] == [1, 1, 4, 4]
+
+
+def groups(sizes):
+    ids = iter(range(sum(sizes.values())))
+    return {key: [next(ids) for _ in range(n)] for key, n in sizes.items()}
+
+
+def test_no_repeats_within_a_round():
+    pool = groups({"a": 5, "b": 40, "c": 1, "d": 17})
+    sampler = WeightedSampler(pool, {"a": 3.0, "b": 0.5, "c": 10.0, "d": 1.0}, rng=random.Random(1))
+    everything = sorted(i for ids in pool.values() for i in ids)
+    for round_number in (1, 2, 3):
+        drawn = [sampler.draw() for _ in range(len(sampler))]
+        assert sorted(drawn) == everything
+        assert sampler.rounds == round_number
+    sampler.draw()
+    assert sampler.rounds == 4
+
+
+def test_no_repeats_while_weights_change_mid_round():
+    pool = groups({t: 30 for t in "abcde"})
+    rng = random.Random(2)
+    sampler = WeightedSampler(pool, rng=rng)
+    drawn = []
+    for _ in range(150):
+        drawn.append(sampler.draw())
+        sampler.set_weight(rng.choice("abcde"), rng.choice((0.0, 0.1, 1.0, 5.0)))
+    assert sorted(drawn) == list(range(150))
+
+
+def test_zero_weight_groups_are_drawn_last():
+    pool = groups({"never": 3, "always": 4})
+    sampler = WeightedSampler(pool, {"never": 0.0}, rng=random.Random(3))
+    first = [sampler.draw() for _ in range(4)]
+    assert sorted(first) == pool["always"]
+    assert sorted(sampler.draw() for _ in range(3)) == pool["never"]
+
+
+def test_weights_shift_draws_toward_missed_topics():
+    # one topic missed often (weight 0.8), one mostly right (0.2): the first few
+    # draws of a round come from the missed one about four times as often
+    pool = groups({"missed": 200, "known": 200})
+    counts = Counter()
+    for seed in range(200):
+        sampler = WeightedSampler(pool, {"missed": 0.8, "known": 0.2}, rng=random.Random(seed))
+        for _ in range(10):
+            counts["missed" if sampler.draw() < 200 else "known"] += 1
+    assert 3.3 < counts["missed"] / counts["known"] < 4.8
+
+
+def test_set_weight_changes_later_draws():
+    pool = groups({"a": 500, "b": 500})
+    sampler = WeightedSampler(pool, rng=random.Random(4))
+    sampler.set_weight("a", 0.0)
+    assert all(sampler.draw() >= 500 for _ in range(100))
+    sampler.set_weight("a", 1.0)
+    sampler.set_weight("b", 0.0)
+    assert all(sampler.draw() < 500 for _ in range(100))
+
+
+def test_draws_are_uniform_within_a_group():
+    counts = Counter()
+    for seed in range(3000):
+        counts[WeightedSampler({"g": range(6)}, rng=random.Random(seed)).draw()] += 1
+    assert min(counts.values()) > 400 and max(counts.values()) < 600
+
+
+def test_sample_is_distinct_across_a_round_boundary():
+    sampler = WeightedSampler(groups({"a": 4, "b": 3}), rng=random.Random(5))
+    for _ in range(5):
+        sampler.draw()
+    batch = sampler.sample(6)
+    assert len(batch) == len(set(batch)) == 6
+    assert sampler.sample(100) and len(sampler.sample(100)) == 7
+
+
+def test_memory_grows_with_draws_not_pool_size():
+    sampler = WeightedSampler({"big": range(1_000_000)}, rng=random.Random(6))
+    for _ in range(100):
+        sampler.draw()
+    assert sum(len(s) for s in sampler._swapped.values()) <= 100
+
+
+def test_empty_pool():
+    sampler = WeightedSampler({})
+    assert sampler.draw() is None
+    assert sampler.sample(3) == []
+    assert "x" not in sampler
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from studyhub.shared_queue import SharedQuestionQueue
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "queue.db")
+
+
+def fill(queue, topic, questions, high_watermark=10_000):
+    [(job, n)] = queue.reserve(topic, 1, len(questions), len(questions))
+    queue.complete(topic, job, n, questions, high_watermark)
+
+
+def test_pops_in_order_per_topic(path):
+    queue = SharedQuestionQueue(path)
+    fill(queue, "a", [{"q": 1}, {"q": 2}])
+    fill(queue, "b", [{"q": 3}])
+    assert queue.depths() == {"a": 2, "b": 1}
+    assert [queue.pop("a"), queue.pop("a"), queue.pop("a")] == [{"q": 1}, {"q": 2}, None]
+    assert queue.pop("b") == {"q": 3}
+    assert queue.depths() == {}
+
+
+def test_two_connections_never_pop_the_same_question(path):
+    questions = [{"q": i} for i in range(400)]
+    fill(SharedQuestionQueue(path), "a", questions)
+    # separate instances, as in separate processes: each thread has its own connection too
+    queues = [SharedQuestionQueue(path), SharedQuestionQueue(path)]
+    got = [[] for _ in range(4)]
+    start = threading.Barrier(4)
+
+    def drain(queue, out):
+        start.wait()
+        while (q := queue.pop("a")) is not None:
+            out.append(q["q"])
+
+    threads = [threading.Thread(target=drain, args=(queues[i % 2], got[i])) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    popped = [q for out in got for q in out]
+    assert sorted(popped) == list(range(400))  # every question once: none lost, none twice
+    assert queues[0].depths() == {}
+
+
+def test_reserve_counts_ready_and_in_flight_questions(path):
+    queue, other = SharedQuestionQueue(path), SharedQuestionQueue(path)
+    jobs = queue.reserve("a", 3, 10, 4)
+    assert [n for _, n in jobs] == [4, 4, 2]
+    assert other.in_flight() == {"a": 10}
+    assert other.reserve("a", 3, 10, 4) == []  # already on its way to the high watermark
+
+    queue.complete("a", jobs[0][0], 4, [{"q": i} for i in range(4)], 10)
+    assert other.depths() == {"a": 4} and other.in_flight() == {"a": 6}
+    for job, n in jobs[1:]:
+        queue.complete("a", job, n, [], 10)  # failed refills: nothing queued
+    assert other.in_flight() == {}
+
+    # 4 ready is at the low watermark of 3 or above: no refill until it drops below
+    assert other.reserve("a", 4, 10, 4) == []
+    other.pop("a")
+    assert [n for _, n in other.reserve("a", 4, 10, 4)] == [4, 3]
+
+
+def test_complete_stops_at_the_high_watermark(path):
+    queue = SharedQuestionQueue(path)
+    first, second = queue.reserve("a", 1, 6, 4)
+    queue.complete("a", first[0], 4, [{"q": i} for i in range(4)], 6)
+    queue.complete("a", second[0], 2, [{"q": i} for i in range(4, 10)], 6)
+    assert queue.depths() == {"a": 6}
+
+
+def test_concurrent_reservations_fill_a_topic_once(path):
+    queues = [SharedQuestionQueue(path) for _ in range(4)]
+    reserved = []
+    start = threading.Barrier(len(queues))
+
+    def reserve(queue):
+        start.wait()
+        reserved.extend(queue.reserve("a", 3, 8, 2))
+
+    threads = [threading.Thread(target=reserve, args=(q,)) for q in queues]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(n for _, n in reserved) == 8
+    assert queues[0].in_flight() == {"a": 8}
+
+
+def test_lost_jobs_stop_counting_after_the_timeout(path):
+    queue = SharedQuestionQueue(path, job_timeout=0.05)
+    assert len(queue.reserve("a", 3, 4, 4)) == 1
+    assert queue.reserve("a", 3, 4, 4) == []
+    time.sleep(0.1)  # the process that reserved it died
+    assert queue.in_flight() == {}
+    assert [n for _, n in queue.reserve("a", 3, 4, 4)] == [4]
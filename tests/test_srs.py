@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+from studyhub import srs
+from studyhub.srs import AGAIN, DAY, EASY, GOOD, HARD, Scheduler
+
+
+def counted(scheduler, now):
+    """stats() worked out by scanning every card."""
+    due = [scheduler._due[i] for i in range(len(scheduler))]
+    new = sum(1 for d in due if not d)
+    now_due = sum(1 for d in due if d and d <= now)
+    return {"due": now_due, "new": new, "learned": len(due) - new - now_due}
+
+
+def test_unseen_cards_come_in_deck_order():
+    scheduler = Scheduler(3)
+    assert scheduler.next_card(now=0) == 0
+    scheduler.review(0, GOOD, now=0)
+    assert scheduler.next_card(now=1) == 1
+    scheduler.review(1, GOOD, now=1)
+    scheduler.review(2, GOOD, now=2)
+    assert scheduler.next_card(now=3) is None
+    assert scheduler.next_card(now=3, ahead=True) == 0
+
+
+def test_most_overdue_card_first():
+    scheduler = Scheduler(3)
+    scheduler.review(0, GOOD, now=0)  # due after 1 day
+    scheduler.review(1, AGAIN, now=0)  # due after 60 s
+    scheduler.review(2, EASY, now=0)  # due after 4 days
+    assert scheduler.next_card(now=120) == 1
+    scheduler.review(1, GOOD, now=120)
+    assert scheduler.next_card(now=5 * DAY) == 0
+
+
+def test_intervals_grow_with_good_answers_and_reset_on_again():
+    scheduler = Scheduler(1)
+    now, intervals = 0.0, []
+    for _ in range(4):
+        scheduler.review(0, GOOD, now=now)
+        intervals.append(scheduler._due[0] - now)
+        now = scheduler._due[0]
+    assert intervals[:2] == [DAY, 6 * DAY]
+    assert intervals[2] < intervals[3]
+    scheduler.review(0, AGAIN, now=now)
+    assert scheduler._due[0] - now == 60
+
+
+def test_unknown_grade():
+    with pytest.raises(ValueError):
+        Scheduler(1).review(0, 4, now=0)
+
+
+def test_stats_follow_reviews_and_time():
+    rng = random.Random(0)
+    scheduler = Scheduler(200)
+    now = 0.0
+    for _ in range(3000):
+        now += rng.expovariate(1 / 3600)
+        card = scheduler.next_card(now=now, ahead=rng.random() < 0.2)
+        if card is None:
+            card = rng.randrange(len(scheduler))
+        scheduler.review(card, rng.choice((AGAIN, HARD, GOOD, EASY)), now=now)
+        if rng.random() < 0.1:
+            stats = scheduler.stats(now=now)
+            assert {k: stats[k] for k in ("due", "new", "learned")} == counted(scheduler, now)
+    later = now + 30 * DAY
+    stats = scheduler.stats(now=later)
+    assert {k: stats[k] for k in ("due", "new", "learned")} == counted(scheduler, later)
+
+
+def test_stats_after_growing_the_deck():
+    scheduler = Scheduler(2)
+    scheduler.review(0, GOOD, now=0)
+    scheduler.resize(5)
+    assert scheduler.stats(now=0)["new"] == 4
+    assert scheduler.stats(now=DAY)["due"] == 1
+
+
+def test_dumps_and_loads_round_trip():
+    scheduler = Scheduler(50)
+    rng = random.Random(1)
+    for t in range(200):
+        scheduler.review(rng.randrange(50), rng.randrange(4), now=t * 600.0)
+    copy = Scheduler.loads(scheduler.dumps())
+    assert len(copy) == 50
+    for now in (200 * 600.0, 3 * DAY, 100 * DAY):
+        assert copy.stats(now=now) == scheduler.stats(now=now)
+        assert copy.next_card(now=now) == scheduler.next_card(now=now)
+
+
+def test_stats_do_not_scan_the_deck():
+    scheduler = Scheduler(100_000)
+    scheduler.review(0, AGAIN, now=0)
+
+    class NoScan(list):
+        def __iter__(self):
+            raise AssertionError("stats() scanned the deck")
+
+    scheduler._due, due = NoScan(), scheduler._due
+    scheduler._due.extend(due)
+    assert scheduler.stats(now=60) == {"due": 1, "new": 99_999, "learned": 0, "next_due": 60}
+
+
+def test_grades_match_the_buttons():
+    assert srs.GRADES[AGAIN] == "Again" and srs.GRADES[EASY] == "Easy"
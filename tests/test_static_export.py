@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+import re
+from html.parser import HTMLParser
+
+import pytest
+
+from studyhub import content, static_export
+
+VOID = {"meta", "link", "br", "hr", "input"}
+
+
+class Checker(HTMLParser):
+    """Fails on unbalanced tags; collects ids, links and JSON script payloads."""
+
+    def __init__(self):
+        super().__init__()
+        self.open, self.ids, self.hrefs, self.data = [], set(), [], {}
+        self._script = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if "id" in attrs:
+            self.ids.add(attrs["id"])
+        if tag in ("a", "link") and "href" in attrs:
+            self.hrefs.append(attrs["href"])
+        if tag == "script" and attrs.get("type") == "application/json":
+            self._script = attrs["id"]
+        if tag not in VOID:
+            self.open.append(tag)
+
+    def handle_endtag(self, tag):
+        assert self.open and self.open[-1] == tag, f"</{tag}> closes <{self.open[-1] if self.open else None}>"
+        self.open.pop()
+
+    def handle_data(self, data):
+        if self._script:
+            self.data[self._script] = json.loads(data)
+            self._script = None
+
+
+def parse(path):
+    checker = Checker()
+    with open(path, encoding="utf-8") as f:
+        checker.feed(f.read())
+    checker.close()
+    assert not checker.open, f"unclosed {checker.open} in {path}"
+    return checker
+
+
+@pytest.fixture(scope="module")
+def bundle(tmp_path_factory):
+    out = tmp_path_factory.mktemp("app") / "static"  # where Streamlit looks, next to app.py
+    written = static_export.export(str(out), app_url="https://app.example.org/")
+    return out, written
+
+
+def test_export_writes_every_page(bundle):
+    out, written = bundle
+    expected = {"style.css", "index.html"}
+    for unit in content.units():
+        expected |= {f"{unit}/{page}.html" for page in ("index", "guide", "flashcards", "quiz")}
+    assert {os.path.relpath(p, out) for p in written} == expected
+
+
+def test_pages_are_well_formed_and_links_resolve(bundle):
+    out, written = bundle
+    for path in written:
+        if not path.endswith(".html"):
+            continue
+        page = parse(path)
+        for href in page.hrefs:
+            if href.startswith(("http", "#")):
+                continue
+            assert os.path.exists(os.path.join(os.path.dirname(path), href)), f"{href} in {path}"
+
+
+def test_guide_has_every_section(bundle):
+    out, _ = bundle
+    for unit in content.units():
+        page = parse(out / unit / "guide.html")
+        for title, _ in content.load_guide_sections(unit):
+            assert static_export.slug(title) in page.ids
+
+
+def test_flashcards_and_quiz_carry_their_data(bundle):
+    out, _ = bundle
+    bank = content.load_question_bank()
+    for unit in content.units():
+        cards = parse(out / unit / "flashcards.html").data["cards"]
+        assert [c["term"] for c in cards] == [c["term"] for c in content.load_flashcards(unit)]
+        questions = parse(out / unit / "quiz.html").data["questions"]
+        assert len(questions) == len(bank.matching(unit=unit))
+        for q in questions:
+            assert len(q["options"]) == 4 and q["correct"] in "ABCD"
+
+
+def test_json_data_cannot_close_its_script_element():
+    script = static_export._json_script("x", {"text": "</script><script>alert(1)</script>"})
+    assert script.count("</script>") == 1
+    payload = re.search(r">(.*)</script>$", script).group(1)
+    assert json.loads(payload) == {"text": "</script><script>alert(1)</script>"}
+
+
+def test_markdown_html():
+    md = "# Title\n\nSome **bold** and *italic* text  \nnext line\n\n- one\n  - nested\n- two\n\n---\n<tag>"
+    assert static_export.markdown_html(md) == (
+        '<h1 id="title">Title</h1>\n'
+        "<p>Some <strong>bold</strong> and <em>italic</em> text<br>\nnext line</p>\n"
+        "<ul><li>\none\n<ul><li>\nnested\n</li></ul>\n</li><li>\ntwo\n</li></ul>\n"
+        "<hr>\n"
+        "<p>&lt;tag&gt;</p>"
+    )
+
+
+def test_streamlit_serves_pages_as_html(bundle):
+    # Streamlit before 1.56 served app static files other than images and fonts as
+    # text/plain with nosniff, so the pages showed as source (see requirements.txt)
+    starlette_requests = pytest.importorskip("starlette.requests")
+    from streamlit.web.server.starlette.starlette_routes import create_app_static_serving_routes
+
+    out, _ = bundle
+    path = f"{content.units()[0]}/guide.html"
+    route = create_app_static_serving_routes(str(out.parent / "app.py"), None)[0]
+    request = starlette_requests.Request(
+        {"type": "http", "method": "GET", "path": f"/app/static/{path}", "headers": [],
+         "query_string": b"", "path_params": {"path": path}}
+    )
+    response = asyncio.run(route.endpoint(request))
+    assert response.media_type == "text/html"